@@ -1,11 +1,29 @@
 """Módulo principal da aplicação FastAPI. Define o app, aplica middlewares e carrega as rotas."""
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # função que inclui todas as rotas
 from routes import include_routes
+from services.container import get_health_service
+from services.inference.admission import Overloaded
+from utils.executors import shutdown_executors
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Índices do MongoDB, registro de coleções, NLTK e modelos são preparados em segundo plano:
+    # a aplicação sobe na hora e /health/ready indica quando pode receber tráfego
+    health_service = get_health_service()
+    health_service.start()
+    yield
+    health_service.stop()
+    shutdown_executors()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -16,9 +34,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Etapa pesada saturada: recusa rápida, com a estimativa de quando tentar de novo
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+        content={"message": f"Serviço sobrecarregado ({exc.stage}: {exc.reason}). Tente novamente em {exc.retry_after}s.", "success": False}
+    )
+
 # Carregar rotas
 include_routes(app)
 
 # Expor para server.py
 def get_app():
-    return app
\ No newline at end of file
+    return app
@@ -0,0 +1,156 @@
+# src/benchmarks/chunking_benchmark.py
+"""
+Compara a vazão do ChunkerService atual com a implementação anterior
+(idioma detectado por página, tamanho medido com str.split() e prints de depuração).
+
+Uso (a partir da raiz do projeto):
+    python src/benchmarks/chunking_benchmark.py --file caminho/documento.pdf --repeat 3
+    python src/benchmarks/chunking_benchmark.py --synthetic-pages 200
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SRC_DIR))
+
+from langdetect import LangDetectException, detect  # noqa: E402
+from nltk.tokenize import sent_tokenize  # noqa: E402
+
+from services.chunking.chunk_service import CHUNK_OVERLAP, CHUNK_SIZE  # noqa: E402
+from services.container import get_chunk_service  # noqa: E402
+from utils.extract_text import ExtractTextService  # noqa: E402
+
+FRASES = [
+    "O estágio supervisionado deve cumprir a carga horária mínima prevista no projeto pedagógico do curso.",
+    "Os fungos são organismos eucariontes, heterotróficos e podem ser unicelulares ou pluricelulares.",
+    "A avaliação heurística é um método de inspeção de usabilidade realizado por especialistas.",
+    "O relatório final deverá ser entregue ao orientador até o último dia letivo do semestre.",
+    "As hifas formam o micélio, estrutura responsável pela absorção de nutrientes do substrato.",
+    "O contrato poderá ser rescindido por qualquer das partes mediante aviso prévio de trinta dias.",
+]
+
+
+def legacy_chunk_pages(pages, doc_id, filename, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Cópia fiel do algoritmo anterior do ChunkerService, usada como referência."""
+
+    def detect_language(text):
+        try:
+            lang = detect(text)
+            return 'portuguese' if lang == 'pt' else 'english'
+        except LangDetectException:
+            return 'english'
+
+    headers, footers = ExtractTextService.identify_headers_footers(pages)
+
+    chunks = []
+    chunk_id = 0
+    current_chunk_tokens = []
+    current_length = 0
+
+    for page_number, page_text_raw in pages:
+        if ExtractTextService.is_table_of_contents(page_text_raw):
+            continue
+
+        page_text = ExtractTextService.clean_page_text(page_text_raw, headers, footers)
+        if not page_text.strip():
+            continue
+
+        language = detect_language(page_text)
+        sentences = sent_tokenize(page_text, language=language)
+
+        print(f"\n\nTokenização utilizando NLTK para o idioma: {language}")
+        print(f"{sentences}")
+        print("\n\n")
+
+        print("TOKENS:\n")
+        i = 1
+        for sentence in sentences:
+            if not sentence.strip():
+                continue
+            tokens = sentence.split()
+            if not tokens:
+                continue
+
+            print(f"{i} - {tokens}")
+            i += 1
+
+            if current_length + len(tokens) > chunk_size and current_chunk_tokens:
+                chunks.append({"text": " ".join(current_chunk_tokens), "doc_id": doc_id, "filename": filename,
+                               "chunk_id": chunk_id, "page": page_number})
+                chunk_id += 1
+
+                overlap_index = max(0, len(current_chunk_tokens) - chunk_overlap)
+                current_chunk_tokens = current_chunk_tokens[overlap_index:]
+                current_length = len(current_chunk_tokens)
+
+            current_chunk_tokens.extend(tokens)
+            current_length += len(tokens)
+
+    if current_chunk_tokens:
+        chunks.append({"text": " ".join(current_chunk_tokens), "doc_id": doc_id, "filename": filename,
+                       "chunk_id": chunk_id, "page": page_number})
+
+    print(f"\n\nCHUNKS:\n{chunks}\n\n")
+    return chunks
+
+
+def synthetic_pages(count: int, sentences_per_page: int = 40) -> list[tuple[int, str]]:
+    random.seed(42)
+    return [
+        (number, "\n".join(random.choice(FRASES) for _ in range(sentences_per_page)))
+        for number in range(1, count + 1)
+    ]
+
+
+def measure(name, func, pages, repeat, chunker):
+    timings = []
+    chunks = []
+    for _ in range(repeat):
+        # Descarta a saída de texto (a implementação anterior imprime tudo) sem tirar o custo de formatá-la
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            chunks = func(pages)
+            timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    token_counts = chunker.count_tokens([chunk["text"] for chunk in chunks]) if chunks else []
+    model_limit = chunker.chunk_size
+    return {
+        "name": name,
+        "best_s": best,
+        "pages_per_s": len(pages) / best,
+        "chunks": len(chunks),
+        "avg_tokens": sum(token_counts) / len(token_counts) if token_counts else 0,
+        "truncated": sum(1 for count in token_counts if count > model_limit),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do chunking: implementação atual x anterior.")
+    parser.add_argument("--file", help="Documento (.pdf/.txt) a ser extraído e fatiado.")
+    parser.add_argument("--synthetic-pages", type=int, default=100, help="Páginas sintéticas quando --file não é informado.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = ExtractTextService.extract_pages(args.file) if args.file else synthetic_pages(args.synthetic_pages)
+    chunker = get_chunk_service()
+
+    results = [
+        measure("anterior", lambda p: legacy_chunk_pages(p, "bench", "bench"), pages, args.repeat, chunker),
+        measure("atual", lambda p: chunker.chunk_pages(p, doc_id="bench", filename="bench"), pages, args.repeat, chunker),
+    ]
+
+    print(f"\nPáginas: {len(pages)} | limite do modelo: {chunker.chunk_size} tokens | repetições: {args.repeat}\n")
+    print(f"{'implementação':<15}{'melhor (s)':>12}{'págs/s':>10}{'chunks':>9}{'tokens/chunk':>14}{'truncados':>11}")
+    for r in results:
+        print(f"{r['name']:<15}{r['best_s']:>12.3f}{r['pages_per_s']:>10.1f}{r['chunks']:>9}{r['avg_tokens']:>14.1f}{r['truncated']:>11}")
+    print(f"\nGanho de vazão: {results[0]['best_s'] / results[1]['best_s']:.2f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# src/benchmarks/embedding_benchmark.py
+"""
+Compara a geração de embeddings na indexação: implementação anterior (um único `encode` com
+todos os textos, convertido para listas Python) x atual (lotes por tamanho em tokens, matriz float32).
+
+Mede o tempo e o pico de memória alocada pelo Python/NumPy (tracemalloc) para um volume de chunks
+com tamanhos variados, como em uma ingestão real.
+
+Uso (a partir da raiz do projeto):
+    python src/benchmarks/embedding_benchmark.py --chunks 10000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np  # noqa: E402
+
+from services.container import get_embedder_service  # noqa: E402
+
+FRASES = [
+    "O estágio supervisionado deve cumprir a carga horária mínima prevista no projeto pedagógico do curso.",
+    "Os fungos são organismos eucariontes, heterotróficos e podem ser unicelulares ou pluricelulares.",
+    "A avaliação heurística é um método de inspeção de usabilidade realizado por especialistas.",
+    "O relatório final deverá ser entregue ao orientador até o último dia letivo do semestre.",
+    "As hifas formam o micélio, estrutura responsável pela absorção de nutrientes do substrato.",
+    "O contrato poderá ser rescindido por qualquer das partes mediante aviso prévio de trinta dias.",
+]
+
+
+def synthetic_chunks(count: int) -> list[str]:
+    # Mistura chunks curtos (fim de seção, legendas) e longos, como sai do chunking
+    random.seed(42)
+    return [" ".join(random.choice(FRASES) for _ in range(random.choice([1, 2, 4, 8, 12]))) for _ in range(count)]
+
+
+def legacy_embed(embedder, texts: list[str]):
+    return embedder.model.encode(texts).tolist()
+
+
+def measure(name: str, func, texts: list[str]) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    vectors = func(texts)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"name": name, "seconds": elapsed, "chunks_per_s": len(texts) / elapsed, "peak_mb": peak / 1024 / 1024, "vectors": vectors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do embedding de chunks: implementação atual x anterior.")
+    parser.add_argument("--chunks", type=int, default=10000)
+    args = parser.parse_args()
+
+    embedder = get_embedder_service()
+    texts = synthetic_chunks(args.chunks)
+    embedder.embed_texts(texts[:32])  # aquecimento
+
+    results = [
+        measure("anterior", lambda t: legacy_embed(embedder, t), texts),
+        measure("atual", embedder.embed_texts, texts),
+    ]
+
+    # Os vetores devem ser equivalentes (a implementação atual normaliza)
+    legacy = np.asarray(results[0]["vectors"], dtype=np.float32)
+    legacy /= np.linalg.norm(legacy, axis=1, keepdims=True)
+    max_diff = float(np.max(np.abs(legacy - results[1]["vectors"])))
+
+    print(f"\nChunks: {len(texts)}\n")
+    print(f"{'implementação':<15}{'tempo (s)':>11}{'chunks/s':>11}{'pico (MB)':>11}")
+    for r in results:
+        print(f"{r['name']:<15}{r['seconds']:>11.2f}{r['chunks_per_s']:>11.1f}{r['peak_mb']:>11.1f}")
+    print(f"\nGanho de vazão: {results[0]['seconds'] / results[1]['seconds']:.2f}x | diferença máxima entre vetores: {max_diff:.2e}\n")
+
+
+if __name__ == "__main__":
+    main()
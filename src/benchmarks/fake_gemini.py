@@ -0,0 +1,75 @@
+# src/benchmarks/fake_gemini.py
+"""Servidor HTTP local que imita a API generateContent do Gemini para testes de carga."""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_ANSWER = {
+    "resposta": "Resposta simulada pelo servidor falso do Gemini.",
+    "documentos": []
+}
+
+
+def _build_handler(latency_ms: float):
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+
+            # Simula o tempo de geração do modelo
+            if latency_ms > 0:
+                time.sleep(latency_ms / 1000)
+
+            body = json.dumps({
+                "candidates": [{
+                    "content": {"parts": [{"text": f"```json\n{json.dumps(FAKE_ANSWER)}\n```"}]}
+                }]
+            }).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Silencia o log por requisição para não distorcer a medição
+            pass
+
+    return FakeGeminiHandler
+
+
+class FakeGeminiServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0):
+        self.httpd = ThreadingHTTPServer((host, port), _build_handler(latency_ms))
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        # O AnswerLLM concatena a chave da API ao final da URL
+        return f"http://{host}:{port}/v1beta/models/fake:generateContent?key="
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor falso do Gemini para testes locais.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(port=args.port, latency_ms=args.latency_ms).start()
+    print(f"INFO: Gemini falso ouvindo em {server.base_url}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,333 @@
+# src/benchmarks/load_test.py
+"""
+Teste de carga HTTP da aplicação FastAPI real, usando substitutos locais:
+Gemini falso, Qdrant em modo local (embarcado) e um MongoDB descartável.
+
+Uso (a partir da raiz do projeto):
+    python src/benchmarks/load_test.py --concurrency 16 --duration 60 --mix ask=8,upload=1,download=1
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+ROOT_DIR = SRC_DIR.parent
+sys.path.insert(0, str(SRC_DIR))
+
+from benchmarks.fake_gemini import FakeGeminiServer  # noqa: E402
+
+COLLECTION_NAME = "loadtest"
+
+PALAVRAS = (
+    "estágio supervisionado carga horária prazo entrega relatório orientador "
+    "fungos micologia hifas esporos reprodução filo basidiomycota ascomycota "
+    "usabilidade interface avaliação heurística prototipagem usuário design "
+    "contrato aditivo cláusula vigência rescisão pagamento obrigação parte"
+).split()
+
+PERGUNTAS = [
+    "Qual a carga horária mínima do estágio supervisionado?",
+    "Como ocorre a reprodução dos fungos?",
+    "Quais são as heurísticas de avaliação de usabilidade?",
+    "Qual o prazo de entrega do relatório de estágio?",
+    "O que diz a cláusula de rescisão do contrato?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil pelo método do posto mais próximo."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def synthetic_document(words: int = 600) -> bytes:
+    """Gera um .txt com conteúdo único (hash novo a cada chamada)."""
+    corpo = " ".join(random.choice(PALAVRAS) for _ in range(words))
+    frases = corpo.replace(" prazo ", ". Prazo ").replace(" fungos ", ". Fungos ")
+    return f"Documento {uuid.uuid4()}.\n{frases}.".encode("utf-8")
+
+
+class DisposableMongo:
+    """Sobe um mongod temporário ou usa um URI existente com um banco descartável."""
+
+    def __init__(self, mongo_uri: str | None):
+        self.mongo_uri = mongo_uri
+        self.db_name = f"loadtest_{uuid.uuid4().hex[:8]}"
+        self.process = None
+        self.data_dir = None
+
+    def start(self) -> str:
+        if self.mongo_uri:
+            return self.mongo_uri
+
+        mongod = shutil.which("mongod")
+        if not mongod:
+            raise RuntimeError("mongod não encontrado no PATH. Informe --mongo-uri para usar um MongoDB existente.")
+
+        port = free_port()
+        self.data_dir = tempfile.mkdtemp(prefix="loadtest_mongo_")
+        self.process = subprocess.Popen(
+            [mongod, "--dbpath", self.data_dir, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.mongo_uri = f"mongodb://127.0.0.1:{port}"
+        return self.mongo_uri
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+            return
+
+        # Banco criado em um MongoDB existente: remove apenas o banco descartável
+        import pymongo
+        client = pymongo.MongoClient(self.mongo_uri)
+        client.drop_database(self.db_name)
+        client.close()
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+        self.known_hashes = []
+        self.token = None
+
+    async def timed(self, client: httpx.AsyncClient, operation: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - start
+            self.status_codes[operation][response.status_code] += 1
+            if response.status_code >= 400:
+                self.errors[operation] += 1
+            else:
+                self.latencies[operation].append(elapsed)
+            return response
+        except httpx.HTTPError:
+            self.errors[operation] += 1
+            self.status_codes[operation]["exception"] += 1
+            return None
+
+    async def upload(self, client: httpx.AsyncClient, operation: str = "upload"):
+        filename = f"loadtest_{uuid.uuid4().hex[:8]}.txt"
+        response = await self.timed(
+            client, operation, "POST", "/document/upload",
+            params={"collection_name": COLLECTION_NAME},
+            files={"file": (filename, synthetic_document(), "text/plain")},
+        )
+        if response is not None and response.status_code == 200:
+            body = response.json()
+            if body.get("hash"):
+                self.known_hashes.append(body["hash"])
+
+    async def ask(self, client: httpx.AsyncClient):
+        await self.timed(
+            client, "ask", "GET", "/ask/",
+            params={"query": random.choice(PERGUNTAS), "collections": [COLLECTION_NAME]},
+        )
+
+    async def download(self, client: httpx.AsyncClient):
+        if not self.known_hashes:
+            return await self.ask(client)
+        await self.timed(client, "download", "GET", f"/document/download/{random.choice(self.known_hashes)}")
+
+    async def setup(self, client: httpx.AsyncClient):
+        response = await client.post("/generate_token")
+        self.token = response.json()["token"]
+        client.headers["Authorization"] = f"Bearer {self.token}"
+
+        await client.post("/collection/create", params={"collection_name": COLLECTION_NAME})
+
+        print(f"INFO: Indexando {self.args.seed_documents} documento(s) iniciais...")
+        for _ in range(self.args.seed_documents):
+            await self.upload(client, operation="seed_upload")
+
+    async def worker(self, client: httpx.AsyncClient, operations: list[str], weights: list[int], deadline: float):
+        actions = {"ask": self.ask, "upload": self.upload, "download": self.download}
+        while time.perf_counter() < deadline:
+            operation = random.choices(operations, weights=weights)[0]
+            await actions[operation](client)
+
+    async def probe(self, client: httpx.AsyncClient, deadline: float):
+        """
+        Mede a latência de um endpoint trivial servido pelo event loop.
+        Picos aqui indicam trabalho bloqueante rodando no loop.
+        """
+        while time.perf_counter() < deadline:
+            await self.timed(client, "loop_probe", "GET", "/openapi.json")
+            await asyncio.sleep(self.args.probe_interval)
+
+    async def run(self, base_url: str) -> float:
+        mix = dict(item.split("=") for item in self.args.mix.split(","))
+        operations = list(mix.keys())
+        weights = [int(w) for w in mix.values()]
+
+        limits = httpx.Limits(max_connections=self.args.concurrency + 2)
+        timeout = httpx.Timeout(self.args.request_timeout)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+            await self.setup(client)
+
+            print(f"INFO: Iniciando carga: concorrência={self.args.concurrency}, duração={self.args.duration}s, mix={mix}")
+            start = time.perf_counter()
+            deadline = start + self.args.duration
+            tasks = [self.worker(client, operations, weights, deadline) for _ in range(self.args.concurrency)]
+            tasks.append(self.probe(client, deadline))
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> dict:
+        operations = {}
+        total = 0
+        for operation in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies[operation]
+            if operation != "seed_upload":
+                total += len(values)
+            operations[operation] = {
+                "ok": len(values),
+                "errors": self.errors[operation],
+                "status_codes": {str(k): v for k, v in self.status_codes[operation].items()},
+                "throughput_rps": round(len(values) / elapsed, 2) if operation != "seed_upload" else None,
+                "mean_ms": round(sum(values) / len(values) * 1000, 1) if values else None,
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1) if values else None,
+            }
+        return {
+            "concurrency": self.args.concurrency,
+            "duration_s": round(elapsed, 2),
+            "mix": self.args.mix,
+            "total_throughput_rps": round(total / elapsed, 2),
+            "operations": operations,
+        }
+
+
+def print_report(report: dict):
+    print("\n=========== RELATÓRIO DE CARGA ===========")
+    print(f"Concorrência: {report['concurrency']} | Duração: {report['duration_s']}s | Mix: {report['mix']}")
+    print(f"Vazão total: {report['total_throughput_rps']} req/s\n")
+    header = f"{'operação':<14}{'ok':>7}{'erros':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in report["operations"].items():
+        rps = stats["throughput_rps"] if stats["throughput_rps"] is not None else "-"
+        max_ms = stats["max_ms"] if stats["max_ms"] is not None else "-"
+        print(f"{name:<14}{stats['ok']:>7}{stats['errors']:>7}{rps:>9}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{max_ms:>10}")
+    print("==========================================\n")
+
+
+def wait_until_up(base_url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"O servidor terminou durante a inicialização (código {process.returncode}).")
+        try:
+            if httpx.get(f"{base_url}/openapi.json", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"O servidor não respondeu em {timeout}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP para /ask, /document/upload e /document/download.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Número de clientes simultâneos.")
+    parser.add_argument("--duration", type=float, default=30, help="Duração da fase de carga, em segundos.")
+    parser.add_argument("--mix", default="ask=8,upload=1,download=1", help="Pesos das operações (ask, upload, download).")
+    parser.add_argument("--seed-documents", type=int, default=5, help="Documentos indexados antes da carga.")
+    parser.add_argument("--probe-interval", type=float, default=0.1, help="Intervalo entre sondas do event loop, em segundos.")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800, help="Latência simulada do LLM.")
+    parser.add_argument("--mongo-uri", default=None, help="Usa um MongoDB existente (com banco descartável) em vez de subir um mongod.")
+    parser.add_argument("--workers", type=int, default=1, help="Acima de 1, sobe a aplicação com o launcher de pré-fork (exige --qdrant-url).")
+    parser.add_argument("--qdrant-url", default=None, help="Usa um servidor Qdrant descartável em vez do modo local.")
+    parser.add_argument("--env", action="append", default=[], help="Sobrescreve variáveis de ambiente do servidor (CHAVE=VALOR).")
+    parser.add_argument("--output", default=None, help="Arquivo JSON para salvar o relatório.")
+    args = parser.parse_args()
+    if args.workers > 1 and not args.qdrant_url:
+        # O modo local trava o diretório para um único processo: os workers seguintes falhariam no primeiro acesso
+        parser.error("--workers acima de 1 exige --qdrant-url (servidor Qdrant); o Qdrant local não é compartilhado entre processos.")
+
+    gemini = FakeGeminiServer(latency_ms=args.gemini_latency_ms).start()
+    mongo = DisposableMongo(args.mongo_uri)
+    qdrant_dir = None if args.qdrant_url else tempfile.mkdtemp(prefix="loadtest_qdrant_")
+    server = None
+
+    try:
+        port = free_port()
+        env = {
+            **os.environ,
+            "PORT": str(port),
+            "QDRANT_PATH": qdrant_dir or "",
+            "QDRANT_URL": args.qdrant_url or os.environ.get("QDRANT_URL", ""),
+            "MONGO_URI": mongo.start(),
+            "MONGO_DB_NAME": mongo.db_name,
+            "GEMINI_BASE_URL": gemini.base_url,
+            "GEMINI_API_KEY": "fake",
+        }
+        env.setdefault("JWT_SECRET_KEY", "loadtest")
+        for override in args.env:
+            key, value = override.split("=", 1)
+            env[key] = value
+
+        base_url = f"http://127.0.0.1:{port}"
+        qdrant = f"Qdrant em {args.qdrant_url}" if args.qdrant_url else f"Qdrant local em {qdrant_dir}"
+        print(f"INFO: Subindo a aplicação em {base_url} ({qdrant}, Mongo {env['MONGO_URI']})...")
+        if args.workers > 1:
+            command = [sys.executable, str(SRC_DIR / "prefork_server.py"), "--workers", str(args.workers), "--port", str(port)]
+        else:
+            command = [sys.executable, str(SRC_DIR / "server.py")]
+        server = subprocess.Popen(command, cwd=ROOT_DIR, env=env)
+        wait_until_up(base_url, server, args.startup_timeout)
+
+        load_test = LoadTest(args)
+        elapsed = asyncio.run(load_test.run(base_url))
+        report = load_test.report(elapsed)
+        print_report(report)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"INFO: Relatório salvo em {args.output}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        gemini.stop()
+        mongo.stop()
+        if qdrant_dir:
+            shutil.rmtree(qdrant_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Perfis de desempenho escolhidos na criação da coleção.
+# Cada perfil define como os vetores são armazenados/indexados e os parâmetros de busca usados nela.
+DEFAULT_PROFILE = "default"
+
+COLLECTION_PROFILES = {
+    # Comportamento original: vetores float32 em RAM, HNSW padrão
+    "default": {
+        "description": "Vetores float32 em RAM e HNSW padrão do Qdrant.",
+    },
+    # Quantização escalar (int8) em RAM com re-score nos vetores originais: ~4x menos memória
+    "balanced": {
+        "description": "Quantização escalar int8 em RAM com re-score; HNSW m=16/ef_construct=100.",
+        "quantization": "scalar",
+        "hnsw": {"m": 16, "ef_construct": 100},
+        "search": {"hnsw_ef": 128, "rescore": True, "oversampling": 2.0},
+    },
+    # Coleções grandes: vetores originais e payload em disco, só os quantizados em RAM
+    "large": {
+        "description": "Vetores e payload em disco, quantização int8 em RAM, 2 shards e limiares de otimização maiores.",
+        "vectors_on_disk": True,
+        "on_disk_payload": True,
+        "quantization": "scalar",
+        "hnsw": {"m": 16, "ef_construct": 128},
+        "shard_number": 2,
+        "optimizers": {"indexing_threshold": 50000, "memmap_threshold": 50000},
+        "search": {"hnsw_ef": 128, "rescore": True, "oversampling": 2.0},
+    },
+    # Máxima economia: quantização binária (~32x menos memória), compensada com oversampling maior
+    "compact": {
+        "description": "Quantização binária em RAM e vetores em disco, com re-score e oversampling 3x.",
+        "vectors_on_disk": True,
+        "quantization": "binary",
+        "hnsw": {"m": 16, "ef_construct": 100},
+        "search": {"hnsw_ef": 96, "rescore": True, "oversampling": 3.0},
+    },
+    # Busca exata (sem HNSW na consulta): recall máximo, para coleções pequenas ou avaliação
+    "exact": {
+        "description": "Busca exata (força bruta) em vez de HNSW: recall máximo, maior latência.",
+        "search": {"exact": True},
+    },
+}
+
+
+def build_collection_params(profile_name: str, vector_size: int) -> dict:
+    """Monta os argumentos de `create_collection` para o perfil."""
+    from qdrant_client.http import models
+
+    profile = COLLECTION_PROFILES[profile_name]
+
+    params = {
+        "vectors_config": models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=profile.get("vectors_on_disk", False) or None
+        )
+    }
+
+    if profile.get("on_disk_payload"):
+        params["on_disk_payload"] = True
+
+    if profile.get("hnsw"):
+        params["hnsw_config"] = models.HnswConfigDiff(**profile["hnsw"])
+
+    if profile.get("shard_number"):
+        params["shard_number"] = profile["shard_number"]
+
+    if profile.get("optimizers"):
+        params["optimizers_config"] = models.OptimizersConfigDiff(**profile["optimizers"])
+
+    quantization = profile.get("quantization")
+    if quantization == "scalar":
+        params["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif quantization == "binary":
+        params["quantization_config"] = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+
+    return params
+
+
+def build_search_params(profile_name: str) -> "models.SearchParams | None":
+    """Monta os parâmetros de busca (`hnsw_ef`, `exact`, re-score) do perfil."""
+    from qdrant_client.http import models
+
+    search = COLLECTION_PROFILES.get(profile_name, {}).get("search")
+    if not search:
+        return None
+
+    quantization = None
+    if "rescore" in search or "oversampling" in search:
+        quantization = models.QuantizationSearchParams(
+            rescore=search.get("rescore"),
+            oversampling=search.get("oversampling")
+        )
+
+    return models.SearchParams(
+        hnsw_ef=search.get("hnsw_ef"),
+        exact=search.get("exact", False),
+        quantization=quantization
+    )
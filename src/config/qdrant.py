@@ -1,9 +1,19 @@
 import os
-
-from qdrant_client import QdrantClient
+from functools import lru_cache
 
 QDRANT_URL = os.getenv("QDRANT_URL")
+# Caminho para o modo local (embarcado) do Qdrant, sem servidor. Usado em testes de carga.
+QDRANT_PATH = os.getenv("QDRANT_PATH")
+# "collections": uma coleção do Qdrant por coleção lógica; "shared": todas em uma coleção física particionada
+QDRANT_STORAGE_MODE = os.getenv("QDRANT_STORAGE_MODE", "collections")
+QDRANT_SHARED_COLLECTION = os.getenv("QDRANT_SHARED_COLLECTION", "rag_shared")
+# Perfil de desempenho da coleção física no modo compartilhado
+QDRANT_SHARED_PROFILE = os.getenv("QDRANT_SHARED_PROFILE", "default")
+# Payload enxuto: o texto dos chunks fica no MongoDB (comprimido) e não no payload dos pontos
+QDRANT_SLIM_PAYLOADS = os.getenv("QDRANT_SLIM_PAYLOADS", "false").lower() == "true"
 
-# conexão com o Qdrant
-
-qdrant_client = QdrantClient(url=QDRANT_URL)
\ No newline at end of file
+# conexão com o Qdrant, criada no primeiro uso (importar a aplicação não abre conexões)
+@lru_cache()
+def get_qdrant_client():
+    from qdrant_client import QdrantClient
+    return QdrantClient(path=QDRANT_PATH) if QDRANT_PATH else QdrantClient(url=QDRANT_URL)
@@ -1,11 +1,25 @@
-from services.container import get_qdrant_service
+from config.collection_profiles import COLLECTION_PROFILES
+from services.container import (LazyService, get_embedder_service,
+                                get_metadata_service, get_qdrant_service,
+                                get_registry_service)
 
 # Instância do service
-qdrant_service = get_qdrant_service()
+qdrant_service = LazyService(get_qdrant_service)
+registry_service = LazyService(get_registry_service)
+metadata_service = LazyService(get_metadata_service)
+embedder_service = LazyService(get_embedder_service)
 
-def create_collection_controller(name: str, vector_size: int):
-    created = qdrant_service.create_collection(name, vector_size)
+def create_collection_controller(name: str, profile: str):
+    # A dimensão dos vetores vem do modelo de embedding configurado
+    vector_size = embedder_service.get_embedding_dimension()
+    if qdrant_service.shared:
+        # No modo compartilhado todas as coleções lógicas usam o perfil da coleção física
+        profile = qdrant_service.shared_profile
+    created = qdrant_service.create_collection(name, vector_size, profile)
     if created:
+        # Coleção nova: todo documento indexado nela ganha vetores-resumo
+        metadata_service.save_collection_settings(name, profile, vector_size, embedder_service.model_name, summarized=True)
+        registry_service.add_collection(name, profile, embedder_service.model_name, summarized=True)
         return {"message": "Collection criada com sucesso", "success": True}
     return {"message": "Ocorreu um erro na criação da Collection", "success": False}
 
@@ -13,14 +27,21 @@ def list_collections_controller():
     collections = qdrant_service.list_collections()
     return {"collections": collections, "success": True}
 
+def list_profiles_controller():
+    profiles = {name: profile["description"] for name, profile in COLLECTION_PROFILES.items()}
+    return {"profiles": profiles, "success": True}
+
 def get_collection_controller(collection_name: str):
     response = qdrant_service.get_collection(collection_name)
     if response["collection"]:
+        response["collection"]["profile"] = registry_service.get_collection_profile(collection_name)
         return {"collection": response["collection"], "success": True}
     return {"collection": None, "message": response["error"],"success": False}
 
 def delete_collection_controller(name: str):
     deleted = qdrant_service.delete_collection(name)
     if deleted:
+        metadata_service.delete_collection_settings(name)
+        registry_service.remove_collection(name)
         return {"message": "Collection deletada com sucesso", "success": True}
     return {"message": "Collection não existe", "success": False}
\ No newline at end of file
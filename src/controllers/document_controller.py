@@ -1,20 +1,20 @@
 # controllers/document_controller.py
-import os
-import uuid
-from pathlib import Path
-from bson.objectid import ObjectId
-from services.container import (get_chunk_service, get_embedder_service,
-                                get_qdrant_service, get_metadata_service)
+from services.container import (LazyService, get_chunk_service_for_collection,
+                                get_embedder_for_collection,
+                                get_metadata_service, get_qdrant_service,
+                                get_registry_service)
+from services.inference.admission import embedding_pool, ocr_pool
+from utils.executors import run_cpu, run_inference, run_io
+from utils.upload_buffer import UploadBuffer
 
 # Instância dos services
-qdrant_service = get_qdrant_service()
-chunk_service = get_chunk_service()
-embedder_service = get_embedder_service()
-metadata_service = get_metadata_service()
+qdrant_service = LazyService(get_qdrant_service)
+metadata_service = LazyService(get_metadata_service)
+registry_service = LazyService(get_registry_service)
 
-def upload_document_controller(
+async def upload_document_controller(
     hash_document: str,
-    file_content: bytes, 
+    upload: UploadBuffer,
     filename: str, 
     collection_name: str, 
     document_id_to_update: str | None = None,
@@ -22,63 +22,135 @@ def upload_document_controller(
 ):
     """
     Orquestra o upload, processamento e armazenamento do documento.
+    Todo trabalho bloqueante roda em executores dedicados, fora do event loop.
     """
-    temp_dir = Path("temp")
-    temp_dir.mkdir(exist_ok=True)
-    temp_filepath = temp_dir / f"{uuid.uuid4()}_{filename}"
-    with open(temp_filepath, "wb") as f:
-        f.write(file_content)
-
-    try:
-        # Processa o novo arquivo para o Qdrant
-        chunks = chunk_service.chunk_document(str(temp_filepath), doc_id=hash_document, filename=filename)
+    # Mesmo conteúdo já indexado em outra coleção: copia os pontos em vez de extrair e gerar os embeddings de novo
+    clone_source = await run_io(_clone_from_other_collection, hash_document, collection_name)
+    gridfs_file_id = clone_source["gridfs_file_id"] if clone_source else None
+
+    if not clone_source:
+        # Extração/OCR em outro processo (o extrator trabalha sobre um caminho em disco).
+        # Importado aqui: PyMuPDF e Tesseract só são carregados no primeiro upload
+        from utils.extract_text import ExtractTextService
+
+        # Extração e embedding passam pelo controle de admissão: sob sobrecarga, a requisição recebe 503
+        async with ocr_pool.async_slot():
+            with upload.as_path() as temp_filepath:
+                pages = await run_cpu(ExtractTextService.extract_pages, str(temp_filepath), hash_document)
+
+        # Processa o novo arquivo para o Qdrant, com o modelo da geração atual da coleção
+        chunks = await run_inference(_chunk_pages, collection_name, pages, hash_document, filename)
         if isinstance(chunks, dict):
             return chunks
 
-        vectors = embedder_service.embed_chunks(chunks)
-
-        print(f"\n\nVETORES:")
-        print(f"{vectors}\n\n")
-
-        qdrant_service.index_chunks(chunks, collection_name=collection_name, vectors=vectors)
-
-        if document_id_to_update:
-            # 1. Obter metadados da versão antiga
-            old_metadata = metadata_service.get_document_by_id(document_id_to_update)
-            if not old_metadata:
-                 return {"message": f"Documento com ID {document_id_to_update} não encontrado para atualização.", "success": False}
-            old_hash = old_metadata['active_version_hash']
-            old_gridfs_file_id = old_metadata.get('gridfs_file_id')
-
-            qdrant_service.delete_by_doc_id(old_hash, collection_name)
-            
-            new_gridfs_file_id = metadata_service.save_file(file_content, filename, hash_document)
-
-            metadata_service.update_document_version(document_id_to_update, hash_document, filename, new_gridfs_file_id)
-
-            if old_gridfs_file_id:
-                # Verifica se algum OUTRO documento ainda usa o arquivo antigo
-                other_references = metadata_service.collection.count_documents({
-                    "gridfs_file_id": old_gridfs_file_id,
-                    "_id": {"$ne": ObjectId(document_id_to_update)}
-                })
-
-                if other_references == 0:
-                    print(f"INFO: Nenhuma outra referência encontrada para o arquivo antigo. Excluindo do GridFS.")
-                    metadata_service.delete_file_from_gridfs(old_gridfs_file_id)
-                else:
-                    print(f"INFO: O arquivo antigo ainda é referenciado por {other_references} outro(s) documento(s). Não será excluído do GridFS.")
-            
-            return {"message": "Documento atualizado com sucesso", "document_id": document_id_to_update, "new_version_hash": hash_document, "success": True}
+        async with embedding_pool.async_slot():
+            vectors = await run_inference(_embed_chunks, collection_name, chunks)
+
+        await run_io(qdrant_service.index_chunks, chunks, collection_name=collection_name, vectors=vectors)
+
+    return await run_io(
+        _save_document_metadata, hash_document, upload, filename, collection_name, document_id_to_update, parent_document_id, gridfs_file_id
+    )
+
+
+def _chunk_pages(collection_name: str, pages: list, hash_document: str, filename: str):
+    return get_chunk_service_for_collection(collection_name).chunk_pages(pages, doc_id=hash_document, filename=filename)
+
+
+def _embed_chunks(collection_name: str, chunks: list[dict]):
+    return get_embedder_for_collection(collection_name).embed_chunks(chunks)
+
+
+def _clone_from_other_collection(hash_document: str, collection_name: str) -> dict | None:
+    """
+    Copia para a coleção os pontos de um documento com o mesmo hash já indexado em outra coleção.
+    Retorna o registro de origem (para reaproveitar o arquivo do GridFS) ou None se não houver cópia.
+    """
+    # Só coleções do mesmo modelo de embedding: os vetores são copiados como estão
+    model_name = registry_service.get_collection_model(collection_name)
+    candidates = [
+        name for name in registry_service.collections_with_document(hash_document)
+        if name != collection_name and registry_service.get_collection_model(name) == model_name
+    ]
+    if not candidates:
+        return None
+
+    source = metadata_service.find_copy_in_other_collection(hash_document, collection_name, candidates)
+    if not source:
+        return None
+
+    try:
+        copied = qdrant_service.copy_document_points(hash_document, source["collection_name"], collection_name)
+    except Exception as e:
+        print(f"[ERRO] Falha ao copiar o documento {hash_document} de '{source['collection_name']}': {e}")
+        # Remove uma cópia parcial; o documento segue pelo processamento completo
+        qdrant_service.delete_by_doc_id(hash_document, collection_name)
+        return None
+
+    if not copied:
+        return None
+
+    print(f"INFO: Documento {hash_document} copiado de '{source['collection_name']}' para '{collection_name}' ({copied} pontos), sem extração nem embedding.")
+    return source
+
+
+def _save_document_metadata(
+    hash_document: str,
+    upload: UploadBuffer,
+    filename: str,
+    collection_name: str,
+    document_id_to_update: str | None,
+    parent_document_id: str | None,
+    gridfs_file_id=None
+):
+    """
+    Grava o arquivo no GridFS e cria/atualiza o registro de metadados (chamadas bloqueantes).
+    Com `gridfs_file_id` (documento copiado de outra coleção), o registro aponta para o arquivo já salvo.
+    """
+    if document_id_to_update:
+        # 1. Obter metadados da versão antiga
+        old_metadata = metadata_service.get_document_by_id(document_id_to_update)
+        if not old_metadata:
+             return {"message": f"Documento com ID {document_id_to_update} não encontrado para atualização.", "success": False}
+        old_hash = old_metadata['active_version_hash']
+        old_gridfs_file_id = old_metadata.get('gridfs_file_id')
+
+        qdrant_service.delete_by_doc_id(old_hash, collection_name)
         
+        if gridfs_file_id:
+            new_gridfs_file_id = gridfs_file_id
         else:
+            # O GridFS lê o mesmo buffer em stream, sem uma cópia extra em memória
+            with upload.reader() as file_stream:
+                new_gridfs_file_id = metadata_service.save_file(file_stream, filename, hash_document)
+
+        metadata_service.update_document_version(document_id_to_update, hash_document, filename, new_gridfs_file_id)
+        registry_service.update_document(document_id_to_update, old_metadata.get('collection_name', collection_name), old_hash, hash_document)
+
+        if old_gridfs_file_id:
+            # Verifica se algum OUTRO documento ainda usa o arquivo antigo
+            other_references = metadata_service.count_file_references(old_gridfs_file_id, exclude_doc_id=document_id_to_update)
+
+            if other_references == 0:
+                print(f"INFO: Nenhuma outra referência encontrada para o arquivo antigo. Excluindo do GridFS.")
+                metadata_service.delete_file_from_gridfs(old_gridfs_file_id)
+            else:
+                print(f"INFO: O arquivo antigo ainda é referenciado por {other_references} outro(s) documento(s). Não será excluído do GridFS.")
+        
+        return {"message": "Documento atualizado com sucesso", "document_id": document_id_to_update, "new_version_hash": hash_document, "success": True}
+    
+    else:
+        if gridfs_file_id:
             new_doc_id = metadata_service.create_document_record(
-                filename, collection_name, hash_document, file_content, parent_document_id
+                filename, collection_name, hash_document, None, parent_document_id, gridfs_file_id=gridfs_file_id
             )
-            return {"message": "Documento criado e indexado com sucesso", "document_id": new_doc_id, "hash": hash_document, "success": True}
-    
-    finally:
-        os.remove(temp_filepath)
+        else:
+            with upload.reader() as file_stream:
+                new_doc_id = metadata_service.create_document_record(
+                    filename, collection_name, hash_document, file_stream, parent_document_id
+                )
+        registry_service.add_document(new_doc_id, collection_name, hash_document)
+        return {"message": "Documento criado e indexado com sucesso", "document_id": new_doc_id, "hash": hash_document, "success": True}
 
 
 def delete_document_controller(doc_id: str, collection_name: str):
@@ -93,6 +165,7 @@ def delete_document_controller(doc_id: str, collection_name: str):
     
     # Deleta o registro de metadados e o arquivo associado no GridFS (se não houver mais referências)
     metadata_service.delete_document_record(doc_id)
+    registry_service.remove_document(metadata['id'])
     
     return {"message": f"Documento ID '{doc_id}' deletado com sucesso", "success": True}
 
@@ -109,4 +182,4 @@ def download_document_controller(doc_hash: str):
     if not gridfs_file:
         return {"message": "Arquivo não encontrado no armazenamento GridFS.", "success": False}
     
-    return {"message": "Arquivo encontrado e pronto para download.", "success": True, "file": gridfs_file}
\ No newline at end of file
+    return {"message": "Arquivo encontrado e pronto para download.", "success": True, "file": gridfs_file, "hash": metadata["active_version_hash"]}
\ No newline at end of file
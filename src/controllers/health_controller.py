@@ -0,0 +1,11 @@
+from services.container import LazyService, get_health_service
+
+# Instância do service
+health_service = LazyService(get_health_service)
+
+def liveness_controller():
+    return {"status": "alive", "success": True}
+
+def readiness_controller():
+    status = health_service.status()
+    return {"status": "ready" if status["ready"] else "warming_up", **status, "success": status["ready"]}
@@ -0,0 +1,34 @@
+from services.container import (MODEL_NAME, LazyService,
+                                get_embedder_for_model, get_metadata_service,
+                                get_qdrant_service, get_reranker_service)
+from services.inference.admission import ADMISSION_POOLS
+from utils.page_cache import get_page_cache
+
+# Instância dos services
+metadata_service = LazyService(get_metadata_service)
+qdrant_service = LazyService(get_qdrant_service)
+
+def cache_metrics_controller():
+    page_cache = get_page_cache()
+    chunk_cache = qdrant_service.chunk_cache
+    return {
+        "metadata_cache": metadata_service.cache_stats(),
+        "chunk_cache": chunk_cache.stats() if chunk_cache else None,
+        "page_cache": page_cache.stats() if page_cache else None,
+        "success": True
+    }
+
+def inference_metrics_controller():
+    # Só lê os modelos já carregados: consultar as métricas não deve carregar um modelo
+    batchers = {"embedding": None, "rerank": None}
+    for model_name, embedder in get_embedder_for_model.loaded().items():
+        batchers["embedding" if model_name == MODEL_NAME else f"embedding:{model_name}"] = embedder.query_batcher
+    if get_reranker_service.is_loaded():
+        batchers["rerank"] = get_reranker_service().batcher
+    return {
+        "micro_batching": {name: batcher.stats() if batcher else None for name, batcher in batchers.items()},
+        "success": True
+    }
+
+def admission_metrics_controller():
+    return {"admission": {name: pool.stats() for name, pool in ADMISSION_POOLS.items()}, "success": True}
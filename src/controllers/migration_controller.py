@@ -0,0 +1,14 @@
+from services.container import (LazyService, get_migration_service,
+                                get_qdrant_service)
+
+# Instância dos services
+migration_service = LazyService(get_migration_service)
+qdrant_service = LazyService(get_qdrant_service)
+
+def start_migration_controller(collection_name: str, rechunk: bool):
+    if qdrant_service.shared:
+        return {"message": "A migração com troca de alias só está disponível no modo de armazenamento 'collections'", "success": False}
+    return migration_service.start(collection_name, rechunk)
+
+def migration_status_controller(collection_name: str | None):
+    return {"migrations": migration_service.status(collection_name), "success": True}
@@ -1,11 +1,16 @@
 import os
 import json
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-from services.container import get_embedder_service, get_qdrant_service, get_metadata_service
+from config.collection_profiles import build_search_params
+from services.container import (LazyService, get_embedder_for_model,
+                                get_embedder_service, get_metadata_service,
+                                get_qdrant_service, get_registry_service,
+                                get_reranker_service)
+from services.inference.admission import embedding_pool, rerank_pool
 from services.llm.answer_llm_service import AnswerLLM
-from services.retrieving.reranker_service import Reranker
 from services.retrieving.retriever_service import Retriever
 
 load_dotenv()
@@ -14,14 +19,24 @@ MAXIMUM_CHUNK_TOP = int(os.getenv("MAXIMUM_CHUNK_TOP"))
 BACKEND_BASE_URL = os.getenv("BACKEND_BASE_URL")
 THRESHOLD = float(os.getenv("THRESHOLD"))
 CONTEXT_WINDOW_SIZE = int(os.getenv("CONTEXT_WINDOW_SIZE", 5))
+CONTEXT_NEIGHBOUR_CHUNKS = int(os.getenv("CONTEXT_NEIGHBOUR_CHUNKS", 2))
+# Busca em dois níveis: primeiro os documentos (vetores-resumo), depois os chunks só desses documentos
+TWO_LEVEL_RETRIEVAL = os.getenv("TWO_LEVEL_RETRIEVAL", "false").lower() == "true"
+DOCUMENT_CANDIDATES = int(os.getenv("DOCUMENT_CANDIDATES", 10))
+# Chamadas simultâneas ao LLM no endpoint de perguntas em lote
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", 4))
 
-embedder_service = get_embedder_service()
-qdrant_service = get_qdrant_service()
-metadata_service = get_metadata_service()
+embedder_service = LazyService(get_embedder_service)
+qdrant_service = LazyService(get_qdrant_service)
+metadata_service = LazyService(get_metadata_service)
+reranker_service = LazyService(get_reranker_service)
+registry_service = LazyService(get_registry_service)
 
 def retriever(question: str, collections: list[str] | None = None, limit_context: bool = False):
     # 1. Busca inicial por similaridade
-    vector_question = embedder_service.embed_text(question)
+    # As etapas pesadas passam pelo controle de admissão: sob sobrecarga, a requisição recebe 503
+    with embedding_pool.slot():
+        vector_question = embedder_service.embed_text(question)
 
     relevant_collections = []
     if collections:
@@ -35,8 +50,18 @@ def retriever(question: str, collections: list[str] | None = None, limit_context
     if not relevant_collections:
         return {"message": "Nenhuma coleção relevante encontrada para a pergunta", "success": False}
     
-    # 2. Busca inicial por similaridade em todas as coleções relevantes
-    initial_chunks = qdrant_service.search_question(vector_question, MAXIMUM_CHUNK_TOP, relevant_collections, THRESHOLD)
+    # 2. Busca inicial por similaridade em todas as coleções relevantes, com o vetor do modelo de cada coleção
+    search_params = _search_params(relevant_collections)
+    initial_chunks = {}
+    for model_name, collection_names in _collections_by_model(relevant_collections).items():
+        vector = vector_question if model_name == embedder_service.model_name else _embed_questions(model_name, [question])[0]
+        candidate_documents = None
+        if TWO_LEVEL_RETRIEVAL:
+            candidate_documents = qdrant_service.search_documents(vector, DOCUMENT_CANDIDATES, _summarized(collection_names), search_params)
+            print(f"INFO: Documentos candidatos por coleção: { {name: len(hashes) for name, hashes in candidate_documents.items()} }")
+        found = qdrant_service.search_question(vector, MAXIMUM_CHUNK_TOP, collection_names, THRESHOLD, search_params, candidate_documents)
+        for doc_hash, chunks in found.items():
+            initial_chunks.setdefault(doc_hash, []).extend(chunks)
     
     #-------------DEBUGGING----------------
     if initial_chunks:
@@ -64,49 +89,17 @@ def retriever(question: str, collections: list[str] | None = None, limit_context
     
     expanded_context_chunks = {}
     if limit_context:
-        print(f"INFO: Usando estratégia de Janela de Contexto (+/- {CONTEXT_WINDOW_SIZE} páginas).")
+        print(f"INFO: Usando estratégia de Vizinhança (+/- {CONTEXT_NEIGHBOUR_CHUNKS} chunks).")
 
-        # Coleta as páginas e coleções dos chunks encontrados
-        relevant_pages_by_doc = defaultdict(lambda: {'pages': set(), 'collection': ''})
+        # Busca os chunks vizinhos de cada chunk encontrado pelos IDs determinísticos
+        hits = [chunk for chunks in initial_chunks.values() for chunk in chunks]
+        neighbour_chunks, legacy_hits = qdrant_service.get_neighbour_chunks(hits, CONTEXT_NEIGHBOUR_CHUNKS)
 
-        if len(relevant_collections) == 1:
-            collection_name = relevant_collections[0]
-            for doc_id, chunks in initial_chunks.items():
-                relevant_pages_by_doc[doc_id]['collection'] = collection_name
-                for chunk in chunks:
-                    relevant_pages_by_doc[doc_id]['pages'].add(chunk['page'])
-        
-        else:
-            for doc_id, chunks in initial_chunks.items():
-                for chunk in chunks:
-                    relevant_pages_by_doc[doc_id]['pages'].add(chunk['page'])
-
-            # Encontra a coleção de cada documento (necessário para a busca no Qdrant)
-            initial_doc_hashes = list(initial_chunks.keys())
-            for collection_name in relevant_collections:
-                records = metadata_service.get_documents_by_hashes(collection_name, initial_doc_hashes)
-                for record in records:
-                    relevant_pages_by_doc[record['active_version_hash']]['collection'] = collection_name
-
-        # Busca os chunks dentro da janela de contexto para cada documento
-        all_window_chunks = []
-        for doc_hash, data in relevant_pages_by_doc.items():
-            if not data['pages'] or not data['collection']:
-                continue
-
-            min_page = max(1, min(data['pages']) - CONTEXT_WINDOW_SIZE)
-            max_page = max(data['pages']) + CONTEXT_WINDOW_SIZE
-    
-            chunks_from_window = qdrant_service.get_chunks_by_page_window(
-                collection_name=data['collection'],
-                doc_hash=doc_hash,
-                min_page=min_page,
-                max_page=max_page
-            )
-            all_window_chunks.extend(chunks_from_window)
+        # Pontos indexados antes dos IDs determinísticos: usa a janela de páginas
+        all_window_chunks = _page_window_chunks(legacy_hits)
 
         # Agrupa o resultado final no formato esperado pelo reranker
-        temp_grouped = defaultdict(list)
+        temp_grouped = defaultdict(list, neighbour_chunks)
         for chunk in all_window_chunks:
             temp_grouped[chunk['document_id']].append(chunk)
         expanded_context_chunks = dict(temp_grouped)
@@ -114,34 +107,9 @@ def retriever(question: str, collections: list[str] | None = None, limit_context
     else:
         print("INFO: Usando estratégia de Documento Inteiro.")
     
-        # Encontrar todos os documentos relacionados
-        initial_doc_hashes = list(initial_chunks.keys())
-    
-        # Busca os metadados dos documentos encontrados para obter seus IDs
-        all_metadata_records = []
-        for collection_name in relevant_collections:
-            records = metadata_service.get_documents_by_hashes(collection_name, initial_doc_hashes)
-            if records:
-                print(f"  -> Encontrados {len(records)} registro(s) na coleção '{collection_name}'")
-                all_metadata_records.extend(records)
-    
-        if not all_metadata_records:
-            print("!!! ERRO CRÍTICO DE SINCRONIA: Hashes existem no Qdrant, mas não foram encontrados no MongoDB.")
+        hashes_by_collection = _related_hashes_by_collection(relevant_collections, list(initial_chunks.keys()))
+        if hashes_by_collection is None:
             return {"message": "Falha de sincronia entre o banco de vetores e os metadados.", "success": False}
-    
-        print(f"[DEBUG 3] Total de {len(all_metadata_records)} registros de metadados encontrados.")
-    
-        doc_ids_found = [record['id'] for record in all_metadata_records]
-        related_documents = metadata_service.find_related_documents(doc_ids_found)
-        print(f"[DEBUG 4] Contexto expandido para {len(related_documents)} documentos relacionados.")
-
-        # Agrupar os documentos relacionados por sua coleção original
-        hashes_by_collection = defaultdict(list)
-        for doc in related_documents:
-            collection_name = doc.get("collection_name")
-            doc_hash = doc.get("active_version_hash")
-            if collection_name and doc_hash:
-                hashes_by_collection[collection_name].append(doc_hash)
 
         # Buscar todos os chunks de todos os documentos, respeitando suas coleções
         for collection_name, hashes in hashes_by_collection.items():
@@ -155,9 +123,11 @@ def retriever(question: str, collections: list[str] | None = None, limit_context
         return {"message": "Não foi possível montar o contexto expandido para a resposta.", "success": False}
 
     # 6. Re-ranquear o contexto expandido
-    
-    inst_reranker = Reranker()
-    reranked_result = inst_reranker.rerank(question, expanded_context_chunks)
+    # Com payload enxuto, o texto é lido só agora, em lote, para os chunks do contexto
+    qdrant_service.load_texts([chunk for chunks in expanded_context_chunks.values() for chunk in chunks])
+
+    with rerank_pool.slot():
+        reranked_result = reranker_service.rerank(question, expanded_context_chunks)
     total_reranked = sum(len(chunks) for chunks in reranked_result.values())
 
     print(f"Contexto expandido para {len(expanded_context_chunks)} documento(s). Total de chunks re-ranqueados: {total_reranked}")
@@ -173,4 +143,282 @@ def retriever(question: str, collections: list[str] | None = None, limit_context
     return answer
 
     #return reranked_result
-    
\ No newline at end of file
+
+
+def retriever_batch(questions: list[str], collections: list[str] | None = None, limit_context: bool = False):
+    """
+    Responde várias perguntas compartilhando o trabalho entre elas: um único embedding de todas as perguntas,
+    buscas em lote no Qdrant, busca única dos chunks de contexto comuns a várias perguntas, re-ranqueamento
+    de todos os pares em lotes grandes e chamadas ao LLM com concorrência limitada.
+    Retorna um resultado por pergunta, na ordem recebida.
+    """
+    with embedding_pool.slot():
+        vectors = embedder_service.embed_texts(questions)
+
+    if collections:
+        print(f"INFO: Buscando {len(questions)} perguntas nas coleções especificadas pelo usuário: {collections}")
+        relevant_collections = [collections for _ in questions]
+    else:
+        relevant_collections = [Retriever.search_relevant_collections(vector) for vector in vectors]
+
+    all_collections = list({name for names in relevant_collections for name in names})
+    search_params = _search_params(all_collections)
+    initial_chunks = [{} for _ in questions]
+    # Uma rodada de buscas por modelo de embedding (normalmente um só), com as perguntas que consultam essas coleções
+    for model_name, collection_names in _collections_by_model(all_collections).items():
+        group = set(collection_names)
+        indexes = [index for index, names in enumerate(relevant_collections) if group.intersection(names)]
+        group_collections = [[name for name in relevant_collections[index] if name in group] for index in indexes]
+        if model_name == embedder_service.model_name:
+            group_vectors = [vectors[index] for index in indexes]
+        else:
+            group_vectors = _embed_questions(model_name, [questions[index] for index in indexes])
+
+        candidate_documents = None
+        if TWO_LEVEL_RETRIEVAL:
+            candidate_documents = qdrant_service.search_documents_batch(
+                group_vectors, DOCUMENT_CANDIDATES, [_summarized(names) for names in group_collections], search_params
+            )
+        found = qdrant_service.search_questions(group_vectors, MAXIMUM_CHUNK_TOP, group_collections, THRESHOLD, search_params, candidate_documents)
+        for index, chunks_by_doc in zip(indexes, found):
+            for doc_hash, chunks in chunks_by_doc.items():
+                initial_chunks[index].setdefault(doc_hash, []).extend(chunks)
+
+    results = [{"question": question, "success": False} for question in questions]
+    pending = []  # índices das perguntas que seguem para o re-ranqueamento
+    for index, chunks in enumerate(initial_chunks):
+        if not relevant_collections[index]:
+            results[index]["message"] = "Nenhuma coleção relevante encontrada para a pergunta"
+        elif not chunks:
+            results[index]["message"] = "Não foram encontrados documentos para a pergunta"
+        else:
+            pending.append(index)
+
+    if limit_context:
+        contexts = _batch_neighbour_context([initial_chunks[index] for index in pending])
+    else:
+        contexts = _batch_document_context([initial_chunks[index] for index in pending], [relevant_collections[index] for index in pending])
+
+    to_rerank = []
+    for index, context in zip(pending, contexts):
+        if context is None:
+            results[index]["message"] = "Falha de sincronia entre o banco de vetores e os metadados."
+        elif not context:
+            results[index]["message"] = "Não foi possível montar o contexto expandido para a resposta."
+        else:
+            to_rerank.append((index, context))
+
+    # Chunks comuns a várias perguntas são o mesmo objeto: cada texto é lido uma única vez
+    qdrant_service.load_texts([chunk for _, context in to_rerank for chunks in context.values() for chunk in chunks])
+
+    # Cada parte do re-ranqueamento em lote ocupa uma vaga do controle de admissão
+    reranked = reranker_service.rerank_batch(
+        [questions[index] for index, _ in to_rerank], [context for _, context in to_rerank], slot=rerank_pool.slot
+    )
+    print(f"INFO: {len(to_rerank)} de {len(questions)} perguntas re-ranqueadas.")
+
+    to_answer = []
+    for (index, _), reranked_result in zip(to_rerank, reranked):
+        if any(reranked_result.values()):
+            to_answer.append((index, reranked_result))
+        else:
+            results[index]["message"] = "Após o re-ranqueamento, nenhum chunk foi considerado relevante o suficiente para a pergunta."
+
+    if to_answer:
+        llm = AnswerLLM()
+        with ThreadPoolExecutor(max_workers=BATCH_LLM_CONCURRENCY) as executor:
+            answers = executor.map(lambda item: llm.answer_llm(questions[item[0]], BACKEND_BASE_URL, item[1]), to_answer)
+            for (index, _), answer in zip(to_answer, answers):
+                results[index].update({"answer": answer, "success": True})
+
+    return {"results": results, "success": True}
+
+
+def _collections_by_model(collection_names: list[str]) -> dict[str, list[str]]:
+    """
+    Coleções agrupadas pelo modelo de embedding da geração atrás do alias de cada uma. Durante a migração
+    de uma coleção para outro modelo, ela continua sendo consultada com o modelo antigo até a troca do alias.
+    """
+    groups = defaultdict(list)
+    for collection_name in collection_names:
+        groups[registry_service.get_collection_model(collection_name)].append(collection_name)
+    return dict(groups)
+
+
+def _summarized(collection_names: list[str]) -> list[str]:
+    """
+    Coleções em que a busca de chunks pode ser restrita aos documentos candidatos. As demais têm
+    documentos sem vetores-resumo (indexados antes deles) e continuam sendo buscadas inteiras.
+    """
+    return [name for name in collection_names if registry_service.is_collection_summarized(name)]
+
+
+def _embed_questions(model_name: str, questions: list[str]):
+    """Embeddings das perguntas com o modelo de coleções que não usam o modelo configurado."""
+    with embedding_pool.slot():
+        return get_embedder_for_model(model_name).embed_texts(questions)
+
+
+def _search_params(collection_names: list[str]) -> dict:
+    """Cada coleção é consultada com os parâmetros de busca do seu perfil."""
+    return {
+        collection_name: build_search_params(registry_service.get_collection_profile(collection_name))
+        for collection_name in collection_names
+    }
+
+
+def _related_hashes_by_collection(relevant_collections: list[str], doc_hashes: list[str]) -> dict | None:
+    """
+    Hashes dos documentos encontrados e de seus relacionados, agrupados pela coleção de cada um.
+    Retorna None quando os hashes do Qdrant não têm registro no MongoDB.
+    """
+    return _related_hashes_per_question([relevant_collections], [doc_hashes])[0]
+
+
+def _related_hashes_per_question(relevant_collections: list[list[str]], doc_hashes: list[list[str]]) -> list[dict | None]:
+    """
+    `_related_hashes_by_collection` de várias perguntas com uma única consulta de metadados e uma única
+    expansão de relacionados, sobre a união dos hashes; o resultado é separado por pergunta depois.
+    """
+    all_collections = list({name for names in relevant_collections for name in names})
+    all_hashes = list({doc_hash for hashes in doc_hashes for doc_hash in hashes})
+
+    # Busca os metadados dos documentos encontrados para obter seus IDs
+    all_metadata_records = metadata_service.get_documents_by_hashes_in_collections(all_collections, all_hashes)
+    print(f"[DEBUG 3] Total de {len(all_metadata_records)} registros de metadados encontrados.")
+
+    records_by_key = defaultdict(list)
+    for record in all_metadata_records:
+        records_by_key[(record["collection_name"], record["active_version_hash"])].append(record["id"])
+    families = metadata_service.find_related_families([record["id"] for record in all_metadata_records])
+
+    results = []
+    for collections, hashes in zip(relevant_collections, doc_hashes):
+        doc_ids_found = [doc_id for name in collections for doc_hash in hashes for doc_id in records_by_key.get((name, doc_hash), [])]
+        if not doc_ids_found:
+            print("!!! ERRO CRÍTICO DE SINCRONIA: Hashes existem no Qdrant, mas não foram encontrados no MongoDB.")
+            results.append(None)
+            continue
+
+        related_documents = {record["id"]: record for doc_id in doc_ids_found for record in families.get(doc_id, [])}
+        print(f"[DEBUG 4] Contexto expandido para {len(related_documents)} documentos relacionados.")
+
+        # Agrupar os documentos relacionados por sua coleção original
+        hashes_by_collection = defaultdict(list)
+        for doc in related_documents.values():
+            collection_name = doc.get("collection_name")
+            doc_hash = doc.get("active_version_hash")
+            if collection_name and doc_hash:
+                hashes_by_collection[collection_name].append(doc_hash)
+        results.append(dict(hashes_by_collection))
+    return results
+
+
+def _page_window_chunks(legacy_hits: list[dict], window_cache: dict | None = None) -> list[dict]:
+    """
+    Chunks na janela de páginas dos resultados de pontos indexados antes dos IDs determinísticos.
+    `window_cache` reaproveita janelas já buscadas para outras perguntas do mesmo lote.
+    """
+    relevant_pages_by_doc = defaultdict(lambda: {'pages': set(), 'collection': ''})
+    for chunk in legacy_hits:
+        relevant_pages_by_doc[chunk['document_id']]['collection'] = chunk['collection']
+        relevant_pages_by_doc[chunk['document_id']]['pages'].add(chunk['page'])
+
+    if relevant_pages_by_doc:
+        print(f"INFO: {len(relevant_pages_by_doc)} documento(s) sem IDs determinísticos; usando Janela de Contexto (+/- {CONTEXT_WINDOW_SIZE} páginas).")
+
+    # Busca os chunks dentro da janela de contexto para cada documento
+    all_window_chunks = []
+    for doc_hash, data in relevant_pages_by_doc.items():
+        pages = {page for page in data['pages'] if page is not None}
+        if not pages or not data['collection']:
+            continue
+
+        min_page = max(1, min(pages) - CONTEXT_WINDOW_SIZE)
+        max_page = max(pages) + CONTEXT_WINDOW_SIZE
+
+        key = (data['collection'], doc_hash, min_page, max_page)
+        if window_cache is not None and key in window_cache:
+            all_window_chunks.extend(window_cache[key])
+            continue
+
+        chunks_from_window = qdrant_service.get_chunks_by_page_window(
+            collection_name=data['collection'],
+            doc_hash=doc_hash,
+            min_page=min_page,
+            max_page=max_page
+        )
+        if window_cache is not None:
+            window_cache[key] = chunks_from_window
+        all_window_chunks.extend(chunks_from_window)
+    return all_window_chunks
+
+
+def _batch_neighbour_context(initial_chunks: list[dict]) -> list[dict]:
+    """
+    Contexto por vizinhança de várias perguntas: os vizinhos de todos os resultados (sem repetição)
+    são buscados de uma vez e distribuídos entre as perguntas que os pediram.
+    """
+    hits_by_point = {}
+    for chunks_by_doc in initial_chunks:
+        for chunks in chunks_by_doc.values():
+            for chunk in chunks:
+                hits_by_point.setdefault(chunk["point_id"], chunk)
+
+    neighbour_chunks, legacy_hits = qdrant_service.get_neighbour_chunks(list(hits_by_point.values()), CONTEXT_NEIGHBOUR_CHUNKS)
+    pool = {
+        (chunk["collection"], chunk["document_id"], chunk["chunk_index"]): chunk
+        for chunks in neighbour_chunks.values() for chunk in chunks
+    }
+    legacy_points = {chunk["point_id"] for chunk in legacy_hits}
+
+    window_cache = {}
+    contexts = []
+    for chunks_by_doc in initial_chunks:
+        hits = [chunk for chunks in chunks_by_doc.values() for chunk in chunks]
+        wanted = {
+            (hit["collection"], hit["document_id"], index)
+            for hit in hits if hit["point_id"] not in legacy_points
+            for index in range(hit["chunk_index"] - CONTEXT_NEIGHBOUR_CHUNKS, hit["chunk_index"] + CONTEXT_NEIGHBOUR_CHUNKS + 1)
+        }
+
+        grouped = defaultdict(list)
+        for key in sorted(wanted & pool.keys(), key=lambda k: (k[1], k[2])):
+            grouped[key[1]].append(pool[key])
+        for chunk in _page_window_chunks([hit for hit in hits if hit["point_id"] in legacy_points], window_cache):
+            grouped[chunk["document_id"]].append(chunk)
+        contexts.append(dict(grouped))
+    return contexts
+
+
+def _batch_document_context(initial_chunks: list[dict], relevant_collections: list[list[str]]) -> list[dict | None]:
+    """
+    Contexto de documento inteiro de várias perguntas: os chunks de cada documento são buscados uma única
+    vez no Qdrant, mesmo quando o documento aparece no contexto de várias perguntas.
+    None indica falha de sincronia com o MongoDB para a pergunta.
+    """
+    hashes_per_question = _related_hashes_per_question(relevant_collections, [list(chunks_by_doc.keys()) for chunks_by_doc in initial_chunks])
+
+    hashes_by_collection = defaultdict(set)
+    for hashes in hashes_per_question:
+        for collection_name, doc_hashes in (hashes or {}).items():
+            hashes_by_collection[collection_name].update(doc_hashes)
+
+    pool = {
+        collection_name: qdrant_service.get_all_chunks_by_doc_hashes(collection_name, list(doc_hashes))
+        for collection_name, doc_hashes in hashes_by_collection.items()
+    }
+    print(f"INFO: Chunks de {sum(len(h) for h in hashes_by_collection.values())} documento(s) distintos buscados para {len(initial_chunks)} perguntas.")
+
+    contexts = []
+    for hashes in hashes_per_question:
+        if hashes is None:
+            contexts.append(None)
+            continue
+        context = {}
+        for collection_name, doc_hashes in hashes.items():
+            for doc_hash in doc_hashes:
+                if doc_hash in pool[collection_name]:
+                    context[doc_hash] = pool[collection_name][doc_hash]
+        contexts.append(context)
+    return contexts
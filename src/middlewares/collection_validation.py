@@ -1,10 +1,13 @@
+import re
+
 from fastapi import HTTPException
 
-from services.container import get_qdrant_service
-from services.vectorstore.qdrant_service import QdrantService
+from config.collection_profiles import COLLECTION_PROFILES
+from services.container import LazyService, get_registry_service
+from services.vectorstore.qdrant_service import GENERATION_SEPARATOR
 
 # Instância do service
-qdrant_service = get_qdrant_service()
+registry_service = LazyService(get_registry_service)
 
 class CollectionValidation:
     @staticmethod
@@ -12,12 +15,23 @@ class CollectionValidation:
         if not collection_name:
             raise HTTPException(status_code=400, detail={"message": "Nome da coleção não pode ser vazio", "success": False})
     
+    @staticmethod
+    def collection_name_not_reserved(collection_name: str):
+        # Nomes como "x__g2" colidem com as gerações físicas das coleções (aliases)
+        if re.search(rf"{re.escape(GENERATION_SEPARATOR)}\d+", collection_name):
+            raise HTTPException(status_code=400, detail={"message": f"Nome da coleção não pode conter '{GENERATION_SEPARATOR}' seguido de números", "success": False})
+
     @staticmethod
     def collection_exists(collection_name: str):
-        if not qdrant_service.collection_exists(collection_name):
+        if not registry_service.collection_exists(collection_name):
             raise HTTPException(status_code=404, detail={"message": "Collection não existe", "success": False})
         
     @staticmethod
     def collection_does_not_exist(collection_name: str):
-        if qdrant_service.collection_exists(collection_name):
-            raise HTTPException(status_code=400, detail={"message": "Collection não existe", "success": False})
\ No newline at end of file
+        if registry_service.collection_exists(collection_name):
+            raise HTTPException(status_code=400, detail={"message": "Collection não existe", "success": False})
+
+    @staticmethod
+    def profile_exists(profile: str):
+        if profile not in COLLECTION_PROFILES:
+            raise HTTPException(status_code=400, detail={"message": f"Perfil inválido. Opções: {', '.join(COLLECTION_PROFILES)}", "success": False})
\ No newline at end of file
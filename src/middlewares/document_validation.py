@@ -1,11 +1,10 @@
 from fastapi import HTTPException
 
-from services.container import get_qdrant_service, get_metadata_service
-from services.vectorstore.qdrant_service import QdrantService
+from services.container import LazyService, get_registry_service
+from utils.upload_buffer import UPLOAD_MAX_SIZE, UPLOAD_MULTIPART_OVERHEAD
 
 # Instância do service
-qdrant_service = get_qdrant_service()
-metadata_service = get_metadata_service()
+registry_service = LazyService(get_registry_service)
 
 class DcoumentValidation:
     @staticmethod
@@ -18,25 +17,36 @@ class DcoumentValidation:
         if not file_name.endswith(('.pdf', '.txt', '.docx')):
             raise HTTPException(status_code=400, detail={"message": "Formato de arquivo inválido", "success": False})
 
+    @staticmethod
+    def document_size(size: int | None):
+        if size is not None and size > UPLOAD_MAX_SIZE:
+            raise HTTPException(status_code=413, detail={"message": f"Arquivo excede o tamanho máximo de {UPLOAD_MAX_SIZE} bytes", "success": False})
+
+    @staticmethod
+    def request_size(content_length: int | None):
+        """Pré-checagem pelo Content-Length do corpo multipart, que inclui delimitadores e cabeçalhos além do arquivo."""
+        if content_length is not None and content_length > UPLOAD_MAX_SIZE + UPLOAD_MULTIPART_OVERHEAD:
+            DcoumentValidation.document_size(content_length)
+
     @staticmethod
     def document_exists(doc_hash: str, collection_name: str):
-        if qdrant_service.document_exists(doc_hash, collection_name):
+        if registry_service.document_exists(doc_hash, collection_name):
             raise HTTPException(status_code=400, detail={"message": "Documento já existe na base", "success": False})
         
     @staticmethod
     def document_not_exists(doc_hash: str, collection_name: str):
-        if not qdrant_service.document_exists(doc_hash, collection_name):
+        if not registry_service.document_exists(doc_hash, collection_name):
             raise HTTPException(status_code=400, detail={"message": "Documento não existe na base", "success": False})
         
     @staticmethod
     def document_id_exists(doc_id: str):
-        if not metadata_service.get_document_by_id(doc_id):
+        if not registry_service.document_id_exists(doc_id):
             raise HTTPException(status_code=404, detail={"message": f"Documento com ID '{doc_id}' não encontrado", "success": False})
         
     @staticmethod
     def document_content_exists(collection_name: str, doc_hash: str):
         """Verifica no banco de metadados se um documento com o mesmo hash já foi registrado."""
-        if metadata_service.get_document_by_hash(collection_name, doc_hash):
+        if registry_service.document_exists(doc_hash, collection_name):
             raise HTTPException(
                 status_code=409,
                 detail={"message": "Um documento com este mesmo conteúdo já existe na coleção", "success": False}
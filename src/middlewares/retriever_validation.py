@@ -1,8 +1,23 @@
+import os
+
+from dotenv import load_dotenv
 from fastapi import HTTPException
 
+load_dotenv()
+
+# Máximo de perguntas aceitas em uma requisição do endpoint em lote
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 200))
+
 
 class RetrieverValidation:
     def query(question: str):
         if not question:
             raise HTTPException(status_code=400, detail="A pergunta não pode ser vazia.")
-        return question
\ No newline at end of file
+        return question
+
+    def questions(questions: list[str]):
+        if not questions or any(not question for question in questions):
+            raise HTTPException(status_code=400, detail="A lista de perguntas não pode ser vazia nem conter perguntas vazias.")
+        if len(questions) > BATCH_MAX_QUESTIONS:
+            raise HTTPException(status_code=400, detail=f"Máximo de {BATCH_MAX_QUESTIONS} perguntas por requisição.")
+        return questions
@@ -0,0 +1,202 @@
+"""
+Launcher de produção com pré-fork.
+
+O processo mestre carrega os modelos (SentenceTransformer e CrossEncoder) uma única vez e só
+depois cria os workers com fork, que compartilham os pesos por copy-on-write. Cada worker fixa
+o número de threads do torch e o mestre reporta periodicamente a memória residente/proporcional
+de cada worker e a distribuição das requisições.
+
+Uso (a partir da raiz do projeto, apenas Linux/macOS):
+    python src/prefork_server.py --workers 4
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from multiprocessing import Array
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+env_file = ".env.test" if os.getenv("ENV") == "test" else ".env"
+load_dotenv(env_file)
+
+PORT = int(os.getenv("PORT", 3333))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 2))
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", 0))
+WORKER_REPORT_INTERVAL = float(os.getenv("WORKER_REPORT_INTERVAL", 30))
+
+
+def preload_models():
+    """Carrega os modelos no mestre, antes do fork."""
+    from services.container import get_embedder_service, get_reranker_service
+
+    print("INFO: Pré-carregando modelos no processo mestre...")
+    get_embedder_service()
+    get_reranker_service()
+
+    # Move os objetos já existentes para uma geração permanente: o coletor de lixo dos
+    # workers não os percorre, evitando cópias de página desnecessárias
+    gc.collect()
+    gc.freeze()
+
+
+def read_memory(pid: int) -> dict:
+    """Lê RSS, PSS e memória compartilhada (em MB) de um processo via /proc."""
+    memory = {"rss_mb": None, "pss_mb": None, "shared_mb": None}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            values = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+        memory["rss_mb"] = round(values.get("Rss", 0) / 1024, 1)
+        memory["pss_mb"] = round(values.get("Pss", 0) / 1024, 1)
+        memory["shared_mb"] = round((values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def run_worker(index: int, sock: socket.socket, request_counts, torch_threads: int):
+    """Corpo de cada worker após o fork."""
+    import torch
+    import uvicorn
+
+    torch.set_num_threads(torch_threads)
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+
+    from app import get_app
+
+    app = get_app()
+
+    @app.middleware("http")
+    async def count_requests(request, call_next):
+        # Cada worker escreve apenas na sua posição do array compartilhado
+        request_counts[index] += 1
+        return await call_next(request)
+
+    config = uvicorn.Config(app, lifespan="on", log_level=os.getenv("LOG_LEVEL", "info"))
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+class PreforkMaster:
+    def __init__(self, host: str, port: int, workers: int, torch_threads: int, report_interval: float):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.torch_threads = torch_threads
+        self.report_interval = report_interval
+
+        self.request_counts = Array("Q", workers, lock=False)
+        self.workers = {}  # índice -> pid
+        self.sock = None
+        self.stopping = False
+
+    def bind(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+    def spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                run_worker(index, self.sock, self.request_counts, self.torch_threads)
+            except BaseException:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self.workers[index] = pid
+        print(f"INFO: Worker {index} iniciado (pid {pid}).")
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def report(self):
+        total = sum(self.request_counts) or 1
+        master = read_memory(os.getpid())
+        print("\n----------- WORKERS -----------")
+        print(f"mestre pid={os.getpid()} rss={master['rss_mb']}MB pss={master['pss_mb']}MB")
+        print(f"{'worker':<8}{'pid':>8}{'rss MB':>10}{'pss MB':>10}{'shared MB':>11}{'reqs':>9}{'%':>7}")
+        for index, pid in sorted(self.workers.items()):
+            memory = read_memory(pid)
+            count = self.request_counts[index]
+            print(f"{index:<8}{pid:>8}{str(memory['rss_mb']):>10}{str(memory['pss_mb']):>10}"
+                  f"{str(memory['shared_mb']):>11}{count:>9}{round(100 * count / total, 1):>7}")
+        print("-------------------------------\n")
+
+    def run(self):
+        self.bind()
+        preload_models()
+
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for index in range(self.num_workers):
+            self.spawn(index)
+
+        print(f"INFO: {self.num_workers} worker(s) ouvindo em http://{self.host}:{self.port} "
+              f"({self.torch_threads} thread(s) do torch por worker).")
+
+        next_report = time.monotonic() + self.report_interval
+        while not self.stopping:
+            # Recria workers que terminaram inesperadamente
+            for index, pid in list(self.workers.items()):
+                finished_pid, status = os.waitpid(pid, os.WNOHANG)
+                if finished_pid and not self.stopping:
+                    print(f"[ERRO] Worker {index} (pid {pid}) terminou com status {status}. Recriando...")
+                    self.spawn(index)
+
+            if self.report_interval > 0 and time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + self.report_interval
+            time.sleep(1)
+
+        print("INFO: Encerrando workers...")
+        for pid in self.workers.values():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in self.workers.values():
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.report()
+        self.sock.close()
+
+
+def main():
+    if not hasattr(os, "fork"):
+        sys.exit("O launcher com pré-fork requer os.fork (Linux/macOS). Use src/server.py no Windows.")
+
+    parser = argparse.ArgumentParser(description="Servidor com pré-fork e modelos compartilhados por copy-on-write.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--torch-threads", type=int, default=TORCH_THREADS_PER_WORKER,
+                        help="Threads do torch por worker (padrão: núcleos / workers).")
+    parser.add_argument("--report-interval", type=float, default=WORKER_REPORT_INTERVAL,
+                        help="Intervalo, em segundos, do relatório de memória e requisições (0 desativa).")
+    args = parser.parse_args()
+
+    torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    PreforkMaster(args.host, args.port, args.workers, torch_threads, args.report_interval).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 
 from routes import (collections_route, documents_route, generate_token_route,
+                    health_route, metrics_route, migrations_route,
                     retriever_route)
 
 
@@ -9,4 +10,7 @@ def include_routes(app: FastAPI):
     app.include_router(documents_route.router)
     app.include_router(retriever_route.router)
     app.include_router(generate_token_route.router)
+    app.include_router(metrics_route.router)
+    app.include_router(migrations_route.router)
+    app.include_router(health_route.router)
 
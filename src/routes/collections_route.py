@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends
 
+from config.collection_profiles import DEFAULT_PROFILE
 from controllers.collection_controller import (create_collection_controller,
                                                delete_collection_controller,
                                                get_collection_controller,
-                                               list_collections_controller)
+                                               list_collections_controller,
+                                               list_profiles_controller)
 from middlewares.collection_validation import CollectionValidation
 from middlewares.token_validation import bearer_token_validation
 
@@ -14,15 +16,21 @@ router = APIRouter(
 )
 
 @router.post("/create")
-def create_collection(collection_name: str):
+def create_collection(collection_name: str, profile: str = DEFAULT_PROFILE):
     CollectionValidation.collection_name_not_empty(collection_name)
+    CollectionValidation.collection_name_not_reserved(collection_name)
     CollectionValidation.collection_does_not_exist(collection_name)
-    return create_collection_controller(collection_name, vector_size=384)
+    CollectionValidation.profile_exists(profile)
+    return create_collection_controller(collection_name, profile)
 
 @router.get("/list")
 def list_collections():
     return list_collections_controller()
 
+@router.get("/profiles")
+def list_profiles():
+    return list_profiles_controller()
+
 @router.get("/")
 def get_collection(collection_name: str):
     CollectionValidation.collection_name_not_empty(collection_name)
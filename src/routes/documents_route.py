@@ -1,56 +1,86 @@
 # documents_route.py
-import io
-from fastapi import APIRouter, Depends, File, Query, UploadFile, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, Query, Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
 
 from controllers.document_controller import (delete_document_controller,
                                              upload_document_controller, download_document_controller)
 from middlewares.collection_validation import CollectionValidation
 from middlewares.document_validation import DcoumentValidation
 from middlewares.token_validation import bearer_token_validation
-from services.container import get_metadata_service
-from utils.hashing import hash_file
+from utils.executors import run_io
+from utils.streaming import (RangeNotSatisfiable, etag_matches,
+                             iter_gridfs_file, parse_byte_range)
+from utils.upload_buffer import InvalidUpload, UploadBuffer, UploadTooLarge
 
 router = APIRouter(
     prefix="/document",
     tags=["Documentos"]
 )
 
-@router.post("/upload", dependencies=[Depends(bearer_token_validation)])
+# O corpo é lido em stream pela rota (sem UploadFile), então o formulário é descrito aqui para a documentação
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"]
+        }}}
+    }
+}
+
+@router.post("/upload", dependencies=[Depends(bearer_token_validation)], openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_document(
-    file: UploadFile = File(...),
+    request: Request,
     collection_name: str = Query(...),
     document_id_to_update: str = Query(None, description="ID do documento a ser ATUALIZADO (versionamento)."),
-    parent_document_id: str = Query(None, description="ID do documento principal ao qual este novo se relaciona (ex: Contrato Pai).")
+    parent_document_id: str = Query(None, description="ID do documento principal ao qual este novo se relaciona (ex: Contrato Pai)."),
+    content_length: int | None = Header(None, alias="Content-Length")
 ):
-    contents = await file.read()
-    hash_document = hash_file(contents)
+    # Rejeita antes de ler o corpo os uploads que já declaram um tamanho acima do limite
+    DcoumentValidation.request_size(content_length)
 
-    CollectionValidation.collection_name_not_empty(collection_name)
+    # Lê o corpo em stream direto para o buffer, calculando o hash incrementalmente
+    try:
+        upload = await UploadBuffer.from_request(request)
+    except UploadTooLarge as e:
+        DcoumentValidation.document_size(e.size)
+        raise
+    except InvalidUpload as e:
+        raise HTTPException(status_code=400, detail={"message": str(e), "success": False})
+
+    try:
+        hash_document = upload.hexdigest
+
+        CollectionValidation.collection_name_not_empty(collection_name)
+        DcoumentValidation.document_extension(upload.filename)
+        # As validações no registro podem recarregá-lo ou consultar as bases: rodam fora do event loop
+        await run_io(_validate_upload, hash_document, collection_name, document_id_to_update, parent_document_id)
+
+        # Chama o controller, passando o buffer do arquivo
+        response = await upload_document_controller(
+            hash_document=hash_document,
+            upload=upload,
+            filename=upload.filename,
+            collection_name=collection_name,
+            document_id_to_update=document_id_to_update,
+            parent_document_id=parent_document_id
+        )
+    finally:
+        upload.close()
+        
+    return response
+
+def _validate_upload(hash_document: str, collection_name: str, document_id_to_update: str | None, parent_document_id: str | None):
     CollectionValidation.collection_exists(collection_name)
-    DcoumentValidation.document_extension(file.filename)
     DcoumentValidation.document_exists(hash_document, collection_name)
 
     if document_id_to_update:
         DcoumentValidation.document_id_exists(document_id_to_update)
-    else:
-        pass
-    
+
     if parent_document_id:
         DcoumentValidation.document_id_exists(parent_document_id)
 
-    # Chama o controller, passando o conteúdo do arquivo
-    response = upload_document_controller(
-        hash_document=hash_document,
-        file_content=contents,
-        filename=file.filename,
-        collection_name=collection_name,
-        document_id_to_update=document_id_to_update,
-        parent_document_id=parent_document_id
-    )
-        
-    return response
-
 @router.delete("/{doc_id}", dependencies=[Depends(bearer_token_validation)])
 def delete_document(doc_id: str, collection_name: str = Query(...)):
     CollectionValidation.collection_name_not_empty(collection_name)
@@ -60,7 +90,11 @@ def delete_document(doc_id: str, collection_name: str = Query(...)):
     return delete_document_controller(doc_id, collection_name)
 
 @router.get("/download/{doc_hash}")
-def download_document(doc_hash: str):
+def download_document(
+    doc_hash: str,
+    range_header: str | None = Header(None, alias="Range"),
+    if_none_match: str | None = Header(None, alias="If-None-Match")
+):
 
     document_file = download_document_controller(doc_hash)
     if not document_file["success"]:
@@ -68,15 +102,45 @@ def download_document(doc_hash: str):
     
     gridfs_file = document_file.get("file")
 
-# Verificação de segurança caso a chave 'file' não exista por algum motivo
+    # Verificação de segurança caso a chave 'file' não exista por algum motivo
     if not gridfs_file:
         raise HTTPException(status_code=500, detail="Arquivo não encontrado no resultado do controller.")
-    
-    return StreamingResponse(
-        content=io.BytesIO(gridfs_file.read()),
 
-        media_type=gridfs_file.content_type,
+    # O hash é endereçado por conteúdo, então serve como ETag forte
+    etag = f'"{document_file["hash"]}"'
+    headers = {
+        "Content-Disposition": f"attachment; filename=\"{gridfs_upload.filename}\"",
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=0, must-revalidate"
+    }
 
-        headers={"Content-Disposition": f"attachment; filename=\"{gridfs_file.filename}\""}
+    if etag_matches(if_none_match, etag):
+        gridfs_file.close()
+        # O 304 repete os validadores e a política de cache que o 200 enviaria (RFC 9110, 15.4.5)
+        return Response(status_code=304, headers={"ETag": headers["ETag"], "Cache-Control": headers["Cache-Control"]})
+
+    total_length = gridfs_file.length
+    try:
+        byte_range = parse_byte_range(range_header, total_length)
+    except RangeNotSatisfiable:
+        gridfs_file.close()
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{total_length}"})
+
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{total_length}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            content=iter_gridfs_file(gridfs_file, start=start, length=end - start + 1),
+            status_code=206,
+            media_type=gridfs_file.content_type,
+            headers=headers
+        )
+
+    headers["Content-Length"] = str(total_length)
+    return StreamingResponse(
+        content=iter_gridfs_file(gridfs_file),
+        media_type=gridfs_file.content_type,
+        headers=headers
     )
-    
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Response
+
+from controllers.health_controller import (liveness_controller,
+                                           readiness_controller)
+
+# Sem autenticação: consultadas pelo orquestrador (probes de liveness/readiness)
+router = APIRouter(
+    prefix="/health",
+    tags=["Saúde"]
+)
+
+# O processo está no ar (não depende das bases nem dos modelos)
+@router.get("/live")
+def live():
+    return liveness_controller()
+
+# Modelos carregados e bases acessíveis: só então o tráfego deve ser liberado
+@router.get("/ready")
+def ready(response: Response):
+    result = readiness_controller()
+    if not result["success"]:
+        response.status_code = 503
+    return result
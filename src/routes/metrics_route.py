@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+
+from controllers.metrics_controller import (admission_metrics_controller,
+                                            cache_metrics_controller,
+                                            inference_metrics_controller)
+from middlewares.token_validation import bearer_token_validation
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Métricas"],
+    dependencies=[Depends(bearer_token_validation)]
+)
+
+@router.get("/cache")
+def cache_metrics():
+    return cache_metrics_controller()
+
+@router.get("/inference")
+def inference_metrics():
+    return inference_metrics_controller()
+
+# Vagas, filas e tempos de espera do controle de admissão das etapas pesadas
+@router.get("/admission")
+def admission_metrics():
+    return admission_metrics_controller()
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+
+from controllers.migration_controller import (migration_status_controller,
+                                              start_migration_controller)
+from middlewares.collection_validation import CollectionValidation
+from middlewares.token_validation import bearer_token_validation
+
+router = APIRouter(
+    prefix="/migrations",
+    tags=["Migrações"],
+    dependencies=[Depends(bearer_token_validation)]
+)
+
+@router.post("/start")
+def start_migration(collection_name: str, rechunk: bool = False):
+    CollectionValidation.collection_name_not_empty(collection_name)
+    CollectionValidation.collection_exists(collection_name)
+    return start_migration_controller(collection_name, rechunk)
+
+@router.get("/status")
+def migration_status(collection_name: str | None = None):
+    return migration_status_controller(collection_name)
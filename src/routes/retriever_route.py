@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Body, Depends, Query
 
-from controllers.retriever_controller import retriever
+from controllers.retriever_controller import retriever, retriever_batch
 from middlewares.retriever_validation import RetrieverValidation
 from middlewares.token_validation import bearer_token_validation
 
@@ -11,10 +11,20 @@ router = APIRouter(
     dependencies=[Depends(bearer_token_validation)]
 )
 
+# Rota síncrona: o FastAPI a executa no threadpool, sem bloquear o event loop
 @router.get("/")
-async def ask(query: str,
-              collections: list[str] | None = Query(None, description="(Opcional) Lista de coleções para a busca. Se omitido, o sistema tentará detectar as mais relevantes."),
-              limit_context: bool = Query(False, description="Se True, busca um contexto limitado (+/- N páginas). Se False, busca o documento inteiro.")):
+def ask(query: str,
+        collections: list[str] | None = Query(None, description="(Opcional) Lista de coleções para a busca. Se omitido, o sistema tentará detectar as mais relevantes."),
+        limit_context: bool = Query(False, description="Se True, busca um contexto limitado (+/- N páginas). Se False, busca o documento inteiro.")):
     RetrieverValidation.query(query)
     retrieved_chunks = retriever(query, collections, limit_context)
-    return retrieved_chunks
\ No newline at end of file
+    return retrieved_chunks
+
+# Várias perguntas em uma requisição (avaliações, geração de FAQ): embedding, buscas e re-ranqueamento
+# são feitos em lote e o resultado vem por pergunta, na ordem enviada
+@router.post("/batch")
+def ask_batch(questions: list[str] = Body(..., embed=True, description="Perguntas a responder."),
+              collections: list[str] | None = Query(None, description="(Opcional) Lista de coleções para todas as perguntas. Se omitido, as coleções são detectadas por pergunta."),
+              limit_context: bool = Query(False, description="Se True, busca um contexto limitado (+/- N chunks). Se False, busca o documento inteiro.")):
+    RetrieverValidation.questions(questions)
+    return retriever_batch(questions, collections, limit_context)
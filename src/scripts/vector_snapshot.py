@@ -0,0 +1,254 @@
+# src/scripts/vector_snapshot.py
+"""
+Exporta e importa os pontos de uma coleção (vetores + payload) sem passar de novo por extração,
+OCR e embedding, e confere a consistência entre o Qdrant e os registros `documents` do MongoDB.
+
+Formato do snapshot (um diretório):
+    manifest.json     coleção, dimensão, perfil, modelo de embedding, quantidade de pontos
+    vectors.npy       matriz float32 (N x dimensão), lida com memmap na importação
+    payload.parquet   uma linha por ponto: id, doc_id, filename, chunk_id, page, text, collection,
+                      kind/summary (preenchidos só nos vetores-resumo de documentos)
+
+Uso (a partir da raiz do projeto):
+    python src/scripts/vector_snapshot.py export --collection micologia --output snapshots/micologia
+    python src/scripts/vector_snapshot.py import --input snapshots/micologia [--collection micologia-copia]
+    python src/scripts/vector_snapshot.py check --collection micologia
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SRC_DIR))
+
+import numpy as np  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+from qdrant_client.http.models import PointStruct  # noqa: E402
+
+from config.collection_profiles import DEFAULT_PROFILE  # noqa: E402
+from services.container import get_metadata_service, get_qdrant_service  # noqa: E402
+from services.vectorstore.qdrant_service import DOCUMENT_KIND  # noqa: E402
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+PAYLOAD_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("doc_id", pa.string()),
+    ("filename", pa.string()),
+    ("chunk_id", pa.int64()),
+    ("page", pa.int64()),
+    ("text", pa.string()),
+    ("collection", pa.string()),
+    ("kind", pa.string()),
+    ("summary", pa.string()),
+])
+
+
+def export_collection(collection_name: str, output_dir: Path, batch_size: int) -> dict:
+    qdrant_service = get_qdrant_service()
+    metadata_service = get_metadata_service()
+
+    # O snapshot leva também os vetores-resumo, que o scroll percorre junto com os chunks
+    total = qdrant_service.count_points(collection_name, chunks_only=False)
+    vector_size = qdrant_service.get_vector_size(collection_name)
+    settings = metadata_service.get_collection_settings(collection_name) or {}
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    vectors = np.lib.format.open_memmap(output_dir / "vectors.npy", mode="w+", dtype=np.float32, shape=(total, vector_size))
+
+    written = 0
+    with pq.ParquetWriter(output_dir / "payload.parquet", PAYLOAD_SCHEMA, compression="zstd") as writer:
+        for points in qdrant_service.scroll_points(collection_name, batch_size, with_vectors=True):
+            # Pontos gravados durante a exportação (além da contagem inicial) ficam de fora
+            points = points[:total - written]
+            if not points:
+                break
+
+            vectors[written:written + len(points)] = np.asarray([point.vector for point in points], dtype=np.float32)
+            # Com payload enxuto, o texto é lido do MongoDB: o snapshot sempre leva o texto dos chunks
+            texts = qdrant_service.text_store.get_many([point.payload["text_key"] for point in points if point.payload.get("text_key")]) if qdrant_service.text_store else {}
+            writer.write_table(pa.Table.from_pylist([
+                {
+                    "id": str(point.id),
+                    "doc_id": point.payload.get("doc_id"),
+                    "filename": point.payload.get("filename"),
+                    "chunk_id": point.payload.get("chunk_id"),
+                    "page": point.payload.get("page"),
+                    "text": point.payload.get("text") or texts.get(point.payload.get("text_key")),
+                    "collection": point.payload.get("collection", collection_name),
+                    "kind": point.payload.get("kind"),
+                    "summary": point.payload.get("summary"),
+                }
+                for point in points
+            ], schema=PAYLOAD_SCHEMA))
+
+            written += len(points)
+            print(f"INFO: {written}/{total} pontos exportados.")
+
+    vectors.flush()
+    del vectors
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection": collection_name,
+        "vector_size": vector_size,
+        "profile": settings.get("profile", DEFAULT_PROFILE),
+        # Modelo que gerou os vetores (ausente em coleções anteriores ao registro do modelo)
+        "model_name": settings.get("model_name"),
+        # Se todos os documentos têm vetores-resumo (a busca em dois níveis pode restringir a coleção)
+        "summarized": bool(settings.get("summarized")),
+        "count": written,
+        "exported_at": datetime.now().isoformat(),
+    }
+    (output_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False))
+    return manifest
+
+
+def import_collection(input_dir: Path, target_collection: str | None, batch_size: int, workers: int) -> dict:
+    qdrant_service = get_qdrant_service()
+    metadata_service = get_metadata_service()
+
+    manifest = json.loads((input_dir / "manifest.json").read_text())
+    collection_name = target_collection or manifest["collection"]
+    count = manifest["count"]
+
+    if not qdrant_service.collection_exists(collection_name):
+        if not qdrant_service.create_collection(collection_name, manifest["vector_size"], manifest["profile"]):
+            raise RuntimeError(f"Não foi possível criar a coleção '{collection_name}'.")
+        metadata_service.save_collection_settings(collection_name, manifest["profile"], manifest["vector_size"],
+                                                  manifest.get("model_name"), summarized=manifest.get("summarized", False))
+        print(f"INFO: Coleção '{collection_name}' criada com o perfil '{manifest['profile']}'.")
+    elif not manifest.get("summarized"):
+        # Documentos sem vetores-resumo entram na coleção: ela volta a ser buscada inteira
+        metadata_service.set_collection_summarized(collection_name, False)
+
+    vectors = np.load(input_dir / "vectors.npy", mmap_mode="r")
+    payload_file = pq.ParquetFile(input_dir / "payload.parquet")
+
+    def build_points(rows: list[dict], offset: int) -> list[PointStruct]:
+        points = []
+        for index, row in enumerate(rows):
+            # Vetores-resumo de documentos não têm texto nem página; snapshots antigos não têm kind/summary
+            payload = {key: row.get(key) for key in ("text", "doc_id", "filename", "chunk_id", "page", "kind", "summary") if row.get(key) is not None}
+            payload["collection"] = collection_name
+            points.append(PointStruct(
+                # IDs recalculados para a coleção de destino (pontos antigos, com IDs aleatórios, passam a ter IDs determinísticos)
+                id=qdrant_service.point_id(collection_name, row["doc_id"], row["chunk_id"]),
+                vector=vectors[offset + index].tolist(),
+                payload=payload
+            ))
+        return points
+
+    def upsert_batch(points: list[PointStruct]) -> int:
+        if not qdrant_service.upsert_points(collection_name, points):
+            raise RuntimeError("Falha ao gravar um lote de pontos no Qdrant.")
+        return len(points)
+
+    imported = 0
+    offset = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for batch in payload_file.iter_batches(batch_size=batch_size):
+            rows = batch.to_pylist()[:count - offset]
+            if not rows:
+                break
+            pending.append(executor.submit(upsert_batch, build_points(rows, offset)))
+            offset += len(rows)
+
+            # Limita os lotes em voo para não manter o snapshot inteiro em memória
+            if len(pending) >= workers * 2:
+                imported += pending.pop(0).result()
+                print(f"INFO: {imported}/{count} pontos importados.")
+
+        for future in pending:
+            imported += future.result()
+        print(f"INFO: {imported}/{count} pontos importados.")
+
+    return {"collection": collection_name, "imported": imported}
+
+
+def check_collection(collection_name: str, batch_size: int) -> dict:
+    """Compara os documentos com vetores no Qdrant e os registros do MongoDB da coleção."""
+    qdrant_service = get_qdrant_service()
+    metadata_service = get_metadata_service()
+
+    qdrant_hashes = {}
+    summary_points = 0
+    for points in qdrant_service.scroll_points(collection_name, batch_size):
+        for point in points:
+            doc_hash = point.payload.get("doc_id")
+            qdrant_hashes.setdefault(doc_hash, 0)
+            # Vetores-resumo marcam o documento como presente, mas não contam como pontos de chunks
+            if point.payload.get("kind") == DOCUMENT_KIND:
+                summary_points += 1
+            else:
+                qdrant_hashes[doc_hash] += 1
+
+    mongo_hashes = metadata_service.list_hashes_in_collection(collection_name)
+
+    return {
+        "collection": collection_name,
+        "points": sum(qdrant_hashes.values()),
+        "summary_points": summary_points,
+        "documents_in_qdrant": len(qdrant_hashes),
+        "documents_in_mongo": len(mongo_hashes),
+        # Registros no MongoDB sem vetores (precisam ser reindexados)
+        "missing_in_qdrant": sorted(mongo_hashes[h] for h in mongo_hashes.keys() - qdrant_hashes.keys()),
+        # Vetores sem registro no MongoDB (órfãos)
+        "orphans_in_qdrant": sorted(qdrant_hashes.keys() - mongo_hashes.keys()),
+    }
+
+
+def print_check(report: dict) -> bool:
+    consistent = not report["missing_in_qdrant"] and not report["orphans_in_qdrant"]
+    print(f"\nColeção: {report['collection']}")
+    print(f"Pontos: {report['points']} (+{report['summary_points']} resumos) | documentos no Qdrant: {report['documents_in_qdrant']} | no MongoDB: {report['documents_in_mongo']}")
+    if report["missing_in_qdrant"]:
+        print(f"[ERRO] {len(report['missing_in_qdrant'])} documento(s) do MongoDB sem vetores: {report['missing_in_qdrant']}")
+    if report["orphans_in_qdrant"]:
+        print(f"[ERRO] {len(report['orphans_in_qdrant'])} hash(es) no Qdrant sem registro no MongoDB: {report['orphans_in_qdrant']}")
+    print("Consistente.\n" if consistent else "")
+    return consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação/importação de vetores e checagem de consistência.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Exporta os pontos de uma coleção.")
+    export_parser.add_argument("--collection", required=True)
+    export_parser.add_argument("--output", required=True, help="Diretório do snapshot.")
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+
+    import_parser = subparsers.add_parser("import", help="Importa um snapshot (cria a coleção se preciso).")
+    import_parser.add_argument("--input", required=True, help="Diretório do snapshot.")
+    import_parser.add_argument("--collection", help="Coleção de destino (padrão: a coleção exportada).")
+    import_parser.add_argument("--batch-size", type=int, default=512)
+    import_parser.add_argument("--workers", type=int, default=4, help="Lotes gravados em paralelo.")
+    import_parser.add_argument("--skip-check", action="store_true", help="Não confere a consistência com o MongoDB ao final.")
+
+    check_parser = subparsers.add_parser("check", help="Confere a coleção contra os registros do MongoDB.")
+    check_parser.add_argument("--collection", required=True)
+    check_parser.add_argument("--batch-size", type=int, default=1000)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        manifest = export_collection(args.collection, Path(args.output), args.batch_size)
+        print(f"\nSnapshot de '{manifest['collection']}' salvo em {args.output} ({manifest['count']} pontos).\n")
+    elif args.command == "import":
+        result = import_collection(Path(args.input), args.collection, args.batch_size, args.workers)
+        print(f"\n{result['imported']} pontos importados em '{result['collection']}'.")
+        if not args.skip_check and not print_check(check_collection(result["collection"], 1000)):
+            sys.exit(1)
+    else:
+        if not print_check(check_collection(args.collection, args.batch_size)):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,6 @@ import os
 import uvicorn
 from dotenv import load_dotenv
 
-from app import get_app
-
 # Carrega variáveis de ambiente
 env_file = ".env.test" if os.getenv("ENV") == "test" else ".env"
 load_dotenv(env_file)
@@ -12,4 +10,8 @@ load_dotenv(env_file)
 PORT = int(os.getenv("PORT", 3333))
 
 if __name__ == "__main__":
+    # Importa o app só aqui: processos filhos (executor de processos) reimportam este módulo
+    # e não devem carregar modelos nem abrir conexões
+    from app import get_app
+
     uvicorn.run(get_app(), host="0.0.0.0", port=PORT)
@@ -1,5 +1,7 @@
 # src/services/chunking/chunk_service.py
 import os
+import threading
+
 import nltk
 from dotenv import load_dotenv
 from langdetect import LangDetectException, detect
@@ -10,24 +12,45 @@ load_dotenv()
 
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP"))
+# Quantidade de caracteres usada para detectar o idioma do documento
+LANGUAGE_SAMPLE_CHARS = int(os.getenv("LANGUAGE_SAMPLE_CHARS", 5000))
 
 # Configurar o caminho para os dados do NLTK
 nltk.data.path.append('./nltk_data')
-try:
-    nltk.data.find("tokenizers/punkt/english.pickle")
-    nltk.data.find("tokenizers/punkt/portuguese.pickle")
-except LookupError:
-    print("INFO: Baixando pacotes necessários do NLTK (punkt, wordnet, omw-1.4)...")
-    nltk.download('punkt')
-    nltk.download('wordnet')
-    nltk.download('omw-1.4')
-    print("INFO: Download do NLTK concluído.")
+
+
+def ensure_nltk_data() -> bool:
+    """
+    Garante o tokenizador de sentenças do NLTK (punkt), baixando-o se preciso.
+    Roda no warm-up, não na importação: sem rede, a aplicação sobe e só não fica pronta.
+    """
+    try:
+        nltk.data.find("tokenizers/punkt/english.pickle")
+        nltk.data.find("tokenizers/punkt/portuguese.pickle")
+        return True
+    except LookupError:
+        print("INFO: Baixando o pacote 'punkt' do NLTK...")
+        if not nltk.download('punkt', quiet=True):
+            print("[ERRO] Não foi possível baixar o pacote 'punkt' do NLTK.")
+            return False
+        print("INFO: Download do NLTK concluído.")
+        return True
 
 
 class ChunkerService:
-    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
-        self.chunk_size = chunk_size
-        self.chunk_overlap = overlap
+    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP, tokenizer=None, max_tokens: int | None = None,
+                 tokenizer_lock=None):
+        """
+        `tokenizer` é o tokenizer do modelo de embedding: com ele o tamanho dos chunks é medido
+        nos mesmos tokens que o modelo enxerga. Sem ele, o tamanho é medido em palavras.
+        `max_tokens` é o limite de entrada do modelo; o chunk_size nunca passa dele, para não haver truncamento.
+        `tokenizer_lock` é o lock do embedder que compartilha o tokenizer (não é seguro entre threads).
+        """
+        ensure_nltk_data()
+        self.tokenizer = tokenizer
+        self.tokenizer_lock = tokenizer_lock or threading.Lock()
+        self.chunk_size = min(chunk_size, max_tokens) if max_tokens else chunk_size
+        self.chunk_overlap = min(overlap, self.chunk_size - 1)
     
     def detect_language(self, text: str) -> str:
         try:
@@ -36,16 +59,33 @@ class ChunkerService:
         except LangDetectException:
             return 'english'
 
+    def count_tokens(self, sentences: list[str]) -> list[int]:
+        """Conta os tokens de várias sentenças de uma vez (tokenização em lote)."""
+        if self.tokenizer is None:
+            return [len(sentence.split()) for sentence in sentences]
+        with self.tokenizer_lock:
+            encoded = self.tokenizer(
+                sentences,
+                add_special_tokens=False,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                verbose=False
+            )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _split_long_sentence(self, sentence: str, tokens: int) -> list[str]:
+        """Divide uma sentença maior que o chunk_size em partes de palavras proporcionais."""
+        words = sentence.split()
+        parts = -(-tokens // self.chunk_size) + 1  # margem para a distribuição irregular de tokens
+        size = max(1, -(-len(words) // parts))
+        return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+
     def chunk_document(self, file_path: str, doc_id: str, filename: str):
-        
-        if os.path.splitext(file_path)[1].lower() == ".pdf":
-            if ExtractTextService.is_pdf_searchable(file_path):
-                pages = ExtractTextService.extract_native_text_by_page(file_path)
-            else:
-                pages = ExtractTextService.extract_ocr_text_by_page(file_path)
-        else:
-            pages = [(1, ExtractTextService.extract_text(file_path))]
+        pages = ExtractTextService.extract_pages(file_path, doc_id)
+        return self.chunk_pages(pages, doc_id=doc_id, filename=filename)
 
+    def chunk_pages(self, pages: list[tuple[int, str]], doc_id: str, filename: str):
+        """Gera os chunks a partir do texto já extraído por página."""
         if not pages:
             print(f"INFO: Nenhum texto extraído do documento '{filename}'.")
             return {"message": f"Nenhum texto extraído do documento '{filename}'.", "success": False, }
@@ -55,67 +95,74 @@ class ChunkerService:
         if headers or footers:
             print(f"INFO: Identificados {len(headers)} cabeçalhos e {len(footers)} rodapés para o documento '{filename}'.")
 
-        chunks = []
-        chunk_id = 0
-
-        current_chunk_tokens = []
-        current_length = 0
-        
+        cleaned_pages = []
         for page_number, page_text_raw in pages:
             if ExtractTextService.is_table_of_contents(page_text_raw):
                 print(f"INFO: Página {page_number} ignorada por ser um sumário.")
                 continue
 
             page_text = ExtractTextService.clean_page_text(page_text_raw, headers, footers)
-            if not page_text.strip():
-                continue  # ignora páginas vazias
-
-            language = self.detect_language(page_text)
-            sentences = sent_tokenize(page_text, language=language)
-
-            print(f"\n\nTokenização utilizando NLTK para o idioma: {language}")
-            print(f"{sentences}")
-            print(f"\n\n")
-
-            print(f"TOKENS:\n")
-            i = 1
-            for sentence in sentences:
-                if not sentence.strip():
-                    continue
-                tokens = sentence.split()
-                if not tokens:
-                    continue
-                    
-                print(f"{i} - {tokens}")
-                i += 1
-
-                if current_length + len(tokens) > self.chunk_size and current_chunk_tokens:
-                    chunks.append({
-                        "text": " ".join(current_chunk_tokens),
-                        "doc_id": doc_id,
-                        "filename": filename,
-                        "chunk_id": chunk_id,
-                        "page": page_number
-                    })
-                    chunk_id += 1
-
-                    overlap_index = max(0, len(current_chunk_tokens) - self.chunk_overlap)
-                    current_chunk_tokens = current_chunk_tokens[overlap_index:]
-                    current_length = len(current_chunk_tokens)
-
-                current_chunk_tokens.extend(tokens)
-                current_length += len(tokens)
-
-        if current_chunk_tokens:
-            chunks.append({
-                "text": " ".join(current_chunk_tokens),
-                "doc_id": doc_id,
-                "filename": filename,
-                "chunk_id": chunk_id,
-                "page": page_number
-            })
-            chunk_id += 1
-
-        print(f"\n\nCHUNKS:\n{chunks}\n\n")
+            if page_text.strip():  # ignora páginas vazias
+                cleaned_pages.append((page_number, page_text))
+
+        if not cleaned_pages:
+            return []
+
+        # Idioma detectado uma única vez, a partir de uma amostra do documento
+        sample = "\n".join(text for _, text in cleaned_pages)[:LANGUAGE_SAMPLE_CHARS]
+        language = self.detect_language(sample)
+
+        # Buffers do documento inteiro: sentenças normalizadas e a página de cada uma
+        sentences = []
+        sentence_pages = []
+        for page_number, page_text in cleaned_pages:
+            for sentence in sent_tokenize(page_text, language=language):
+                normalized = " ".join(sentence.split())
+                if normalized:
+                    sentences.append(normalized)
+                    sentence_pages.append(page_number)
+
+        token_counts = self.count_tokens(sentences)
+
+        # Sentenças que sozinhas excedem o chunk_size são divididas antes da montagem
+        if any(count > self.chunk_size for count in token_counts):
+            split_sentences, split_pages = [], []
+            for sentence, page_number, count in zip(sentences, sentence_pages, token_counts):
+                parts = self._split_long_sentence(sentence, count) if count > self.chunk_size else [sentence]
+                split_sentences.extend(parts)
+                split_pages.extend([page_number] * len(parts))
+            sentences, sentence_pages = split_sentences, split_pages
+            token_counts = self.count_tokens(sentences)
+
+        # Montagem por janela deslizante sobre os buffers: `start` e `end` delimitam o chunk
+        # corrente, sem recortar e recriar listas a cada sentença
+        chunks = []
+        start = 0
+        length = 0
+        for end, count in enumerate(token_counts):
+            if length + count > self.chunk_size and end > start:
+                chunks.append(self._build_chunk(sentences, start, end, sentence_pages[end - 1], doc_id, filename, len(chunks)))
+
+                # Mantém no início do próximo chunk apenas as últimas sentenças que cabem no overlap
+                while start < end and (length > self.chunk_overlap or length + count > self.chunk_size):
+                    length -= token_counts[start]
+                    start += 1
+
+            length += count
+
+        if start < len(sentences):
+            chunks.append(self._build_chunk(sentences, start, len(sentences), sentence_pages[-1], doc_id, filename, len(chunks)))
+
+        print(f"INFO: {len(chunks)} chunk(s) gerado(s) para '{filename}' (idioma: {language}, até {self.chunk_size} tokens por chunk).")
 
         return chunks
+
+    @staticmethod
+    def _build_chunk(sentences: list[str], start: int, end: int, page_number: int, doc_id: str, filename: str, chunk_id: int) -> dict:
+        return {
+            "text": " ".join(sentences[start:end]),
+            "doc_id": doc_id,
+            "filename": filename,
+            "chunk_id": chunk_id,
+            "page": page_number
+        }
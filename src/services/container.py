@@ -1,30 +1,152 @@
 import os
-from functools import lru_cache
+import threading
+from functools import wraps
 
 from dotenv import load_dotenv
 
-from config.qdrant import qdrant_client
+from config.qdrant import (QDRANT_SHARED_COLLECTION, QDRANT_SHARED_PROFILE,
+                           QDRANT_SLIM_PAYLOADS, QDRANT_STORAGE_MODE,
+                           get_qdrant_client)
 
 load_dotenv()
 
 MODEL_NAME = os.getenv("MODEL_NAME")
 
-@lru_cache()
+
+def singleton(getter):
+    """
+    Cache de instância única, como `lru_cache`, mas seguro para chamadas simultâneas: o warm-up
+    em segundo plano e as primeiras requisições podem pedir o mesmo service ao mesmo tempo,
+    e um modelo não deve ser carregado duas vezes.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @wraps(getter)
+    def wrapper():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(getter())
+        return instance[0]
+
+    wrapper.is_loaded = lambda: bool(instance)
+    return wrapper
+
+
+def keyed_singleton(getter):
+    """Como `singleton`, mas uma instância por chave (ex.: um embedder por modelo)."""
+    lock = threading.Lock()
+    instances = {}
+
+    @wraps(getter)
+    def wrapper(key):
+        if key not in instances:
+            with lock:
+                if key not in instances:
+                    instances[key] = getter(key)
+        return instances[key]
+
+    wrapper.loaded = lambda: dict(instances)
+    return wrapper
+
+
+class LazyService:
+    """
+    Referência a um service que só é criado no primeiro acesso a um atributo.
+    Controllers e middlewares mantêm suas instâncias em nível de módulo sem conectar às bases
+    nem carregar modelos quando a aplicação é importada.
+    """
+
+    def __init__(self, getter):
+        self._getter = getter
+
+    def __getattr__(self, name):
+        return getattr(self._getter(), name)
+
+
+@singleton
 def get_qdrant_service():
-    from services.vectorstore.qdrant_service import QdrantService
-    return QdrantService(client=qdrant_client)
+    from services.vectorstore.chunk_cache import CHUNK_CACHE_ENABLED, ChunkCache
+    from services.vectorstore.qdrant_service import (STORAGE_MODE_SHARED,
+                                                     QdrantService)
+    # No modo compartilhado as coleções lógicas são catalogadas no MongoDB
+    catalog = get_metadata_service() if QDRANT_STORAGE_MODE == STORAGE_MODE_SHARED else None
+    return QdrantService(
+        client=get_qdrant_client(),
+        storage_mode=QDRANT_STORAGE_MODE,
+        shared_collection=QDRANT_SHARED_COLLECTION,
+        shared_profile=QDRANT_SHARED_PROFILE,
+        catalog=catalog,
+        chunk_cache=ChunkCache() if CHUNK_CACHE_ENABLED else None,
+        text_store=get_chunk_text_store()
+    )
 
-@lru_cache()
-def get_chunk_service():
+@singleton
+def get_chunk_text_store():
+    """Armazenamento do texto dos chunks fora do Qdrant, ou None se o payload guarda o texto."""
+    if not QDRANT_SLIM_PAYLOADS:
+        return None
+    from services.database.chunk_text_store import ChunkTextStore
+    return ChunkTextStore(get_metadata_service().db)
+
+@keyed_singleton
+def get_chunk_service_for_model(model_name: str):
     from services.chunking.chunk_service import ChunkerService
-    return ChunkerService()
+    # O tamanho dos chunks é medido com o tokenizer do modelo de embedding
+    embedder_service = get_embedder_for_model(model_name)
+    return ChunkerService(tokenizer=embedder_service.tokenizer, max_tokens=embedder_service.max_tokens,
+                          tokenizer_lock=embedder_service.tokenizer_lock)
 
-@lru_cache()
-def get_embedder_service():
+@keyed_singleton
+def get_embedder_for_model(model_name: str):
     from services.embedding.embedder_service import EmbedderService
-    return EmbedderService(MODEL_NAME)
+    return EmbedderService(model_name)
+
+@singleton
+def get_chunk_service():
+    return get_chunk_service_for_model(MODEL_NAME)
+
+@singleton
+def get_embedder_service():
+    """Embedder do modelo configurado (MODEL_NAME): coleções novas, migrações e detecção de coleções."""
+    return get_embedder_for_model(MODEL_NAME)
 
-@lru_cache()
+def get_embedder_for_collection(collection_name: str):
+    """
+    Embedder do modelo da geração atrás do alias da coleção. Durante uma migração para outro modelo,
+    perguntas e uploads da coleção seguem no modelo antigo até a troca do alias.
+    """
+    return get_embedder_for_model(get_registry_service().get_collection_model(collection_name))
+
+def get_chunk_service_for_collection(collection_name: str):
+    return get_chunk_service_for_model(get_registry_service().get_collection_model(collection_name))
+
+@singleton
+def get_reranker_service():
+    from services.retrieving.reranker_service import Reranker
+    return Reranker()
+
+@singleton
 def get_metadata_service():
     from services.database.metadata_service import MetadataService
-    return MetadataService()
\ No newline at end of file
+    return MetadataService()
+
+@singleton
+def get_registry_service():
+    from services.registry.registry_service import RegistryService
+    return RegistryService(get_qdrant_service(), get_metadata_service())
+
+@singleton
+def get_migration_service():
+    from services.migration.migration_service import MigrationService
+    # A migração usa o embedder do modelo de destino, separado do que atende a coleção até a troca do alias
+    return MigrationService(
+        get_qdrant_service(), get_metadata_service(), get_registry_service(),
+        get_embedder_for_model, get_chunk_service_for_model, MODEL_NAME
+    )
+
+@singleton
+def get_health_service():
+    from services.health.health_service import HealthService
+    return HealthService()
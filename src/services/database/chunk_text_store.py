@@ -0,0 +1,65 @@
+# src/services/database/chunk_text_store.py
+import zlib
+
+from bson.binary import Binary
+from pymongo import ASCENDING, IndexModel, ReplaceOne
+from pymongo.errors import PyMongoError
+
+# Chaves por consulta/gravação no MongoDB
+TEXT_STORE_BATCH_SIZE = 1000
+
+
+class ChunkTextStore:
+    """
+    Texto dos chunks guardado fora do Qdrant (modo de payload enxuto), comprimido com zlib.
+    Cada texto é gravado sob `<coleção física>:<id do ponto>`, chave que vai no payload do ponto
+    (`text_key`): as gerações de uma migração não sobrescrevem o texto uma da outra, e a leitura
+    não precisa resolver alias. Os campos `physical`, `collection` e `doc_id` servem às remoções.
+    """
+
+    def __init__(self, db):
+        self.collection = db["chunk_texts"]
+
+    def ensure_indexes(self):
+        try:
+            self.collection.create_indexes([
+                IndexModel([("physical", ASCENDING), ("collection", ASCENDING), ("doc_id", ASCENDING)], name="physical_collection_doc_id"),
+            ])
+        except PyMongoError as e:
+            print(f"[ERRO] Falha ao criar índices dos textos de chunks: {e}")
+            raise
+
+    @staticmethod
+    def text_key(physical_name: str, point_id) -> str:
+        return f"{physical_name}:{point_id}"
+
+    def put_many(self, physical_name: str, collection_name: str, entries: list[tuple[str, str, str]]):
+        """Grava (chave, hash do documento, texto) de uma vez; regravar a mesma chave substitui o texto."""
+        for start in range(0, len(entries), TEXT_STORE_BATCH_SIZE):
+            self.collection.bulk_write([
+                ReplaceOne({"_id": key}, {
+                    "physical": physical_name,
+                    "collection": collection_name,
+                    "doc_id": doc_id,
+                    "text": Binary(zlib.compress(text.encode("utf-8"), 6)),
+                }, upsert=True)
+                for key, doc_id, text in entries[start:start + TEXT_STORE_BATCH_SIZE]
+            ], ordered=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Textos das chaves pedidas, em consultas `$in` em lote; chaves sem texto ficam de fora."""
+        keys = list(dict.fromkeys(keys))
+        texts = {}
+        for start in range(0, len(keys), TEXT_STORE_BATCH_SIZE):
+            for row in self.collection.find({"_id": {"$in": keys[start:start + TEXT_STORE_BATCH_SIZE]}}, {"text": 1}):
+                texts[row["_id"]] = zlib.decompress(row["text"]).decode("utf-8")
+        return texts
+
+    def delete(self, physical_name: str, collection_name: str | None = None, doc_id: str | None = None) -> int:
+        """Remove os textos de uma coleção física, opcionalmente só de uma coleção lógica e/ou de um documento."""
+        query = {"physical": physical_name}
+        if collection_name:
+            query["collection"] = collection_name
+        if doc_id:
+            query["doc_id"] = doc_id
+        return self.collection.delete_many(query).deleted_count
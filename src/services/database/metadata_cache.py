@@ -0,0 +1,105 @@
+# src/services/database/metadata_cache.py
+import os
+import threading
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+from utils.lru_cache import MISSING, LRUCache
+
+load_dotenv()
+
+METADATA_CACHE_MAX_ENTRIES = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", 10000))
+# Tempo de vida das entradas: alterações feitas por outros workers/instâncias (que não invalidam
+# este cache) aparecem depois desse prazo
+METADATA_CACHE_TTL_SECONDS = float(os.getenv("METADATA_CACHE_TTL_SECONDS", 30))
+
+
+class MetadataCache:
+    """
+    Cache read-through dos metadados resolvidos a partir de hashes de documentos.
+    Os hashes são endereçados por conteúdo, então as entradas só mudam quando um registro é
+    criado, atualizado ou removido. Neste processo, esses pontos invalidam as entradas; as alterações
+    de outros workers aparecem quando a entrada expira (`ttl_seconds`).
+    Hashes não encontrados não são guardados: o upload indexa no Qdrant antes de gravar o registro,
+    e uma pergunta nesse intervalo não pode fixar a ausência do documento.
+    """
+
+    def __init__(self, max_entries: int = METADATA_CACHE_MAX_ENTRIES, ttl_seconds: float = METADATA_CACHE_TTL_SECONDS):
+        # hash -> primeiro registro completo
+        self.first_by_hash = LRUCache(max_entries, ttl_seconds=ttl_seconds)
+        # (collection_name, hash) -> registro projetado
+        self.by_collection_hash = LRUCache(max_entries, ttl_seconds=ttl_seconds)
+        # doc_id -> lista de registros relacionados
+        self.related = LRUCache(max_entries, on_evict=self._forget_related, ttl_seconds=ttl_seconds)
+
+        # doc_id -> ids de entradas de `related` cujo resultado contém esse documento
+        self.related_members = defaultdict(set)
+        self.lock = threading.Lock()
+
+    # ---------------- Leitura ----------------
+
+    def get_first(self, doc_hash: str):
+        return self.first_by_hash.get(doc_hash)
+
+    def put_first(self, doc_hash: str, record: dict | None):
+        if record:
+            self.first_by_hash.put(doc_hash, record)
+
+    def get_by_hash(self, collection_name: str, doc_hash: str):
+        return self.by_collection_hash.get((collection_name, doc_hash))
+
+    def put_by_hash(self, collection_name: str, doc_hash: str, record: dict | None):
+        if record:
+            self.by_collection_hash.put((collection_name, doc_hash), record)
+
+    def get_related(self, doc_id: str):
+        return self.related.get(doc_id)
+
+    def put_related(self, doc_id: str, records: list[dict]):
+        with self.lock:
+            for record in records:
+                self.related_members[record["id"]].add(doc_id)
+            self.related_members[doc_id].add(doc_id)
+        self.related.put(doc_id, records)
+
+    def _forget_related(self, doc_id, records):
+        with self.lock:
+            for member_id in [doc_id] + [record["id"] for record in records]:
+                entries = self.related_members.get(member_id)
+                if entries is not None:
+                    entries.discard(doc_id)
+                    if not entries:
+                        del self.related_members[member_id]
+
+    # ---------------- Invalidação ----------------
+
+    def invalidate_document(self, doc_id: str | None, collection_name: str | None, doc_hashes: list[str], parent_id: str | None = None):
+        """
+        Remove as entradas afetadas por uma alteração no documento: as buscas pelos seus hashes
+        e as expansões de documentos relacionados que o contêm (ou contêm o seu pai).
+        """
+        for doc_hash in doc_hashes:
+            if not doc_hash:
+                continue
+            self.first_by_hash.pop(doc_hash)
+            if collection_name:
+                self.by_collection_hash.pop((collection_name, doc_hash))
+
+        with self.lock:
+            affected = set()
+            for member_id in (doc_id, parent_id):
+                if member_id:
+                    affected |= self.related_members.pop(member_id, set())
+
+        for entry_id in affected:
+            records = self.related.pop(entry_id)
+            if records is not MISSING:
+                self._forget_related(entry_id, records)
+
+    def stats(self) -> dict:
+        return {
+            "find_first_by_hash": self.first_by_hash.stats(),
+            "documents_by_hashes": self.by_collection_hash.stats(),
+            "related_documents": self.related.stats(),
+        }
@@ -1,10 +1,31 @@
 # src/services/database/metadata_service.py
 import os
+from collections import defaultdict
 from datetime import datetime
+from typing import BinaryIO
+from dotenv import load_dotenv
 import pymongo
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
 from bson.objectid import ObjectId, InvalidId
 import gridfs
 
+from services.database.metadata_cache import MetadataCache
+from utils.lru_cache import MISSING
+
+load_dotenv()
+
+# Profundidade máxima (em níveis) da expansão pai/filho de documentos relacionados
+RELATED_DOCUMENTS_MAX_DEPTH = int(os.getenv("RELATED_DOCUMENTS_MAX_DEPTH", 5))
+
+# Campos necessários para o retriever ao resolver hashes em metadados
+LOOKUP_PROJECTION = {
+    "collection_name": 1,
+    "active_version_hash": 1,
+    "parent_id": 1,
+    "original_filename": 1,
+}
+
 class MetadataService:
     def __init__(self):
         """Inicializa a conexão com o MongoDB."""
@@ -16,7 +37,65 @@ class MetadataService:
         self.client = pymongo.MongoClient(mongo_uri)
         self.db = self.client[db_name]
         self.collection = self.db["documents"]
+        self.collection_settings = self.db["collection_settings"]
         self.fs = gridfs.GridFS(self.db)
+        self.cache = MetadataCache()
+
+    def ensure_indexes(self):
+        """Cria os índices usados pelas consultas do serviço. É idempotente e roda na inicialização."""
+        indexes = [
+            IndexModel([("active_version_hash", ASCENDING)], name="active_version_hash"),
+            IndexModel([("collection_name", ASCENDING), ("active_version_hash", ASCENDING)], name="collection_name_active_version_hash"),
+            IndexModel([("parent_id", ASCENDING)], name="parent_id"),
+            IndexModel([("parent_oid", ASCENDING)], name="parent_oid"),
+            IndexModel([("gridfs_file_id", ASCENDING)], name="gridfs_file_id"),
+        ]
+        try:
+            created = self.collection.create_indexes(indexes)
+            print(f"INFO: Índices do MongoDB verificados: {created}")
+
+            # parent_oid espelha parent_id como ObjectId para o $graphLookup (registros antigos só têm parent_id)
+            backfill = self.collection.update_many(
+                {"parent_id": {"$type": "string"}, "parent_oid": {"$exists": False}},
+                [{"$set": {"parent_oid": {"$convert": {"input": "$parent_id", "to": "objectId", "onError": None, "onNull": None}}}}]
+            )
+            if backfill.modified_count:
+                print(f"INFO: parent_oid preenchido em {backfill.modified_count} documento(s).")
+        except PyMongoError as e:
+            print(f"[ERRO] Falha ao criar índices do MongoDB: {e}")
+            raise
+
+    def save_collection_settings(self, collection_name: str, profile: str, vector_size: int, model_name: str | None = None,
+                                 summarized: bool | None = None):
+        """
+        Registra o perfil de desempenho, a dimensão e o modelo de embedding da coleção (na criação e ao
+        reconstruí-la). O modelo é o da geração atrás do alias, usado nas perguntas e nos uploads.
+        `summarized` indica que todos os documentos da coleção têm vetores-resumo (busca em dois níveis).
+        """
+        now = datetime.now()
+        fields = {"profile": profile, "vector_size": vector_size, "updated_at": now}
+        if model_name:
+            fields["model_name"] = model_name
+        if summarized is not None:
+            fields["summarized"] = summarized
+        self.collection_settings.update_one(
+            {"_id": collection_name},
+            {"$set": fields, "$setOnInsert": {"created_at": now}},
+            upsert=True
+        )
+
+    def set_collection_summarized(self, collection_name: str, summarized: bool):
+        self.collection_settings.update_one({"_id": collection_name}, {"$set": {"summarized": summarized, "updated_at": datetime.now()}})
+
+    def get_collection_settings(self, collection_name: str) -> dict | None:
+        return self.collection_settings.find_one({"_id": collection_name}, {"profile": 1, "vector_size": 1, "model_name": 1, "summarized": 1})
+
+    def list_collection_settings(self) -> dict[str, dict]:
+        """Retorna as configurações de todas as coleções, indexadas pelo nome."""
+        return {doc.pop("_id"): doc for doc in self.collection_settings.find({}, {"profile": 1, "vector_size": 1, "model_name": 1, "summarized": 1})}
+
+    def delete_collection_settings(self, collection_name: str):
+        self.collection_settings.delete_one({"_id": collection_name})
 
     def _serialize_document(self, doc):
         """Converte o _id do MongoDB para uma string 'id'."""
@@ -25,8 +104,8 @@ class MetadataService:
             del doc['_id']
         return doc
     
-    def save_file(self, file_content: bytes, filename: str, doc_hash: str) -> ObjectId:
-        """Salva o conteúdo do arquivo no GridFS e retorna o ID do arquivo."""
+    def save_file(self, file_content: bytes | BinaryIO, filename: str, doc_hash: str) -> ObjectId:
+        """Salva o conteúdo do arquivo (bytes ou objeto de arquivo lido em stream) no GridFS e retorna o ID do arquivo."""
         file_id = self.fs.put(
             file_content,
             filename=filename,
@@ -35,11 +114,17 @@ class MetadataService:
         )
         return file_id
 
-    def create_document_record(self, filename: str, collection_name: str, doc_hash: str, file_content: bytes, parent_id: str | None = None) -> str:
-        """Cria um novo registro de metadados para um documento."""
+    def create_document_record(self, filename: str, collection_name: str, doc_hash: str, file_content: bytes | BinaryIO | None,
+                               parent_id: str | None = None, gridfs_file_id: ObjectId | None = None) -> str:
+        """
+        Cria um novo registro de metadados para um documento.
+        Com `gridfs_file_id`, o registro aponta para um arquivo já salvo (mesmo conteúdo em outra coleção)
+        e `file_content` não é gravado de novo.
+        """
 
         # Salva o arquivo no GridFS e obtém seu ID
-        gridfs_file_id = self.save_file(file_content, filename, doc_hash)
+        if gridfs_file_id is None:
+            gridfs_file_id = self.save_file(file_content, filename, doc_hash)
 
         # Cria nosso registro de metadados com a referência ao arquivo no GridFS
         now = datetime.now()
@@ -50,10 +135,14 @@ class MetadataService:
             "gridfs_file_id": gridfs_file_id,
             "created_at": now,
             "updated_at": now,
-            "parent_id": parent_id if parent_id else None
+            "parent_id": parent_id if parent_id else None,
+            "parent_oid": ObjectId(parent_id) if parent_id and ObjectId.is_valid(parent_id) else None
         }
         result = self.collection.insert_one(document_data)
-        return str(result.inserted_id)
+        new_doc_id = str(result.inserted_id)
+
+        self.cache.invalidate_document(new_doc_id, collection_name, [doc_hash], parent_id)
+        return new_doc_id
 
     def get_document_by_id(self, doc_id: str) -> dict | None:
         """Busca um documento pelos seus metadados usando o ID (ObjectId)."""
@@ -68,6 +157,16 @@ class MetadataService:
         except InvalidId:
             return None
 
+    def list_document_index(self) -> list[dict]:
+        """Lista coleção e hash ativo de todos os documentos (usado pelo registro em memória)."""
+        records = self.collection.find({}, {"collection_name": 1, "active_version_hash": 1})
+        return [self._serialize_document(doc) for doc in records]
+
+    def list_hashes_in_collection(self, collection_name: str) -> dict[str, str]:
+        """Mapeia hash ativo -> ID de todos os documentos de uma coleção."""
+        records = self.collection.find({"collection_name": collection_name}, {"active_version_hash": 1})
+        return {doc.get("active_version_hash"): str(doc["_id"]) for doc in records}
+
     def get_document_by_hash(self, collection_name: str, doc_hash: str) -> dict | None:
         """Verifica se um hash de documento já existe em uma coleção."""
         record = self.collection.find_one(
@@ -77,6 +176,10 @@ class MetadataService:
 
     def update_document_version(self, doc_id: str, new_hash: str, new_filename: str, new_gridfs_file_id: ObjectId):
         """Atualiza o hash da versão ativa e o ID do arquivo no GridFS."""
+        old = self.collection.find_one(
+            {"_id": ObjectId(doc_id)},
+            {"collection_name": 1, "active_version_hash": 1, "parent_id": 1}
+        ) or {}
         self.collection.update_one(
             {"_id": ObjectId(doc_id)},
             {
@@ -88,6 +191,9 @@ class MetadataService:
                 }
             }
         )
+        self.cache.invalidate_document(
+            doc_id, old.get("collection_name"), [old.get("active_version_hash"), new_hash], old.get("parent_id")
+        )
     
     def find_first_by_hash(self, doc_hash: str) -> dict | None:
         """Busca o primeiro registro de metadados que corresponde a um hash."""
@@ -95,9 +201,34 @@ class MetadataService:
             cleaned_hash = doc_hash.split('=')[-1].strip()
             print(f"INFO: ID de documento corrigido de '{doc_hash}' para '{cleaned_hash}'")
             doc_hash = cleaned_hash
-        record = self.collection.find_one({"active_version_hash": doc_hash})
-        return self._serialize_document(record)
+
+        cached = self.cache.get_first(doc_hash)
+        if cached is not MISSING:
+            return dict(cached) if cached else None
+
+        record = self._serialize_document(self.collection.find_one({"active_version_hash": doc_hash}))
+        self.cache.put_first(doc_hash, record)
+        return dict(record) if record else None
     
+    def find_copy_in_other_collection(self, doc_hash: str, collection_name: str, candidate_collections: list[str] | None = None) -> dict | None:
+        """Registro de um documento com o mesmo conteúdo (hash ativo) em outra coleção, com arquivo no GridFS."""
+        collections_filter = {"$ne": collection_name}
+        if candidate_collections is not None:
+            collections_filter = {"$in": [name for name in candidate_collections if name != collection_name]}
+        record = self.collection.find_one({
+            "active_version_hash": doc_hash,
+            "collection_name": collections_filter,
+            "gridfs_file_id": {"$ne": None}
+        })
+        return self._serialize_document(record)
+
+    def count_file_references(self, file_id: ObjectId, exclude_doc_id: str | None = None) -> int:
+        """Quantos registros de documentos apontam para o arquivo do GridFS (exceto `exclude_doc_id`)."""
+        query = {"gridfs_file_id": file_id}
+        if exclude_doc_id:
+            query["_id"] = {"$ne": ObjectId(exclude_doc_id)}
+        return self.collection.count_documents(query)
+
     def get_file_from_gridfs(self, file_id: ObjectId):
         """Busca um arquivo do GridFS pelo seu ID."""
         try:
@@ -111,44 +242,155 @@ class MetadataService:
             self.fs.delete(file_id)
 
     def delete_document_record(self, doc_id: str):
-        """Deleta o registro de metadados de um documento."""
+        """
+        Deleta o registro de metadados de um documento. O arquivo no GridFS só é excluído quando
+        nenhum outro registro aponta para ele (cópias do documento em outras coleções compartilham o arquivo).
+        """
         metadata = self.get_document_by_id(doc_id)
-        if metadata and 'gridfs_file_id' in metadata:
-            self.delete_file_from_gridfs(metadata['gridfs_file_id'])
         self.collection.delete_one({"_id": ObjectId(doc_id)})
+        if metadata and metadata.get('gridfs_file_id'):
+            if self.count_file_references(metadata['gridfs_file_id']) == 0:
+                self.delete_file_from_gridfs(metadata['gridfs_file_id'])
+            else:
+                print(f"INFO: O arquivo do documento {doc_id} ainda é referenciado por outros documentos. Não será excluído do GridFS.")
+        if metadata:
+            self.cache.invalidate_document(
+                metadata['id'], metadata.get('collection_name'), [metadata.get('active_version_hash')], metadata.get('parent_id')
+            )
 
     def get_documents_by_hashes(self, collection_name: str, doc_hashes: list[str]) -> list[dict]:
         """Busca os metadados de múltiplos documentos a partir de seus hashes."""
-        records = self.collection.find({
-            "collection_name": collection_name,
-            "active_version_hash": {"$in": doc_hashes}
-        })
-        return [self._serialize_document(doc) for doc in records]
+        return self.get_documents_by_hashes_in_collections([collection_name], doc_hashes)
+
+    def get_documents_by_hashes_in_collections(self, collection_names: list[str], doc_hashes: list[str]) -> list[dict]:
+        """
+        Resolve hashes em várias coleções com uma única consulta,
+        retornando apenas os campos usados pelo retriever. Passa pelo cache de metadados.
+        """
+        if not collection_names or not doc_hashes:
+            return []
+
+        found = []
+        missing = []
+        for collection_name in collection_names:
+            for doc_hash in doc_hashes:
+                cached = self.cache.get_by_hash(collection_name, doc_hash)
+                if cached is MISSING:
+                    missing.append((collection_name, doc_hash))
+                elif cached:
+                    found.append(dict(cached))
+
+        if missing:
+            records = self.collection.find(
+                {
+                    "collection_name": {"$in": list({c for c, _ in missing})},
+                    "active_version_hash": {"$in": list({h for _, h in missing})}
+                },
+                LOOKUP_PROJECTION
+            )
+            by_key = {}
+            for doc in records:
+                record = self._serialize_document(doc)
+                by_key[(record["collection_name"], record["active_version_hash"])] = record
+
+            # Pares não encontrados não entram no cache (put_by_hash ignora None)
+            for collection_name, doc_hash in missing:
+                record = by_key.get((collection_name, doc_hash))
+                self.cache.put_by_hash(collection_name, doc_hash, record)
+                if record:
+                    found.append(dict(record))
 
-    def find_related_documents(self, doc_ids: list[str]) -> list[dict]:
+        return found
+
+    def find_related_documents(self, doc_ids: list[str], max_depth: int = RELATED_DOCUMENTS_MAX_DEPTH) -> list[dict]:
         """
-        Encontra todos os documentos relacionados (pais e filhos) a uma lista de IDs.
+        Encontra todos os documentos relacionados (ancestrais, descendentes e irmãos) a uma lista de IDs
+        em uma única agregação com $graphLookup, até `max_depth` níveis na árvore pai/filho.
+        Os resultados por documento passam pelo cache de metadados.
         """
+        related_by_id = {}
+        for family in self.find_related_families(doc_ids, max_depth).values():
+            for record in family:
+                related_by_id[record["id"]] = record
+        return list(related_by_id.values())
+
+    def find_related_families(self, doc_ids: list[str], max_depth: int = RELATED_DOCUMENTS_MAX_DEPTH) -> dict[str, list[dict]]:
+        """Como `find_related_documents`, mas separado por ID de origem (a família de cada documento)."""
+        valid_ids = list(dict.fromkeys(doc_id for doc_id in doc_ids if ObjectId.is_valid(doc_id)))
+        use_cache = max_depth == RELATED_DOCUMENTS_MAX_DEPTH
+
+        families = {}
+        missing = []
+        for doc_id in valid_ids:
+            cached = self.cache.get_related(doc_id) if use_cache else MISSING
+            if cached is MISSING:
+                missing.append(doc_id)
+            else:
+                families[doc_id] = cached
+
+        if missing:
+            aggregated = self._aggregate_related_documents(missing, max_depth)
+            for doc_id in missing:
+                family = aggregated.get(doc_id, [])
+                if use_cache:
+                    self.cache.put_related(doc_id, family)
+                families[doc_id] = family
+
+        return {doc_id: [dict(record) for record in family] for doc_id, family in families.items()}
+
+    def _aggregate_related_documents(self, doc_ids: list[str], max_depth: int) -> dict[str, list[dict]]:
+        """Executa a expansão com $graphLookup e retorna a família de cada ID de origem."""
         # Converte os IDs de string para ObjectId para a consulta
-        object_ids = [ObjectId(doc_id) for doc_id in doc_ids if ObjectId.is_valid(doc_id)]
-        
-        # Encontra os documentos originais para obter seus parent_ids (se tiverem)
-        initial_docs = list(self.collection.find({"_id": {"$in": object_ids}}))
-        
-        # Coleta todos os IDs de documentos e de pais envolvidos
-        all_related_ids = set(doc['_id'] for doc in initial_docs)
-        for doc in initial_docs:
-            if doc.get('parent_id'):
-                try:
-                    all_related_ids.add(ObjectId(doc['parent_id']))
-                except InvalidId:
-                    continue # Ignora parent_id inválido
-
-        final_docs_cursor = self.collection.find({
-            "$or": [
-                {"_id": {"$in": list(all_related_ids)}},
-                {"parent_id": {"$in": [str(oid) for oid in all_related_ids]}}
-            ]
-        })
-        
-        return [self._serialize_document(doc) for doc in final_docs_cursor]
\ No newline at end of file
+        object_ids = [ObjectId(doc_id) for doc_id in doc_ids]
+        if not object_ids:
+            return {}
+
+        # maxDepth do $graphLookup é zero-based: 0 percorre apenas um nível
+        graph_depth = max(0, max_depth - 1)
+
+        pipeline = [
+            {"$match": {"_id": {"$in": object_ids}}},
+            # Sobe na árvore: pai, avô, ...
+            {"$graphLookup": {
+                "from": self.collection.name,
+                "startWith": "$parent_oid",
+                "connectFromField": "parent_oid",
+                "connectToField": "_id",
+                "as": "ancestors",
+                "maxDepth": graph_depth
+            }},
+            # Desce a partir do próprio documento e de todos os ancestrais: filhos, aditivos de aditivos, irmãos...
+            {"$graphLookup": {
+                "from": self.collection.name,
+                "startWith": {"$concatArrays": [["$_id"], "$ancestors._id"]},
+                "connectFromField": "_id",
+                "connectToField": "parent_oid",
+                "as": "descendants",
+                "maxDepth": graph_depth
+            }},
+            {"$project": {"family": {"$concatArrays": [
+                [{"_id": "$_id", **{field: f"${field}" for field in LOOKUP_PROJECTION}}],
+                "$ancestors",
+                "$descendants"
+            ]}}},
+            {"$unwind": "$family"},
+            # Remove duplicatas (um documento pode ser alcançado por mais de um caminho), mantém só os campos
+            # necessários e registra a partir de quais IDs de origem cada documento foi alcançado
+            {"$group": {
+                "_id": "$family._id",
+                **{field: {"$first": f"$family.{field}"} for field in LOOKUP_PROJECTION},
+                "sources": {"$addToSet": "$_id"}
+            }}
+        ]
+
+        families = defaultdict(list)
+        for doc in self.collection.aggregate(pipeline):
+            sources = doc.pop("sources")
+            record = self._serialize_document(doc)
+            for source in sources:
+                families[str(source)].append(record)
+        return dict(families)
+
+    def cache_stats(self) -> dict:
+        """Estatísticas (acertos, falhas e taxa de acerto) do cache de metadados."""
+        return self.cache.stats()
@@ -1,19 +1,104 @@
+import os
+import threading
+from functools import partial
+
+import numpy as np
+from dotenv import load_dotenv
 from sentence_transformers import SentenceTransformer
 
+from services.inference.micro_batcher import MICROBATCH_ENABLED, MicroBatcher
+
+load_dotenv()
+
+# Máximo de perguntas agrupadas em um único forward de embedding
+EMBEDDING_MICROBATCH_SIZE = int(os.getenv("EMBEDDING_MICROBATCH_SIZE", 64))
+# Textos por forward ao indexar documentos
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+# Limite de tokens (textos x maior texto do lote, já com padding) por forward ao indexar documentos
+EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", 16384))
+
 
 class EmbedderService:
     def __init__(self, model_name: str):
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
+        # O tokenizer rápido (Rust) do modelo não pode ser usado por duas threads ao mesmo tempo: cada chamada
+        # reconfigura o truncamento, e chamadas simultâneas falham com "Already borrowed" ou truncam errado.
+        # Toda tokenização passa por este lock (o forward do modelo continua em paralelo)
+        self.tokenizer_lock = threading.Lock()
+        tokenize = self.model.tokenize
+
+        def locked_tokenize(texts, **kwargs):
+            with self.tokenizer_lock:
+                return tokenize(texts, **kwargs)
+
+        # `encode` tokeniza cada lote por `self.tokenize`: o atributo da instância substitui o método
+        self.model.tokenize = locked_tokenize
+        # Embeddings normalizados (norma 1) em float32: a distância de cosseno vira produto interno
+        self._encode = partial(self.model.encode, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
+        # Agrupa os embeddings de perguntas vindos de requisições concorrentes
+        self.query_batcher = MicroBatcher("embedding", self._encode, EMBEDDING_MICROBATCH_SIZE) if MICROBATCH_ENABLED else None
 
     def get_embedding_dimension(self) -> int:
         """Retorna a dimensão do vetor do modelo."""
         return self.model.get_sentence_embedding_dimension()
 
+    @property
+    def tokenizer(self):
+        """Tokenizer do modelo, usado para medir o tamanho dos chunks em tokens reais (sempre sob `tokenizer_lock`)."""
+        return self.model.tokenizer
+
+    @property
+    def max_tokens(self) -> int:
+        """Tokens de texto aceitos pelo modelo antes de truncar (desconta os tokens especiais)."""
+        return self.model.max_seq_length - 2
+
     def embed_text(self, text: str):
         """Gera o embedding para um único texto."""
-        return self.model.encode(text).tolist()
+        if self.query_batcher:
+            return self.query_batcher.submit([text])[0].tolist()
+        return self._encode(text).tolist()
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        """
+        Gera os embeddings de vários textos em uma matriz float32 contígua (textos x dimensão).
+        Os textos são ordenados pelo tamanho em tokens e agrupados em lotes de tamanho parecido,
+        o que reduz o padding; o resultado volta na ordem original.
+        """
+        embeddings = np.empty((len(texts), self.get_embedding_dimension()), dtype=np.float32)
+        if not texts:
+            return embeddings
+
+        for batch in self._length_buckets(texts):
+            embeddings[batch] = self._encode([texts[i] for i in batch], batch_size=len(batch))
+        return embeddings
+
+    def embed_chunks(self, chunks: list[dict]) -> np.ndarray:
+        """Gera os embeddings para uma lista de chunks (matriz float32, na ordem dos chunks)."""
+        return self.embed_texts([chunk["text"] for chunk in chunks])
+
+    def _length_buckets(self, texts: list[str]) -> list[list[int]]:
+        """Índices dos textos agrupados em lotes de tamanho (em tokens) parecido."""
+        with self.tokenizer_lock:
+            encoded = self.tokenizer(
+                texts,
+                truncation=True,
+                max_length=self.model.max_seq_length,
+                return_attention_mask=False,
+                return_token_type_ids=False
+            )
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        order = sorted(range(len(texts)), key=lambda i: lengths[i], reverse=True)
 
-    def embed_chunks(self, chunks: list[dict]) -> list[list[float]]:
-        """Gera os embeddings para uma lista de chunks."""
-        texts = [chunk["text"] for chunk in chunks]
-        return self.model.encode(texts).tolist()
+        batches = []
+        batch = []
+        for index in order:
+            # Em ordem decrescente, o primeiro texto do lote define o tamanho com padding
+            padded_length = lengths[batch[0]] if batch else lengths[index]
+            if batch and (len(batch) >= EMBEDDING_BATCH_SIZE or (len(batch) + 1) * padded_length > EMBEDDING_MAX_BATCH_TOKENS):
+                batches.append(batch)
+                batch = []
+            batch.append(index)
+        if batch:
+            batches.append(batch)
+        return batches
@@ -0,0 +1,134 @@
+# src/services/health/health_service.py
+import os
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Intervalo entre novas tentativas das etapas do warm-up que falharam (bases ou rede indisponíveis)
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 10))
+
+
+def _warm_metadata():
+    from services.container import get_chunk_text_store, get_metadata_service
+    # Garante os índices do MongoDB (idempotente); uma falha propaga e a etapa é repetida
+    get_metadata_service().ensure_indexes()
+    text_store = get_chunk_text_store()
+    if text_store:
+        text_store.ensure_indexes()
+
+
+def _warm_registry():
+    from services.container import get_registry_service
+    # Carrega o registro de coleções/documentos usado nas validações
+    if not get_registry_service().load():
+        raise RuntimeError("registro de coleções/documentos não carregado")
+
+
+def _warm_nltk():
+    from services.chunking.chunk_service import ensure_nltk_data
+    if not ensure_nltk_data():
+        raise RuntimeError("pacote 'punkt' do NLTK indisponível")
+
+
+def _warm_embedder():
+    from services.container import get_chunk_service, get_embedder_service
+    # Um forward de aquecimento aloca os buffers do modelo antes da primeira requisição
+    get_embedder_service().embed_texts(["aquecimento"])
+    get_chunk_service()
+
+
+def _warm_reranker():
+    from services.container import get_reranker_service
+    get_reranker_service()._predict([["aquecimento", "aquecimento"]])
+
+
+def _warm_collections():
+    from services.retrieving.retriever_service import Retriever
+    # Embeddings das descrições usados na detecção automática de coleções
+    Retriever.description_embeddings()
+
+
+# Etapas na ordem de execução; a aplicação fica pronta quando todas concluem
+WARMUP_STEPS = [
+    ("metadata", _warm_metadata),
+    ("registry", _warm_registry),
+    ("nltk", _warm_nltk),
+    ("embedder", _warm_embedder),
+    ("reranker", _warm_reranker),
+    ("collections", _warm_collections),
+]
+
+
+class HealthService:
+    """
+    Warm-up em segundo plano e estado de prontidão da aplicação.
+    A aplicação sobe sem conectar às bases nem carregar modelos; o warm-up faz isso em uma thread
+    e repete as etapas que falharem. `/health/live` responde assim que o processo sobe e
+    `/health/ready` só quando todas as etapas concluíram, para o orquestrador liberar o tráfego.
+    """
+
+    def __init__(self, steps: list = WARMUP_STEPS, retry_seconds: float = WARMUP_RETRY_SECONDS):
+        self.steps = steps
+        self.retry_seconds = retry_seconds
+        self.started_at = datetime.now()
+        self.lock = threading.Lock()
+        self.state = {name: {"status": "pending", "seconds": None, "error": None} for name, _ in steps}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        pending = list(self.steps)
+        while pending and not self.stop_event.is_set():
+            failed = []
+            for name, step in pending:
+                if self.stop_event.is_set():
+                    return
+                self._set(name, status="running")
+                start = time.perf_counter()
+                try:
+                    step()
+                    self._set(name, status="ready", seconds=round(time.perf_counter() - start, 2), error=None)
+                    print(f"INFO: Warm-up '{name}' concluído em {time.perf_counter() - start:.2f}s.")
+                except Exception as e:
+                    self._set(name, status="failed", seconds=round(time.perf_counter() - start, 2), error=str(e))
+                    print(f"[ERRO] Warm-up '{name}' falhou: {e}. Nova tentativa em {self.retry_seconds:.0f}s.")
+                    failed.append((name, step))
+            pending = failed
+            if pending:
+                self.stop_event.wait(self.retry_seconds)
+
+        if not pending:
+            print(f"INFO: Aplicação pronta em {(datetime.now() - self.started_at).total_seconds():.2f}s.")
+
+    def _set(self, name: str, **fields):
+        with self.lock:
+            self.state[name].update(fields)
+
+    def is_ready(self) -> bool:
+        with self.lock:
+            return all(step["status"] == "ready" for step in self.state.values())
+
+    def status(self) -> dict:
+        with self.lock:
+            steps = {name: dict(step) for name, step in self.state.items()}
+        return {
+            "ready": all(step["status"] == "ready" for step in steps.values()),
+            "started_at": self.started_at,
+            "uptime_seconds": round((datetime.now() - self.started_at).total_seconds(), 1),
+            "steps": steps,
+        }
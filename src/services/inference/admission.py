@@ -0,0 +1,176 @@
+# src/services/inference/admission.py
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Janela de amostras usada nas estatísticas de espera na fila e de tempo de execução
+ADMISSION_STATS_WINDOW = int(os.getenv("ADMISSION_STATS_WINDOW", 1000))
+
+# Limites por etapa: execuções simultâneas, pedidos aguardando na fila e espera máxima (segundos).
+# O embedding de perguntas e o re-ranqueamento já são agrupados pelo micro-batching, então a
+# concorrência deles é o número de requisições cujo trabalho pode estar nos lotes ao mesmo tempo
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 16))
+EMBEDDING_MAX_QUEUE = int(os.getenv("EMBEDDING_MAX_QUEUE", 64))
+EMBEDDING_QUEUE_TIMEOUT = float(os.getenv("EMBEDDING_QUEUE_TIMEOUT", 5))
+
+RERANK_CONCURRENCY = int(os.getenv("RERANK_CONCURRENCY", 4))
+RERANK_MAX_QUEUE = int(os.getenv("RERANK_MAX_QUEUE", 32))
+RERANK_QUEUE_TIMEOUT = float(os.getenv("RERANK_QUEUE_TIMEOUT", 10))
+
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", max(1, (os.cpu_count() or 2) // 2)))
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", 16))
+OCR_QUEUE_TIMEOUT = float(os.getenv("OCR_QUEUE_TIMEOUT", 30))
+
+
+class Overloaded(Exception):
+    """Etapa saturada: a requisição é recusada com 503 e `Retry-After` em vez de entrar na fila."""
+
+    def __init__(self, stage: str, reason: str, retry_after: int):
+        super().__init__(f"Etapa '{stage}' sobrecarregada ({reason}).")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """
+    Controle de admissão de uma etapa pesada (embedding, re-ranqueamento, OCR).
+    No máximo `concurrency` execuções ao mesmo tempo e `max_queue` pedidos aguardando vaga;
+    além disso, ou se a vaga não sair em `queue_timeout` segundos, o pedido é recusado na hora
+    (`Overloaded`). Sob sobrecarga, parte das requisições falha rápido e as admitidas mantêm a
+    latência, em vez de todas disputarem a CPU e ficarem lentas juntas.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float, enabled: bool = ADMISSION_ENABLED):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.enabled = enabled
+
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_times = deque(maxlen=ADMISSION_STATS_WINDOW)
+        self.run_times = deque(maxlen=ADMISSION_STATS_WINDOW)
+
+    def _enqueue(self):
+        with self.lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(self.name, "fila cheia", self._retry_after())
+            self.waiting += 1
+        return time.perf_counter()
+
+    def _dequeue(self, enqueued_at: float, acquired: bool):
+        with self.lock:
+            self.waiting -= 1
+            self.wait_times.append(time.perf_counter() - enqueued_at)
+            if not acquired:
+                self.timed_out += 1
+                raise Overloaded(self.name, "tempo de espera esgotado", self._retry_after())
+            self.admitted += 1
+            self.running += 1
+
+    def _finish(self, started_at: float):
+        with self.lock:
+            self.running -= 1
+            self.run_times.append(time.perf_counter() - started_at)
+        self.semaphore.release()
+
+    def _retry_after(self) -> int:
+        # Tempo estimado para a fila atual andar, pelo tempo médio de execução recente
+        average_run = sum(self.run_times) / len(self.run_times) if self.run_times else 1.0
+        return min(60, max(1, math.ceil(average_run * (self.waiting + 1) / self.concurrency)))
+
+    @contextmanager
+    def slot(self):
+        """Ocupa uma vaga da etapa durante o bloco (código síncrono)."""
+        if not self.enabled:
+            yield
+            return
+        enqueued_at = self._enqueue()
+        self._dequeue(enqueued_at, self.semaphore.acquire(timeout=self.queue_timeout))
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._finish(started_at)
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """Ocupa uma vaga da etapa durante o bloco, sem bloquear o event loop na espera."""
+        if not self.enabled:
+            yield
+            return
+        enqueued_at = self._enqueue()
+        acquired = self.semaphore.acquire(blocking=False)
+        if not acquired:
+            waiter = asyncio.get_running_loop().run_in_executor(None, partial(self.semaphore.acquire, timeout=self.queue_timeout))
+            try:
+                acquired = await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # Requisição cancelada (cliente desconectou): a vaga obtida depois pela espera é devolvida
+                waiter.add_done_callback(lambda f: f.result() and self.semaphore.release())
+                with self.lock:
+                    self.waiting -= 1
+                raise
+        self._dequeue(enqueued_at, acquired)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._finish(started_at)
+
+    def stats(self) -> dict:
+        with self.lock:
+            wait_times = sorted(self.wait_times)
+            run_times = list(self.run_times)
+            stats = {
+                "enabled": self.enabled,
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout_s": self.queue_timeout,
+                "running": self.running,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+        def percentile(values, p):
+            return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2) if values else 0.0
+
+        stats.update({
+            "queue_wait_ms": {
+                "avg": round(sum(wait_times) / len(wait_times) * 1000, 2) if wait_times else 0.0,
+                "p50": percentile(wait_times, 0.50),
+                "p95": percentile(wait_times, 0.95),
+                "p99": percentile(wait_times, 0.99),
+                "max": round(wait_times[-1] * 1000, 2) if wait_times else 0.0,
+            },
+            "avg_run_ms": round(sum(run_times) / len(run_times) * 1000, 2) if run_times else 0.0,
+        })
+        return stats
+
+
+embedding_pool = AdmissionPool("embedding", EMBEDDING_CONCURRENCY, EMBEDDING_MAX_QUEUE, EMBEDDING_QUEUE_TIMEOUT)
+rerank_pool = AdmissionPool("rerank", RERANK_CONCURRENCY, RERANK_MAX_QUEUE, RERANK_QUEUE_TIMEOUT)
+ocr_pool = AdmissionPool("ocr", OCR_CONCURRENCY, OCR_MAX_QUEUE, OCR_QUEUE_TIMEOUT)
+
+ADMISSION_POOLS = {pool.name: pool for pool in (embedding_pool, rerank_pool, ocr_pool)}
@@ -0,0 +1,109 @@
+# src/services/inference/micro_batcher.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() == "true"
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", 3))
+
+
+class MicroBatcher:
+    """
+    Agrupa pedidos de inferência de chamadores concorrentes em um único lote.
+    Cada chamador envia uma lista de itens e fica bloqueado até receber a lista de resultados
+    correspondente. Um lote é disparado quando atinge `max_batch_size` itens ou quando o
+    primeiro pedido já esperou `max_wait_ms`.
+    """
+
+    def __init__(self, name: str, batch_fn, max_batch_size: int, max_wait_ms: float = MICROBATCH_MAX_WAIT_MS):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+        self.pid = None
+
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+
+    def _ensure_started(self):
+        # A thread é criada sob demanda e recriada após um fork (ex.: launcher com pré-fork),
+        # já que threads não sobrevivem ao fork
+        if self.thread is not None and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                return
+            self.queue = queue.Queue()
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._loop, name=f"microbatch-{self.name}", daemon=True)
+            self.thread.start()
+
+    def submit(self, items: list) -> list:
+        """Envia os itens para o próximo lote e retorna seus resultados, na mesma ordem."""
+        if not items:
+            return []
+        self._ensure_started()
+        future = Future()
+        self.queue.put((items, future))
+        return future.result()
+
+    def _loop(self):
+        while True:
+            first = self.queue.get()
+            pending = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+
+            # Coleta outros pedidos até encher o lote ou estourar a espera
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                size += len(request[0])
+
+            self._run_batch(pending, size)
+
+    def _run_batch(self, pending: list, size: int):
+        all_items = [item for items, _ in pending for item in items]
+        try:
+            results = self.batch_fn(all_items)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for items, future in pending:
+            future.set_result(results[offset:offset + len(items)])
+            offset += len(items)
+
+        self.batches += 1
+        self.items += size
+        self.requests += len(pending)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "items": self.items,
+            "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -0,0 +1,257 @@
+# src/services/migration/migration_service.py
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from config.collection_profiles import DEFAULT_PROFILE
+from services.registry.registry_service import REGISTRY_TTL_SECONDS
+from utils.extract_text import ExtractTextService
+
+load_dotenv()
+
+# Uma migração "running" sem atualização há mais que isso é considerada interrompida e pode ser retomada
+MIGRATION_STALE_SECONDS = float(os.getenv("MIGRATION_STALE_SECONDS", 300))
+# Espera após a troca do alias para as outras instâncias recarregarem o registro (e o modelo da coleção)
+# antes da última sincronização, que reindexa com o novo modelo o que elas gravaram nesse intervalo
+MIGRATION_SWITCH_GRACE_SECONDS = float(os.getenv("MIGRATION_SWITCH_GRACE_SECONDS", REGISTRY_TTL_SECONDS))
+
+STATUS_RUNNING = "running"
+STATUS_SWITCHING = "switching"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+class MigrationService:
+    """
+    Reindexação sem indisponibilidade (blue/green): reconstrói a coleção lógica em uma nova geração
+    física, fora do alias, com o modelo e os parâmetros de chunking atuais. O progresso é salvo por
+    documento no MongoDB (coleção `migrations`), então uma migração interrompida é retomada de onde parou.
+    Ao terminar, o alias é trocado de forma atômica e a geração anterior é removida: as buscas nunca
+    enxergam um índice pela metade.
+
+    Cada geração tem o seu modelo: até a troca do alias, perguntas e uploads da coleção seguem com o
+    modelo da geração atual (registrado nas configurações da coleção) e só a migração usa o modelo novo.
+    """
+
+    def __init__(self, qdrant_service, metadata_service, registry_service, embedder_for_model, chunker_for_model, model_name: str):
+        """`embedder_for_model` e `chunker_for_model` devolvem os services de um modelo pelo nome."""
+        self.qdrant_service = qdrant_service
+        self.metadata_service = metadata_service
+        self.registry_service = registry_service
+        self.embedder_for_model = embedder_for_model
+        self.chunker_for_model = chunker_for_model
+        self.model_name = model_name
+        self.migrations = metadata_service.db["migrations"]
+
+        self.lock = threading.Lock()
+        self.threads = {}  # collection_name -> thread da migração em andamento neste processo
+
+    def start(self, collection_name: str, rechunk: bool = False) -> dict:
+        """
+        Inicia a migração da coleção ou retoma a última interrompida.
+        `rechunk=True` extrai e fatia de novo os originais do GridFS (mudança nos parâmetros de chunking);
+        caso contrário reaproveita o texto dos chunks já indexados e só recalcula os embeddings.
+        """
+        with self.lock:
+            thread = self.threads.get(collection_name)
+            if thread and thread.is_alive():
+                return {"message": "Já existe uma migração em andamento para esta coleção", "migration": self.status(collection_name)[0], "success": False}
+
+            migration = self.migrations.find_one(
+                {"collection_name": collection_name, "status": {"$in": [STATUS_RUNNING, STATUS_SWITCHING, STATUS_FAILED]}},
+                sort=[("started_at", -1)]
+            )
+            now = datetime.now()
+            if migration and migration["status"] != STATUS_FAILED and (now - migration["updated_at"]).total_seconds() < MIGRATION_STALE_SECONDS:
+                return {"message": "A migração desta coleção está em andamento em outra instância", "migration": self._format(migration), "success": False}
+
+            if migration:
+                # Retoma com as mesmas opções e a mesma geração de destino
+                self.migrations.update_one({"_id": migration["_id"]}, {"$set": {
+                    "status": STATUS_RUNNING, "error": None, "updated_at": now,
+                    "run_started_at": now, "run_chunks_start": migration.get("chunks_done", 0),
+                    "run_documents_start": migration.get("documents_done", 0)
+                }})
+                message = "Migração retomada"
+            else:
+                source = self.qdrant_service.resolve_collection(collection_name)
+                generation = self.qdrant_service.generation_of(source) + 1
+                migration = {
+                    "_id": f"{collection_name}:{generation}",
+                    "collection_name": collection_name,
+                    "source": source,
+                    "target": self.qdrant_service.generation_name(collection_name, generation),
+                    "generation": generation,
+                    "model_name": self.model_name,
+                    "rechunk": rechunk,
+                    "status": STATUS_RUNNING,
+                    "done": [],
+                    "total_documents": len(self.metadata_service.list_hashes_in_collection(collection_name)),
+                    "documents_done": 0,
+                    "chunks_done": 0,
+                    "started_at": now,
+                    "updated_at": now,
+                    "run_started_at": now,
+                    "run_chunks_start": 0,
+                    "run_documents_start": 0,
+                    "finished_at": None,
+                    "error": None,
+                }
+                self.migrations.insert_one(migration)
+                message = "Migração iniciada"
+
+            thread = threading.Thread(target=self._run, args=(migration["_id"],), name=f"migration-{collection_name}", daemon=True)
+            self.threads[collection_name] = thread
+            thread.start()
+
+        return {"message": message, "migration": self.status(collection_name)[0], "success": True}
+
+    def _run(self, migration_id: str):
+        try:
+            migration = self.migrations.find_one({"_id": migration_id})
+            collection_name = migration["collection_name"]
+            settings = self.metadata_service.get_collection_settings(collection_name) or {}
+            profile = settings.get("profile", DEFAULT_PROFILE)
+            # Modelo gravado no início da migração: uma retomada usa o mesmo, mesmo que MODEL_NAME tenha mudado
+            model_name = migration["model_name"]
+            embedder = self.embedder_for_model(model_name)
+            chunker = self.chunker_for_model(model_name)
+            vector_size = embedder.get_embedding_dimension()
+
+            target = self.qdrant_service.create_generation(collection_name, migration["generation"], vector_size, profile)
+            print(f"INFO: Migração de '{collection_name}': {migration['source']} -> {target} (modelo {model_name}).")
+
+            if self.qdrant_service.resolve_collection(collection_name) != target:
+                self._sync_documents(migration, target, embedder, chunker)
+
+                # Troca atômica do alias; uploads feitos depois da última sincronização vão para a geração antiga
+                # e são copiados na sincronização seguinte, já contra a nova geração (agora atrás do alias)
+                self._update(migration_id, {"status": STATUS_SWITCHING})
+                previous = self.qdrant_service.switch_alias(collection_name, target)
+            else:
+                # Retomada de uma migração interrompida depois da troca do alias
+                previous = migration["source"]
+
+            # A nova geração foi indexada inteira com vetores-resumo: libera a busca em dois níveis na coleção
+            self.metadata_service.save_collection_settings(collection_name, profile, vector_size, model_name, summarized=True)
+            self.registry_service.set_collection_model(collection_name, model_name)
+            self.registry_service.set_collection_summarized(collection_name, True)
+            if MIGRATION_SWITCH_GRACE_SECONDS > 0:
+                time.sleep(MIGRATION_SWITCH_GRACE_SECONDS)
+
+            # Nessa última sincronização o texto dos chunks é lido da geração anterior, que ainda existe
+            source = previous if previous and previous not in (target, collection_name) and self.qdrant_service.physical_exists(previous) else None
+            self._sync_documents(self.migrations.find_one({"_id": migration_id}), target, embedder, chunker, source)
+
+            if source:
+                self.qdrant_service.delete_collection(previous)
+
+            self._update(migration_id, {"status": STATUS_COMPLETED, "finished_at": datetime.now()})
+            print(f"INFO: Migração de '{collection_name}' concluída; alias aponta para {target}.")
+        except Exception as e:
+            print(f"[ERRO] Falha na migração {migration_id}: {e}")
+            self._update(migration_id, {"status": STATUS_FAILED, "error": str(e)})
+
+    def _sync_documents(self, migration: dict, target: str, embedder, chunker, source: str | None = None):
+        """Indexa na geração de destino os documentos ainda não migrados até não sobrar diferença."""
+        collection_name = migration["collection_name"]
+        done = set(migration.get("done", []))
+
+        while True:
+            documents = self.metadata_service.list_hashes_in_collection(collection_name)  # hash -> ID
+            pending = [doc_hash for doc_hash in documents if doc_hash not in done]
+            # Documentos excluídos (ou substituídos por nova versão) durante a migração
+            removed = done - documents.keys()
+            if not pending and not removed:
+                return
+
+            for doc_hash in removed:
+                self.qdrant_service.delete_by_doc_id(doc_hash, collection_name, physical_name=target)
+                done.discard(doc_hash)
+                self.migrations.update_one({"_id": migration["_id"]}, {"$pull": {"done": doc_hash}, "$inc": {"documents_done": -1}})
+
+            for doc_hash in pending:
+                chunks = self._document_chunks(collection_name, documents[doc_hash], doc_hash, migration["rechunk"], chunker, source)
+                if chunks:
+                    vectors = embedder.embed_chunks(chunks)
+                    if not self.qdrant_service.index_chunks(chunks, collection_name, vectors, physical_name=target):
+                        raise RuntimeError(f"Falha ao indexar o documento {doc_hash} em {target}")
+
+                done.add(doc_hash)
+                self.migrations.update_one({"_id": migration["_id"]}, {
+                    "$addToSet": {"done": doc_hash},
+                    "$inc": {"documents_done": 1, "chunks_done": len(chunks)},
+                    "$set": {"updated_at": datetime.now(), "total_documents": len(documents)}
+                })
+
+    def _document_chunks(self, collection_name: str, doc_id: str, doc_hash: str, rechunk: bool, chunker, source: str | None = None) -> list[dict]:
+        if not rechunk:
+            # Reaproveita o texto dos chunks já indexados na geração atual
+            indexed = self.qdrant_service.get_all_chunks_by_doc_hashes(collection_name, [doc_hash], physical_name=source).get(doc_hash, [])
+            if indexed:
+                return [
+                    {"text": chunk["text"], "doc_id": doc_hash, "filename": chunk["filename"], "chunk_id": chunk["chunk_index"], "page": chunk["page"]}
+                    for chunk in sorted(indexed, key=lambda c: c["chunk_index"])
+                ]
+            # Sem chunks na geração de origem: refaz a partir do original
+
+        record = self.metadata_service.get_document_by_id(doc_id)
+        gridfs_file = self.metadata_service.get_file_from_gridfs(record.get("gridfs_file_id")) if record else None
+        if not gridfs_file:
+            print(f"[ERRO] Original do documento {doc_id} não encontrado no GridFS; documento ignorado na migração.")
+            return []
+
+        filename = record.get("original_filename", "")
+        with tempfile.NamedTemporaryFile(suffix=Path(filename).suffix, delete=False) as temp_file:
+            for block in iter(lambda: gridfs_file.read(1024 * 1024), b""):
+                temp_file.write(block)
+        try:
+            pages = ExtractTextService.extract_pages(temp_file.name, doc_hash)
+        finally:
+            os.remove(temp_file.name)
+
+        chunks = chunker.chunk_pages(pages, doc_id=doc_hash, filename=filename)
+        return chunks if isinstance(chunks, list) else []
+
+    def _update(self, migration_id: str, fields: dict):
+        fields["updated_at"] = datetime.now()
+        self.migrations.update_one({"_id": migration_id}, {"$set": fields})
+
+    def status(self, collection_name: str | None = None) -> list[dict]:
+        """Progresso e vazão das migrações (mais recentes primeiro)."""
+        query = {"collection_name": collection_name} if collection_name else {}
+        return [self._format(migration) for migration in self.migrations.find(query, {"done": 0}).sort("started_at", -1)]
+
+    @staticmethod
+    def _format(migration: dict) -> dict:
+        now = datetime.now()
+        end = migration.get("finished_at") or (now if migration["status"] in (STATUS_RUNNING, STATUS_SWITCHING) else migration["updated_at"])
+        run_seconds = max((end - migration["run_started_at"]).total_seconds(), 1e-6)
+        documents_per_second = (migration["documents_done"] - migration.get("run_documents_start", 0)) / run_seconds
+        remaining = max(migration["total_documents"] - migration["documents_done"], 0)
+
+        return {
+            "id": migration["_id"],
+            "collection_name": migration["collection_name"],
+            "source": migration["source"],
+            "target": migration["target"],
+            "model_name": migration["model_name"],
+            "rechunk": migration["rechunk"],
+            "status": migration["status"],
+            "documents_done": migration["documents_done"],
+            "total_documents": migration["total_documents"],
+            "progress": round(migration["documents_done"] / migration["total_documents"], 4) if migration["total_documents"] else 1.0,
+            "chunks_done": migration["chunks_done"],
+            "chunks_per_second": round((migration["chunks_done"] - migration.get("run_chunks_start", 0)) / run_seconds, 2),
+            "documents_per_second": round(documents_per_second, 3),
+            "eta_seconds": round(remaining / documents_per_second) if documents_per_second and migration["status"] == STATUS_RUNNING else None,
+            "started_at": migration["started_at"],
+            "updated_at": migration["updated_at"],
+            "finished_at": migration.get("finished_at"),
+            "error": migration.get("error"),
+        }
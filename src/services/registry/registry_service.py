@@ -0,0 +1,240 @@
+# src/services/registry/registry_service.py
+import os
+import threading
+import time
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+from config.collection_profiles import DEFAULT_PROFILE
+
+load_dotenv()
+
+REGISTRY_TTL_SECONDS = float(os.getenv("REGISTRY_TTL_SECONDS", 30))
+# Modelo de embedding das coleções criadas antes de o modelo ser registrado nas configurações
+LEGACY_MODEL_NAME = os.getenv("LEGACY_MODEL_NAME") or os.getenv("MODEL_NAME")
+
+
+class RegistryService:
+    """
+    Registro em memória das coleções e dos documentos conhecidos.
+    Carregado na inicialização e atualizado pelos fluxos de criação/exclusão/upload deste serviço.
+    Alterações feitas por outras instâncias aparecem após o TTL: vencido o prazo, uma única recarga
+    roda em segundo plano e as requisições seguem com o último registro enquanto ela não termina.
+    """
+
+    def __init__(self, qdrant_service, metadata_service, ttl_seconds: float = REGISTRY_TTL_SECONDS):
+        self.qdrant_service = qdrant_service
+        self.metadata_service = metadata_service
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.RLock()
+        # Uma carga por vez; alterações locais feitas durante a carga são reaplicadas sobre o resultado
+        self.load_lock = threading.RLock()
+        self.loading = False
+        self.refreshing = False
+        self.journal = []
+
+        self.collections = set()
+        self.profiles = {}  # collection_name -> perfil de desempenho
+        self.models = {}  # collection_name -> modelo de embedding da geração atrás do alias
+        self.summarized = set()  # coleções em que todos os documentos têm vetores-resumo
+        self.hashes_by_collection = defaultdict(set)
+        self.documents = {}  # doc_id -> (collection_name, active_version_hash)
+        self.loaded_at = 0.0
+
+    def load(self):
+        """Recarrega o registro a partir do Qdrant e do MongoDB."""
+        with self.load_lock:
+            with self.lock:
+                self.loading = True
+                self.journal = []
+            try:
+                return self._load()
+            finally:
+                with self.lock:
+                    self.loading = False
+                    self.journal = []
+
+    def _load(self):
+        try:
+            collections = set(self.qdrant_service.list_collection_names())
+            records = self.metadata_service.list_document_index()
+            settings = self.metadata_service.list_collection_settings()
+        except Exception as e:
+            print(f"[ERRO] Falha ao carregar o registro de coleções/documentos: {e}")
+            # Evita repetir a carga a cada requisição enquanto as bases estão indisponíveis
+            with self.lock:
+                self.loaded_at = time.monotonic()
+            return False
+
+        hashes_by_collection = defaultdict(set)
+        documents = {}
+        for record in records:
+            collection_name = record.get("collection_name")
+            doc_hash = record.get("active_version_hash")
+            hashes_by_collection[collection_name].add(doc_hash)
+            documents[record["id"]] = (collection_name, doc_hash)
+
+        with self.lock:
+            self.collections = collections
+            self.profiles = {name: entry.get("profile", DEFAULT_PROFILE) for name, entry in settings.items()}
+            self.models = {name: entry["model_name"] for name, entry in settings.items() if entry.get("model_name")}
+            self.summarized = {name for name, entry in settings.items() if entry.get("summarized")}
+            self.hashes_by_collection = hashes_by_collection
+            self.documents = documents
+            self.loaded_at = time.monotonic()
+
+            # Alterações feitas por este processo enquanto as bases eram lidas podem não estar na leitura
+            journal, self.journal, self.loading = self.journal, [], False
+            for operation, args in journal:
+                operation(*args)
+
+        print(f"INFO: Registro carregado com {len(collections)} coleção(ões) e {len(documents)} documento(s).")
+        return True
+
+    def _ensure_fresh(self):
+        if not self.loaded_at:
+            # Primeira carga (antes do warm-up): as requisições concorrentes esperam a mesma carga
+            with self.load_lock:
+                if not self.loaded_at:
+                    self.load()
+            return
+        if time.monotonic() - self.loaded_at > self.ttl_seconds:
+            self._refresh_in_background()
+
+    def _refresh_in_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._background_refresh, name="registry-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.load()
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+    def _record(self, operation, *args):
+        """Anota uma alteração local feita durante uma carga (chamado com `self.lock`)."""
+        if self.loading:
+            self.journal.append((operation, args))
+
+    # ---------------- Coleções ----------------
+
+    def collection_exists(self, collection_name: str) -> bool:
+        self._ensure_fresh()
+        with self.lock:
+            if collection_name in self.collections:
+                return True
+
+        # Ausência no registro: confirma na base (caminho raro, normalmente um erro do cliente)
+        if self.qdrant_service.collection_exists(collection_name):
+            self.add_collection(collection_name)
+            return True
+        return False
+
+    def add_collection(self, collection_name: str, profile: str | None = None, model_name: str | None = None,
+                       summarized: bool = False):
+        with self.lock:
+            self._record(self.add_collection, collection_name, profile, model_name, summarized)
+            self.collections.add(collection_name)
+            if profile:
+                self.profiles[collection_name] = profile
+            if model_name:
+                self.models[collection_name] = model_name
+            if summarized:
+                self.summarized.add(collection_name)
+
+    def set_collection_model(self, collection_name: str, model_name: str):
+        with self.lock:
+            self._record(self.set_collection_model, collection_name, model_name)
+            self.models[collection_name] = model_name
+
+    def set_collection_summarized(self, collection_name: str, summarized: bool):
+        with self.lock:
+            self._record(self.set_collection_summarized, collection_name, summarized)
+            if summarized:
+                self.summarized.add(collection_name)
+            else:
+                self.summarized.discard(collection_name)
+
+    def remove_collection(self, collection_name: str):
+        with self.lock:
+            self._record(self.remove_collection, collection_name)
+            self.collections.discard(collection_name)
+            self.profiles.pop(collection_name, None)
+            self.models.pop(collection_name, None)
+            self.summarized.discard(collection_name)
+            self.hashes_by_collection.pop(collection_name, None)
+            self.documents = {
+                doc_id: entry for doc_id, entry in self.documents.items() if entry[0] != collection_name
+            }
+
+    def get_collection_profile(self, collection_name: str) -> str:
+        """Perfil de desempenho da coleção; coleções anteriores aos perfis usam o padrão."""
+        self._ensure_fresh()
+        with self.lock:
+            return self.profiles.get(collection_name, DEFAULT_PROFILE)
+
+    def get_collection_model(self, collection_name: str) -> str:
+        """Modelo de embedding que atende a coleção; coleções anteriores ao registro usam LEGACY_MODEL_NAME."""
+        self._ensure_fresh()
+        with self.lock:
+            return self.models.get(collection_name, LEGACY_MODEL_NAME)
+
+    def is_collection_summarized(self, collection_name: str) -> bool:
+        """
+        Se todos os documentos da coleção têm vetores-resumo: só então a busca de chunks pode ser
+        restrita aos documentos candidatos. Coleções anteriores a eles passam a ter após uma migração.
+        """
+        self._ensure_fresh()
+        with self.lock:
+            return collection_name in self.summarized
+
+    # ---------------- Documentos ----------------
+
+    def document_exists(self, doc_hash: str, collection_name: str) -> bool:
+        self._ensure_fresh()
+        with self.lock:
+            return doc_hash in self.hashes_by_collection.get(collection_name, ())
+
+    def collections_with_document(self, doc_hash: str) -> list[str]:
+        """Coleções em que um documento com o hash está indexado."""
+        self._ensure_fresh()
+        with self.lock:
+            return [name for name, hashes in self.hashes_by_collection.items() if doc_hash in hashes]
+
+    def document_id_exists(self, doc_id: str) -> bool:
+        self._ensure_fresh()
+        with self.lock:
+            if doc_id in self.documents:
+                return True
+
+        record = self.metadata_service.get_document_by_id(doc_id)
+        if record:
+            self.add_document(record["id"], record.get("collection_name"), record.get("active_version_hash"))
+            return True
+        return False
+
+    def add_document(self, doc_id: str, collection_name: str, doc_hash: str):
+        with self.lock:
+            self._record(self.add_document, doc_id, collection_name, doc_hash)
+            self.documents[doc_id] = (collection_name, doc_hash)
+            self.hashes_by_collection[collection_name].add(doc_hash)
+
+    def update_document(self, doc_id: str, collection_name: str, old_hash: str, new_hash: str):
+        with self.lock:
+            self._record(self.update_document, doc_id, collection_name, old_hash, new_hash)
+            self.hashes_by_collection[collection_name].discard(old_hash)
+            self.documents[doc_id] = (collection_name, new_hash)
+            self.hashes_by_collection[collection_name].add(new_hash)
+
+    def remove_document(self, doc_id: str):
+        with self.lock:
+            self._record(self.remove_document, doc_id)
+            entry = self.documents.pop(doc_id, None)
+            if entry:
+                collection_name, doc_hash = entry
+                self.hashes_by_collection[collection_name].discard(doc_hash)
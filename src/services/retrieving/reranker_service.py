@@ -1,16 +1,24 @@
 # reranker_service.py
 import os
+import threading
 import torch
 from collections import defaultdict
+from contextlib import nullcontext
 
 from dotenv import load_dotenv
 from sentence_transformers import CrossEncoder
 
+from services.inference.micro_batcher import MICROBATCH_ENABLED, MicroBatcher
+
 load_dotenv()
 
 RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME")
 MAXIMUM_CHUNK_TOP = int(os.getenv("RERANKER_MAXIMUM_CHUNK_TOP"))
 THRESHOLD_RERANKER = float(os.getenv("THRESHOLD_RERANKER"))
+# Máximo de pares (pergunta, chunk) de requisições diferentes agrupados em um lote
+RERANK_MICROBATCH_SIZE = int(os.getenv("RERANK_MICROBATCH_SIZE", 512))
+# Pares por forward do cross-encoder
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 128))
 
 class Reranker:
     def __init__(self):
@@ -21,6 +29,14 @@ class Reranker:
         self.model = CrossEncoder(RERANKER_MODEL_NAME)
         self.threshold = THRESHOLD_RERANKER
         self.max_chunks = MAXIMUM_CHUNK_TOP
+        # Agrupa os pares de re-ranqueamento de requisições concorrentes em um único predict
+        self.batcher = MicroBatcher("rerank", self._predict, RERANK_MICROBATCH_SIZE) if MICROBATCH_ENABLED else None
+        # Sem micro-batching, predicts de threads diferentes disputariam o tokenizer (não é thread-safe)
+        self.predict_lock = threading.Lock()
+
+    def _predict(self, pairs: list) -> list:
+        with self.predict_lock:
+            return self.model.predict(pairs, batch_size=RERANK_BATCH_SIZE, show_progress_bar=False)
 
     def rerank(self, question: str, chunks_by_doc: dict) -> dict:
         """
@@ -39,9 +55,43 @@ class Reranker:
         
         # Executar a predição uma vez para todos os pares
         print("INFO: Iniciando o processo de re-ranqueamento...")
-        scores = self.model.predict(pairs, show_progress_bar=True)
+        scores = self.batcher.submit(pairs) if self.batcher else self._predict(pairs)
         print("INFO: Re-ranqueamento concluído.")
 
+        return self._select(all_chunks, scores)
+
+    def rerank_batch(self, questions: list[str], chunks_by_doc_per_question: list[dict], slot=nullcontext) -> list[dict]:
+        """
+        Re-ranqueia o contexto de várias perguntas. Os pares vão ao micro-batcher em partes de até
+        RERANK_MICROBATCH_SIZE, uma depois da outra: os re-ranqueamentos de /ask entram nos lotes
+        entre elas, e cada parte ocupa sua própria vaga de `slot` (controle de admissão).
+        Os chunks podem ser compartilhados entre perguntas (contexto deduplicado), então cada pergunta
+        recebe cópias com o seu próprio `rerank_score`.
+        """
+        chunks_per_question = [
+            [dict(chunk) for chunks in chunks_by_doc.values() for chunk in chunks]
+            for chunks_by_doc in chunks_by_doc_per_question
+        ]
+        pairs = [[question, chunk["text"]] for question, chunks in zip(questions, chunks_per_question) for chunk in chunks]
+        if not pairs:
+            return [{} for _ in questions]
+
+        print(f"INFO: Re-ranqueando {len(pairs)} pares de {len(questions)} perguntas...")
+        scores = []
+        for start in range(0, len(pairs), RERANK_MICROBATCH_SIZE):
+            part = pairs[start:start + RERANK_MICROBATCH_SIZE]
+            with slot():
+                scores.extend(self.batcher.submit(part) if self.batcher else self._predict(part))
+
+        results = []
+        offset = 0
+        for chunks in chunks_per_question:
+            results.append(self._select(chunks, scores[offset:offset + len(chunks)]) if chunks else {})
+            offset += len(chunks)
+        return results
+
+    def _select(self, all_chunks: list, scores) -> dict:
+        """Atribui os scores, aplica o limiar e o top-k e reagrupa os chunks por documento."""
         # Atribuir os scores e ordenar a lista global de chunks
         for chunk, score in zip(all_chunks, scores):
             chunk["rerank_score"] = float(score)
@@ -60,4 +110,4 @@ class Reranker:
             doc_id = chunk["document_id"]
             reranked_result[doc_id].append(chunk)
 
-        return dict(reranked_result)
\ No newline at end of file
+        return dict(reranked_result)
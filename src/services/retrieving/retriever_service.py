@@ -1,9 +1,10 @@
 import os
+from functools import lru_cache
 
 import numpy as np
 from dotenv import load_dotenv
 
-from services.container import get_embedder_service
+from services.container import LazyService, get_embedder_service
 from services.description_collections import DESCRICOES
 
 load_dotenv()
@@ -11,7 +12,7 @@ load_dotenv()
 MAXIMUM_CHUNK_TOP = int(os.getenv("MAXIMUM_CHUNK_TOP"))
 THRESHOLD = float(os.getenv("THRESHOLD"))
 
-embedder_service = get_embedder_service()
+embedder_service = LazyService(get_embedder_service)
 
 class Retriever:
     @staticmethod
@@ -25,11 +26,8 @@ class Retriever:
         """Avalia quais coleções são mais relevantes para a pergunta."""
         scores = {}
 
-        # para cada coleção, calcula a média dos embeddings das descrições
-        for nome, descricoes in DESCRICOES.items():
-            # cria lista de embeddings para cada descrição
-            desc_embs = [embedder_service.embed_text(desc) for desc in descricoes]
-            desc_emb = np.mean(np.array(desc_embs), axis=0)
+        # para cada coleção, compara com a média dos embeddings das descrições
+        for nome, desc_emb in Retriever.description_embeddings().items():
             score = Retriever.cosine_similarity(vector_question, desc_emb)
             scores[nome] = score
 
@@ -46,6 +44,15 @@ class Retriever:
 
         return colecoes_relevantes
 
+    @staticmethod
+    @lru_cache()
+    def description_embeddings() -> dict:
+        """Média dos embeddings das descrições de cada coleção (as descrições são fixas, calcula uma vez)."""
+        return {
+            nome: np.mean(np.array(embedder_service.embed_texts(descricoes)), axis=0)
+            for nome, descricoes in DESCRICOES.items()
+        }
+
     @staticmethod
     def cosine_similarity(a, b):
         a = np.array(a)
@@ -0,0 +1,64 @@
+# src/services/vectorstore/chunk_cache.py
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from utils.lru_cache import MISSING, LRUCache
+
+load_dotenv()
+
+CHUNK_CACHE_ENABLED = os.getenv("CHUNK_CACHE_ENABLED", "true").lower() == "true"
+CHUNK_CACHE_MAX_DOCUMENTS = int(os.getenv("CHUNK_CACHE_MAX_DOCUMENTS", 2000))
+CHUNK_CACHE_MAX_MB = float(os.getenv("CHUNK_CACHE_MAX_MB", 256))
+
+# Estimativa do dicionário de cada chunk e dos campos curtos (nome do arquivo, ids, página, coleção)
+CHUNK_OVERHEAD_BYTES = 600
+
+
+def _estimate_bytes(chunks: list[dict]) -> int:
+    return sum(sys.getsizeof(chunk.get("text") or "") + CHUNK_OVERHEAD_BYTES for chunk in chunks)
+
+
+class ChunkCache:
+    """
+    Cache em memória, LRU e limitado em bytes, da lista completa de chunks de cada documento,
+    usada na expansão por documento inteiro. A chave é (coleção, hash): o hash é endereçado por
+    conteúdo, então a lista só muda quando o documento é reindexado ou removido da coleção, e é
+    nesses pontos que a entrada é invalidada. É aquecido pelo próprio tráfego: os documentos mais
+    consultados ficam em memória e deixam de ser lidos do Qdrant a cada pergunta.
+    """
+
+    def __init__(self, max_documents: int = CHUNK_CACHE_MAX_DOCUMENTS, max_bytes: int = int(CHUNK_CACHE_MAX_MB * 1024 * 1024)):
+        self.entries = LRUCache(max_documents, max_weight=max_bytes, weigher=_estimate_bytes)
+
+    def get_many(self, collection_name: str, doc_hashes: list[str]) -> tuple[dict, list[str]]:
+        """
+        Retorna os documentos em cache (hash -> cópias dos chunks) e os hashes que faltam.
+        As cópias protegem o cache de campos gravados depois pelo re-ranqueamento (`rerank_score`).
+        """
+        found, missing = {}, []
+        for doc_hash in doc_hashes:
+            chunks = self.entries.get((collection_name, doc_hash))
+            if chunks is MISSING:
+                missing.append(doc_hash)
+            else:
+                found[doc_hash] = [dict(chunk) for chunk in chunks]
+        return found, missing
+
+    def put(self, collection_name: str, doc_hash: str, chunks: list[dict]):
+        self.entries.put((collection_name, doc_hash), [dict(chunk) for chunk in chunks])
+
+    def invalidate(self, collection_name: str, doc_hash: str):
+        self.entries.pop((collection_name, doc_hash))
+
+    def invalidate_collection(self, collection_name: str):
+        for key in self.entries.keys():
+            if key[0] == collection_name:
+                self.entries.pop(key)
+
+    def stats(self) -> dict:
+        stats = self.entries.stats()
+        stats["size_mb"] = round(stats["weight"] / 1024 / 1024, 2)
+        stats["max_mb"] = round(stats["max_weight"] / 1024 / 1024, 2)
+        return stats
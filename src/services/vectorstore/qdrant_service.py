@@ -1,88 +1,406 @@
 # src/services/vectorstore/qdrant_service.py
+import os
+import time
 import uuid
 from collections import defaultdict
 from typing import Any, Dict, List
 
+import numpy as np
+from dotenv import load_dotenv
 from qdrant_client.http.models import Range
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import (Distance, FieldCondition, Filter,
-                                       MatchValue, PointStruct, VectorParams)
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (CollectionDescription,
+                                       CollectionsResponse, CreateAlias,
+                                       CreateAliasOperation, DeleteAlias,
+                                       DeleteAliasOperation, FieldCondition,
+                                       Filter, KeywordIndexParams,
+                                       KeywordIndexType, MatchAny, MatchValue,
+                                       PayloadSchemaType, PointStruct,
+                                       SearchParams, SearchRequest)
+
+from config.collection_profiles import DEFAULT_PROFILE, build_collection_params
+
+load_dotenv()
+
+# Pontos por requisição ao gravar os chunks de um documento
+UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", 256))
+
+# Vetores-resumo por documento (`kind` = "document" no payload), usados na busca em dois níveis
+DOCUMENT_KIND = "document"
+# Páginas iniciais usadas no vetor-resumo de abertura do documento
+DOCUMENT_SUMMARY_PAGES = int(os.getenv("DOCUMENT_SUMMARY_PAGES", 2))
+
+# Modos de armazenamento: uma coleção física por coleção lógica, ou todas em uma coleção compartilhada
+STORAGE_MODE_COLLECTIONS = "collections"
+STORAGE_MODE_SHARED = "shared"
+
+# No modo por coleção, cada coleção lógica é um alias para uma geração física (`nome__g1`, `nome__g2`, ...),
+# o que permite reconstruir o índice em outra geração e trocar o alias de forma atômica
+GENERATION_SEPARATOR = "__g"
+
+# Espera antes de repetir uma operação que não achou a coleção: na conversão de uma coleção antiga
+# (anterior aos aliases), o nome fica livre entre a remoção da coleção e a criação do alias
+ALIAS_SWITCH_RETRY_SECONDS = float(os.getenv("QDRANT_ALIAS_SWITCH_RETRY_SECONDS", 0.5))
+
+# Namespace dos IDs determinísticos dos pontos (uuid5 de hash do documento + índice do chunk)
+POINT_ID_NAMESPACE = uuid.UUID("6f1d7a52-3c1e-4b7e-9a55-2d1f0c8e4b91")
 
 
 class QdrantService:
-    def __init__(self, client: QdrantClient, model=None):
+    def __init__(self, client: QdrantClient, model=None, storage_mode: str = STORAGE_MODE_COLLECTIONS,
+                 shared_collection: str | None = None, shared_profile: str = DEFAULT_PROFILE, catalog=None, chunk_cache=None,
+                 text_store=None):
+        """
+        No modo compartilhado, as coleções lógicas são partições (chave `collection` do payload, indexada
+        como tenant) de `shared_collection`, e a lista de coleções lógicas vem do catálogo (MetadataService).
+        `chunk_cache` (ChunkCache) guarda em memória os chunks dos documentos mais usados na expansão.
+        Com `text_store` (ChunkTextStore), o texto dos chunks fica fora do payload e só é lido, em lote,
+        para os chunks que seguem para o re-ranqueamento (`load_texts`).
+        """
         self.client = client
         self.model = model
+        self.shared = storage_mode == STORAGE_MODE_SHARED
+        self.shared_collection = shared_collection
+        self.shared_profile = shared_profile
+        self.catalog = catalog
+        self.chunk_cache = chunk_cache
+        self.text_store = text_store
+
+    def _retry_missing(self, operation, **kwargs):
+        """Executa a operação do cliente e a repete uma vez se a coleção não existir (troca de alias em curso)."""
+        try:
+            return operation(**kwargs)
+        except UnexpectedResponse as e:
+            if e.status_code != 404:
+                raise
+        time.sleep(ALIAS_SWITCH_RETRY_SECONDS)
+        return operation(**kwargs)
+
+    def physical_exists(self, physical_name: str) -> bool:
+        return self.client.collection_exists(physical_name)
+
+    def _physical(self, collection_name: str) -> str:
+        """Nome usado nas operações de pontos: a coleção compartilhada, ou a própria coleção lógica (alias)."""
+        return self.shared_collection if self.shared else collection_name
+
+    def _filter(self, collection_names: List[str], *conditions, chunks_only: bool = False) -> Filter:
+        """
+        Monta o filtro das condições, restrito às coleções lógicas no modo compartilhado.
+        `chunks_only` exclui os vetores-resumo de documentos.
+        """
+        must = list(conditions)
+        if self.shared:
+            if len(collection_names) == 1:
+                must.append(FieldCondition(key="collection", match=MatchValue(value=collection_names[0])))
+            else:
+                must.append(FieldCondition(key="collection", match=MatchAny(any=list(collection_names))))
+        must_not = [FieldCondition(key="kind", match=MatchValue(value=DOCUMENT_KIND))] if chunks_only else None
+        return Filter(must=must, must_not=must_not)
+
+    def point_id(self, collection_name: str, doc_hash: str, chunk_id: int) -> str:
+        """
+        ID determinístico do ponto, derivado de (doc_hash, chunk_id): permite buscar os chunks vizinhos
+        por ID e torna a reindexação do mesmo documento idempotente. No modo compartilhado o mesmo
+        documento pode estar em várias coleções lógicas da mesma coleção física, então a coleção entra na chave.
+        """
+        key = f"{collection_name}:{doc_hash}:{chunk_id}" if self.shared else f"{doc_hash}:{chunk_id}"
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, key))
+
+    @staticmethod
+    def _format_chunk(payload: dict, score: float, collection_name: str, point_id=None) -> Dict[str, Any]:
+        chunk = {
+            # Com payload enxuto o texto vem depois, pelo `text_key` (load_texts)
+            "text": payload.get("text"),
+            "document_id": payload.get("doc_id"),
+            "filename": payload.get("filename", "desconhecido"),
+            "chunk_index": payload.get("chunk_id", -1),
+            "page": payload.get("page", None),
+            "collection": payload.get("collection", collection_name),
+            "score": score,
+            "point_id": str(point_id) if point_id is not None else None,
+        }
+        if "text_key" in payload:
+            chunk["text_key"] = payload["text_key"]
+        return chunk
 
     def collection_exists(self, collection_name: str) -> bool:
+        if self.shared:
+            return self.catalog.get_collection_settings(collection_name) is not None
         try:
-            return self.client.get_collection(collection_name) is not None
+            return self.client.collection_exists(self.resolve_collection(collection_name))
         except Exception:
             return False
 
-    def create_collection(self, collection_name: str, vector_size: int) -> bool:
+    def create_collection(self, collection_name: str, vector_size: int, profile: str = DEFAULT_PROFILE) -> bool:
         try:
-            self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
-                )
+            if self.shared:
+                # A coleção lógica passa a existir quando é registrada no catálogo; aqui só garante a física
+                self._ensure_shared_collection(vector_size)
+                return True
+
+            physical_name = self.generation_name(collection_name, 1)
+            existed = self.client.collection_exists(physical_name)
+            if existed and physical_name in self._aliases().values():
+                print(f"[ERRO] A coleção física '{physical_name}' já está em uso.")
+                return False
+            # Reaproveita a geração deixada por uma criação que falhou antes do alias
+            self.create_generation(collection_name, 1, vector_size, profile)
+            try:
+                self.client.update_collection_aliases(change_aliases_operations=[
+                    CreateAliasOperation(create_alias=CreateAlias(collection_name=physical_name, alias_name=collection_name))
+                ])
+            except Exception:
+                # Sem o alias a geração ficaria órfã, fora da listagem de coleções
+                if not existed:
+                    self.client.delete_collection(physical_name)
+                raise
             return True
         except Exception as e:
             print(f"[ERRO] Falha ao criar coleção: {e}")
             return False
-        
+
+    # ---------------- Gerações (aliases) ----------------
+
+    @staticmethod
+    def generation_name(collection_name: str, generation: int) -> str:
+        return f"{collection_name}{GENERATION_SEPARATOR}{generation}"
+
+    @staticmethod
+    def generation_of(physical_name: str) -> int:
+        """Geração de uma coleção física; coleções criadas antes dos aliases são a geração 0."""
+        _, separator, generation = physical_name.rpartition(GENERATION_SEPARATOR)
+        return int(generation) if separator and generation.isdigit() else 0
+
+    def _aliases(self) -> Dict[str, str]:
+        return {alias.alias_name: alias.collection_name for alias in self.client.get_aliases().aliases}
+
+    def resolve_collection(self, collection_name: str) -> str:
+        """Coleção física que atende a coleção lógica (o alias, ou a própria coleção nas criadas antes dos aliases)."""
+        if self.shared:
+            return self.shared_collection
+        return self._aliases().get(collection_name, collection_name)
+
+    def create_generation(self, collection_name: str, generation: int, vector_size: int, profile: str = DEFAULT_PROFILE) -> str:
+        """Cria (ou reaproveita, ao retomar uma migração) uma geração física ainda fora do alias."""
+        physical_name = self.generation_name(collection_name, generation)
+        if not self.client.collection_exists(physical_name):
+            self.client.create_collection(collection_name=physical_name, **build_collection_params(profile, vector_size))
+            self._create_payload_indexes(physical_name)
+        return physical_name
+
+    def _create_payload_indexes(self, physical_name: str):
+        """
+        Índices de `doc_id` e `kind`: com eles, as buscas filtradas por documento ou por tipo de vetor
+        percorrem só os pontos que passam no filtro, em vez do grafo inteiro.
+        """
+        for field_name in ("doc_id", "kind"):
+            self.client.create_payload_index(
+                collection_name=physical_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD
+            )
+
+    def switch_alias(self, collection_name: str, physical_name: str) -> str | None:
+        """
+        Aponta o alias da coleção lógica para `physical_name` e retorna a coleção física anterior.
+        Com alias existente, remoção e criação vão na mesma operação (troca atômica). Coleções criadas
+        antes dos aliases precisam ser removidas antes: o Qdrant não aceita um alias com o nome de uma
+        coleção. A criação do alias vem logo em seguida, e as leituras e gravações que caírem entre as
+        duas chamadas são repetidas uma vez (`_retry_missing`) e já encontram o alias.
+        """
+        previous = self._aliases().get(collection_name)
+        operations = []
+        legacy = False
+        if previous:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=collection_name)))
+        elif self.client.collection_exists(collection_name):
+            previous = collection_name
+            legacy = True
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=physical_name, alias_name=collection_name)))
+        if legacy:
+            self.client.delete_collection(collection_name)
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        if legacy and self.text_store:
+            self.text_store.delete(collection_name)
+        if self.chunk_cache:
+            # A nova geração pode ter sido gerada com outro modelo e outros chunks
+            self.chunk_cache.invalidate_collection(collection_name)
+        return previous
+
+    def _ensure_shared_collection(self, vector_size: int):
+        if self.client.collection_exists(self.shared_collection):
+            return
+
+        self.client.create_collection(
+            collection_name=self.shared_collection,
+            **build_collection_params(self.shared_profile, vector_size)
+        )
+        # `is_tenant` faz o Qdrant organizar o armazenamento por coleção lógica
+        self.client.create_payload_index(
+            collection_name=self.shared_collection,
+            field_name="collection",
+            field_schema=KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True)
+        )
+        self._create_payload_indexes(self.shared_collection)
+        print(f"INFO: Coleção compartilhada '{self.shared_collection}' criada (perfil '{self.shared_profile}').")
 
     def delete_collection(self, collection_name: str) -> bool:
+        if self.chunk_cache:
+            self.chunk_cache.invalidate_collection(collection_name)
         try:
-            self.client.delete_collection(collection_name)
+            if self.shared:
+                self.client.delete(
+                    collection_name=self.shared_collection,
+                    points_selector=self._filter([collection_name])
+                )
+                if self.text_store:
+                    self.text_store.delete(self.shared_collection, collection_name)
+                return True
+
+            physical_name = self.resolve_collection(collection_name)
+            if physical_name != collection_name:
+                self.client.update_collection_aliases(change_aliases_operations=[
+                    DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=collection_name))
+                ])
+            self.client.delete_collection(physical_name)
+            if self.text_store:
+                self.text_store.delete(physical_name)
             return True
         except Exception as e:
             print(f"[ERRO] Falha ao deletar coleção: {e}")
             return False
 
-    def index_chunks(self, chunks: List[Dict[str, Any]], collection_name: str, vectors: List[List[float]]) -> None:
-
+    def index_chunks(self, chunks: List[Dict[str, Any]], collection_name: str, vectors: np.ndarray, physical_name: str | None = None) -> bool:
+        """
+        Indexa os chunks na coleção lógica; `physical_name` grava em uma geração fora do alias (migração).
+        `vectors` é a matriz float32 do embedder, enviada ao Qdrant em lotes sem conversão para listas.
+        Junto com os chunks são gravados os vetores-resumo de cada documento.
+        """
+        if self.chunk_cache and not physical_name:
+            for doc_hash in {chunk["doc_id"] for chunk in chunks}:
+                self.chunk_cache.invalidate(collection_name, doc_hash)
         try:
-            points = [
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload={
-                        "text": chunk["text"],
-                        "doc_id": chunk["doc_id"],
-                        "filename": chunk["filename"],
-                        "chunk_id": chunk["chunk_id"],
-                        "page": chunk.get("page")
-                    }
-                )
-                for chunk, vector in zip(chunks, vectors)
+            vectors = np.asarray(vectors, dtype=np.float32)
+            payloads = [
+                {
+                    "text": chunk["text"],
+                    "doc_id": chunk["doc_id"],
+                    "filename": chunk["filename"],
+                    "chunk_id": chunk["chunk_id"],
+                    "page": chunk.get("page"),
+                    "collection": collection_name
+                }
+                for chunk in chunks
             ]
-            response = self.client.upsert(collection_name=collection_name, points=points)
+            ids = [self.point_id(collection_name, chunk["doc_id"], chunk["chunk_id"]) for chunk in chunks]
+            if self.text_store:
+                payloads = self._slim_payloads(physical_name or self.resolve_collection(collection_name), collection_name, ids, payloads)
 
-            return response.status == "completed"
+            summary_ids, summary_vectors, summary_payloads = self._document_summaries(chunks, vectors, collection_name)
+            if summary_ids:
+                ids += summary_ids
+                payloads += summary_payloads
+                vectors = np.vstack([vectors, summary_vectors])
+
+            self._retry_missing(
+                self.client.upload_collection,
+                collection_name=physical_name or self._physical(collection_name),
+                vectors=vectors,
+                payload=payloads,
+                ids=ids,
+                batch_size=UPSERT_BATCH_SIZE,
+                wait=True
+            )
+            return True
         except Exception as e:
             print(f"[ERRO] Falha ao indexar chunks: {e}")
             return False
-        
 
-    def delete_by_doc_id(self, doc_id: str, collection_name: str) -> bool:
+    def _slim_payloads(self, physical_name: str, collection_name: str, ids: list, payloads: list[dict]) -> list[dict]:
+        """
+        Grava o texto dos payloads no ChunkTextStore e devolve os payloads sem o texto, com a chave
+        (`text_key`) para lê-lo depois. O texto é gravado antes dos pontos, que nunca ficam sem ele.
+        """
+        entries = []
+        slim = []
+        for point_id, payload in zip(ids, payloads):
+            if payload.get("text") is None:
+                slim.append(payload)
+                continue
+            key = self.text_store.text_key(physical_name, point_id)
+            entries.append((key, payload.get("doc_id"), payload["text"]))
+            slim.append({**{field: value for field, value in payload.items() if field != "text"}, "text_key": key})
+        self.text_store.put_many(physical_name, collection_name, entries)
+        return slim
+
+    def load_texts(self, chunks: List[Dict[str, Any]]):
+        """
+        Preenche, com uma leitura em lote do ChunkTextStore, o texto dos chunks de payload enxuto.
+        Chamado só para os chunks que vão ao re-ranqueamento e ao LLM; os que já têm texto são ignorados.
+        """
+        if not self.text_store:
+            return
+        missing = [chunk for chunk in chunks if chunk.get("text") is None and chunk.get("text_key")]
+        if not missing:
+            return
+        texts = self.text_store.get_many([chunk["text_key"] for chunk in missing])
+        for chunk in missing:
+            chunk["text"] = texts.get(chunk["text_key"], "")
+
+    def _document_summaries(self, chunks: List[Dict[str, Any]], vectors: np.ndarray, collection_name: str):
+        """
+        Vetores-resumo de cada documento, a partir dos vetores dos chunks (sem embedding extra):
+        a média de todos os chunks e a média dos chunks das primeiras páginas (título, resumo, sumário).
+        Usam chunk_id negativo, fora da faixa dos chunks, e não têm texto nem página.
+        """
+        rows_by_doc = defaultdict(list)
+        for row, chunk in enumerate(chunks):
+            rows_by_doc[chunk["doc_id"]].append(row)
+
+        ids, summary_vectors, payloads = [], [], []
+        for doc_hash, rows in rows_by_doc.items():
+            opening = [row for row in rows if (chunks[row].get("page") or 1) <= DOCUMENT_SUMMARY_PAGES]
+            summaries = [("mean", rows)]
+            if opening and len(opening) < len(rows):
+                summaries.append(("opening", opening))
+
+            for position, (summary, summary_rows) in enumerate(summaries, start=1):
+                vector = vectors[summary_rows].mean(axis=0)
+                norm = np.linalg.norm(vector)
+                summary_vectors.append(vector / norm if norm else vector)
+                ids.append(self.point_id(collection_name, doc_hash, -position))
+                payloads.append({
+                    "kind": DOCUMENT_KIND,
+                    "summary": summary,
+                    "doc_id": doc_hash,
+                    "filename": chunks[rows[0]]["filename"],
+                    "chunk_id": -position,
+                    "collection": collection_name
+                })
+
+        return ids, np.asarray(summary_vectors, dtype=np.float32), payloads
+
+    def delete_by_doc_id(self, doc_id: str, collection_name: str, physical_name: str | None = None) -> bool:
+        doc_filter = self._filter([collection_name], FieldCondition(key="doc_id", match=MatchValue(value=doc_id)))
+        if self.chunk_cache and not physical_name:
+            self.chunk_cache.invalidate(collection_name, doc_id)
+        physical_name = physical_name or self._physical(collection_name)
         try:
             result = self.client.scroll(
-                collection_name=collection_name,
-                scroll_filter=Filter(
-                    must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
-                ),
+                collection_name=physical_name,
+                scroll_filter=doc_filter,
                 limit=1
             )
             if not result[0]:
                 return False
 
             self.client.delete(
-                collection_name=collection_name,
-                points_selector=Filter(
-                    must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
-                )
+                collection_name=physical_name,
+                points_selector=doc_filter
             )
+            if self.text_store:
+                self.text_store.delete(self.resolve_collection(physical_name), collection_name, doc_id)
             return True
         except Exception as e:
             print(f"[ERRO] Falha ao excluir doc_id={doc_id}: {e}")
@@ -92,13 +410,8 @@ class QdrantService:
         """doc_id é o hash do documento."""
         try:
             result_points, _ = self.client.scroll(
-                collection_name=collection_name,
-                scroll_filter={
-                    "must": [{
-                        "key": "doc_id",
-                        "match": {"value": doc_id}
-                    }]
-                },
+                collection_name=self._physical(collection_name),
+                scroll_filter=self._filter([collection_name], FieldCondition(key="doc_id", match=MatchValue(value=doc_id))),
                 limit=1
             )
             return len(result_points) > 0
@@ -107,18 +420,44 @@ class QdrantService:
             return False
 
     def list_collections(self) -> List[str]:
-        return self.client.get_collections()
-    
+        return CollectionsResponse(
+            collections=[CollectionDescription(name=name) for name in self.list_collection_names()]
+        )
+
+    def list_collection_names(self) -> List[str]:
+        if self.shared:
+            return sorted(self.catalog.list_collection_settings())
+
+        # Coleções lógicas: os aliases e as coleções criadas antes deles (as gerações físicas ficam de fora)
+        aliases = self._aliases()
+        physical_names = [collection.name for collection in self.client.get_collections().collections]
+        legacy = [
+            name for name in physical_names
+            if name not in aliases.values() and not self.generation_of(name)
+        ]
+        return sorted(list(aliases) + legacy)
+
     def get_collection(self, collection_name: str) -> Dict[str, Any]:
         try:
-            collection_info = self.client.get_collection(collection_name)
+            physical_name = self.resolve_collection(collection_name)
+            collection_info = self.client.get_collection(physical_name)
+            # Só os chunks: os vetores-resumo de documentos não entram na contagem
+            points_count = self.client.count(
+                collection_name=physical_name,
+                count_filter=self._filter([collection_name], chunks_only=True),
+                exact=True
+            ).count
+
             return {
                 "collection": {
                     "name": collection_name,
                     "status": collection_info.status,
-                    "vectors_count": collection_info.vectors_count,
-                    "points_count": collection_info.points_count,
-                    "segments_count": collection_info.segments_count
+                    "vectors_count": points_count,
+                    "points_count": points_count,
+                    "segments_count": collection_info.segments_count,
+                    "on_disk": collection_info.config.params.vectors.on_disk,
+                    "quantization": type(collection_info.config.quantization_config).__name__ if collection_info.config.quantization_config else None,
+                    "storage": f"{STORAGE_MODE_SHARED if self.shared else STORAGE_MODE_COLLECTIONS}:{physical_name}"
                 }
             }
         except Exception as e:
@@ -127,115 +466,356 @@ class QdrantService:
                 "collection": None,
                 "error": str(e),
             }
-    
-    def search_question(self, vector_question: str, maximum_chunk_top: int, relevant_collections: List[str], score_threshold) -> Dict[str, List[Dict[str, Any]]]:
+
+    def _plan_searches(self, relevant_collections: List[str], limit: int, search_params: Dict[str, SearchParams],
+                       conditions=lambda collection_names: [], chunks_only: bool = False) -> list[tuple]:
         """
-        Busca os documentos mais relevantes para a pergunta, aplicando um limiar de score.
+        Buscas (coleção física, filtro, limite, parâmetros) de uma pergunta nas coleções relevantes.
+        No modo compartilhado, todas as coleções viram uma única busca filtrada, com o mesmo orçamento
+        de candidatos do modo por coleção (limite por coleção consultada) e o perfil da coleção física.
         """
+        if self.shared:
+            if not relevant_collections:
+                return []
+            return [(
+                self.shared_collection,
+                self._filter(relevant_collections, *conditions(relevant_collections), chunks_only=chunks_only),
+                limit * len(relevant_collections),
+                search_params.get(relevant_collections[0])
+            )]
+        return [
+            (collection_name,
+             self._filter([collection_name], *conditions([collection_name]), chunks_only=chunks_only),
+             limit,
+             search_params.get(collection_name))
+            for collection_name in relevant_collections
+        ]
 
-        grouped = defaultdict(list)
-        for collection_name in relevant_collections:
-            try:
-                results = self.client.search(
-                    collection_name=collection_name,
-                    query_vector=vector_question,
-                    limit=maximum_chunk_top,
-                    with_payload=True,
+    def _search_batch(self, vectors: list, plans: list[list[tuple]], with_payload, score_threshold: float | None = None) -> list[list[tuple]]:
+        """
+        Executa as buscas planejadas de várias perguntas com um `search_batch` por coleção física.
+        Retorna, para cada pergunta, a lista de (coleção física, resultados).
+        """
+        requests_by_physical = defaultdict(list)  # coleção física -> [(índice da pergunta, requisição)]
+        for question_index, (vector, question_plans) in enumerate(zip(vectors, plans)):
+            vector = vector.tolist() if isinstance(vector, np.ndarray) else list(vector)
+            for physical_name, query_filter, limit, params in question_plans:
+                requests_by_physical[physical_name].append((question_index, SearchRequest(
+                    vector=vector,
+                    filter=query_filter,
+                    limit=limit,
+                    params=params,
+                    with_payload=with_payload,
                     score_threshold=score_threshold
-                )
+                )))
+
+        results = [[] for _ in vectors]
+        for physical_name, requests in requests_by_physical.items():
+            try:
+                responses = self._retry_missing(self.client.search_batch, collection_name=physical_name, requests=[request for _, request in requests])
+            except Exception as e:
+                print(f"[ERRO] Falha ao buscar em {physical_name}: {e}")
+                continue
+            for (question_index, _), hits in zip(requests, responses):
+                results[question_index].append((physical_name, hits))
+        return results
 
-                for hit in results:
+    def search_documents(self, vector_question, maximum_documents: int, relevant_collections: List[str],
+                         search_params: Dict[str, SearchParams] | None = None) -> Dict[str, List[str]]:
+        """
+        Primeiro nível da busca: seleciona os documentos candidatos de cada coleção pelos vetores-resumo.
+        O custo cresce com o número de documentos, não de chunks. Coleções sem vetores-resumo
+        (indexadas antes deles) ficam fora do resultado.
+        """
+        return self.search_documents_batch([vector_question], maximum_documents, [relevant_collections], search_params)[0]
+
+    def search_documents_batch(self, vectors: list, maximum_documents: int, relevant_collections: List[List[str]],
+                               search_params: Dict[str, SearchParams] | None = None) -> List[Dict[str, List[str]]]:
+        """Versão em lote de `search_documents`: uma lista de coleções relevantes por pergunta."""
+        search_params = search_params or {}
+        document_filter = FieldCondition(key="kind", match=MatchValue(value=DOCUMENT_KIND))
+        # Cada documento tem até dois vetores-resumo: busca o dobro e fica a melhor posição de cada um
+        plans = [self._plan_searches(collections, maximum_documents * 2, search_params, lambda _: [document_filter])
+                 for collections in relevant_collections]
+
+        candidates_per_question = []
+        for searches in self._search_batch(vectors, plans, with_payload=["doc_id", "collection"]):
+            candidates = defaultdict(list)
+            for physical_name, hits in searches:
+                for hit in hits:
+                    logical_name = hit.payload.get("collection", physical_name)
+                    doc_hash = hit.payload.get("doc_id")
+                    if doc_hash not in candidates[logical_name] and len(candidates[logical_name]) < maximum_documents:
+                        candidates[logical_name].append(doc_hash)
+            candidates_per_question.append(dict(candidates))
+        return candidates_per_question
+
+    def search_question(self, vector_question: str, maximum_chunk_top: int, relevant_collections: List[str], score_threshold,
+                        search_params: Dict[str, SearchParams] | None = None,
+                        candidate_documents: Dict[str, List[str]] | None = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Busca os documentos mais relevantes para a pergunta, aplicando um limiar de score.
+        `search_params` traz, por coleção, os parâmetros de busca do seu perfil (hnsw_ef, exact, re-score).
+        `candidate_documents` (coleção -> hashes) restringe a busca de chunks aos documentos candidatos;
+        coleções ausentes do dicionário são buscadas inteiras.
+        """
+        return self.search_questions([vector_question], maximum_chunk_top, [relevant_collections], score_threshold,
+                                     search_params, [candidate_documents])[0]
+
+    def search_questions(self, vectors: list, maximum_chunk_top: int, relevant_collections: List[List[str]], score_threshold,
+                         search_params: Dict[str, SearchParams] | None = None,
+                         candidate_documents: List[Dict[str, List[str]] | None] | None = None) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Versão em lote de `search_question`: as buscas de todas as perguntas vão ao Qdrant em um
+        `search_batch` por coleção física. Recebe as coleções relevantes e os candidatos de cada pergunta.
+        """
+        search_params = search_params or {}
+        candidate_documents = candidate_documents or [None] * len(vectors)
+
+        def document_conditions(candidates):
+            def conditions(collection_names):
+                # Só restringe quando todas as coleções da busca têm candidatos
+                if not candidates or not all(candidates.get(name) for name in collection_names):
+                    return []
+                hashes = list({doc_hash for name in collection_names for doc_hash in candidates[name]})
+                return [FieldCondition(key="doc_id", match=MatchAny(any=hashes))]
+            return conditions
+
+        plans = [
+            self._plan_searches(collections, maximum_chunk_top, search_params, document_conditions(candidates), chunks_only=True)
+            for collections, candidates in zip(relevant_collections, candidate_documents)
+        ]
+
+        grouped_per_question = []
+        for searches in self._search_batch(vectors, plans, with_payload=True, score_threshold=score_threshold):
+            grouped = defaultdict(list)
+            for physical_name, hits in searches:
+                for hit in hits:
                     if hit.score < score_threshold:
                         continue #Pular resultados abaixo do limiar
 
-                    payload = hit.payload
-                    doc_id = payload.get("doc_id", "desconhecido")
-                    
-                    grouped[doc_id].append({
-                        "text": payload["text"],
-                        "document_id": doc_id,
-                        "filename": payload.get("filename", "desconhecido"),
-                        "chunk_index": payload.get("chunk_id", -1),
-                        "page": payload.get("page", None),
-                        "score": hit.score,
-                    })
+                    chunk = self._format_chunk(hit.payload, hit.score, physical_name, hit.id)
+                    if chunk["document_id"] is None:
+                        chunk["document_id"] = "desconhecido"
+                    grouped[chunk["document_id"]].append(chunk)
+
+            # Ordenar por score decrescente
+            for doc_id in grouped:
+                grouped[doc_id] = sorted(grouped[doc_id], key=lambda x: x["score"], reverse=True)
+            grouped_per_question.append(dict(grouped))
+
+        return grouped_per_question
+
+    def count_points(self, collection_name: str, chunks_only: bool = True) -> int:
+        """Pontos de chunks da coleção lógica; com `chunks_only=False`, também os vetores-resumo de documentos."""
+        return self.client.count(
+            collection_name=self._physical(collection_name),
+            count_filter=self._filter([collection_name], chunks_only=chunks_only),
+            exact=True
+        ).count
+
+    def get_vector_size(self, collection_name: str) -> int:
+        return self.client.get_collection(self.resolve_collection(collection_name)).config.params.vectors.size
+
+    def scroll_points(self, collection_name: str, batch_size: int = 1000, with_vectors: bool = False):
+        """Percorre todos os pontos da coleção lógica em lotes (gerador de listas de pontos)."""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self._physical(collection_name),
+                scroll_filter=self._filter([collection_name]),
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            if points:
+                yield points
+            if offset is None:
+                break
+
+    def copy_document_points(self, doc_hash: str, source_collection: str, target_collection: str, batch_size: int = UPSERT_BATCH_SIZE) -> int:
+        """
+        Copia os pontos de um documento (chunks e vetores-resumo) para outra coleção lógica, em lotes de
+        scroll com vetores seguidos de upsert: o documento passa a existir no destino sem extração nem embedding.
+        Os IDs são recalculados para o destino. Retorna quantos pontos foram copiados; 0 se não havia pontos
+        ou se as coleções usam dimensões diferentes (modelos diferentes). Levanta exceção se um lote falhar.
+        """
+        if self.get_vector_size(source_collection) != self.get_vector_size(target_collection):
+            print(f"INFO: '{source_collection}' e '{target_collection}' têm dimensões diferentes; documento {doc_hash} não será copiado.")
+            return 0
+
+        if self.chunk_cache:
+            self.chunk_cache.invalidate(target_collection, doc_hash)
+        copied = 0
+        offset = None
+        # Documentos indexados antes dos vetores-resumo ganham os seus no destino, a partir dos vetores copiados
+        has_summaries = False
+        chunks, vectors = [], []
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self._physical(source_collection),
+                scroll_filter=self._filter([source_collection], FieldCondition(key="doc_id", match=MatchValue(value=doc_hash))),
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if points:
+                # Payload enxuto: o texto da origem é lido e regravado sob as chaves do destino (upsert_points)
+                texts = self.text_store.get_many([point.payload["text_key"] for point in points if point.payload.get("text_key")]) if self.text_store else {}
+                written = self.upsert_points(target_collection, [
+                    PointStruct(
+                        id=self.point_id(target_collection, doc_hash, point.payload.get("chunk_id")),
+                        vector=point.vector,
+                        payload=self._with_text({**point.payload, "collection": target_collection}, texts)
+                    )
+                    for point in points
+                ])
+                # Uma cópia parcial não pode virar documento: quem chama remove o que foi gravado
+                if not written:
+                    raise RuntimeError(f"Falha ao copiar os pontos do documento {doc_hash} para '{target_collection}'")
+                copied += len(points)
+                for point in points:
+                    if point.payload.get("kind") == DOCUMENT_KIND:
+                        has_summaries = True
+                    elif not has_summaries:
+                        chunks.append({"doc_id": doc_hash, "filename": point.payload.get("filename"), "page": point.payload.get("page")})
+                        vectors.append(point.vector)
+            if offset is None:
+                break
+
+        if chunks and not has_summaries:
+            summary_ids, summary_vectors, summary_payloads = self._document_summaries(chunks, np.asarray(vectors, dtype=np.float32), target_collection)
+            if not self.upsert_points(target_collection, [
+                PointStruct(id=point_id, vector=vector.tolist(), payload=payload)
+                for point_id, vector, payload in zip(summary_ids, summary_vectors, summary_payloads)
+            ]):
+                raise RuntimeError(f"Falha ao gravar os vetores-resumo do documento {doc_hash} em '{target_collection}'")
+            copied += len(summary_ids)
+        return copied
+
+    @staticmethod
+    def _with_text(payload: dict, texts: dict) -> dict:
+        """Troca o `text_key` do payload pelo texto lido do ChunkTextStore."""
+        if "text_key" in payload:
+            payload["text"] = texts.get(payload.pop("text_key"), "")
+        return payload
+
+    def upsert_points(self, collection_name: str, points: List[PointStruct], wait: bool = True) -> bool:
+        """
+        Grava pontos já montados (com o payload `collection` preenchido) na coleção física.
+        Com payload enxuto, o texto dos pontos vai para o ChunkTextStore antes da gravação.
+        """
+        if self.text_store:
+            payloads = self._slim_payloads(self.resolve_collection(collection_name), collection_name, [point.id for point in points], [point.payload for point in points])
+            points = [PointStruct(id=point.id, vector=point.vector, payload=payload) for point, payload in zip(points, payloads)]
+        response = self.client.upsert(collection_name=self._physical(collection_name), points=points, wait=wait)
+        return response.status == "completed"
+
+    def get_neighbour_chunks(self, chunks: List[Dict[str, Any]], radius: int) -> tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """
+        Busca os chunks vizinhos (chunk_index ± radius) dos chunks encontrados por ID, com um único
+        retrieve por coleção física, sem varrer filtros. Retorna os chunks agrupados por documento e os
+        chunks de pontos antigos (IDs aleatórios), cuja vizinhança não pode ser calculada pelo ID.
+        """
+        ids_by_physical = defaultdict(dict)  # coleção física -> {id do ponto: coleção lógica}
+        legacy = []
+        for chunk in chunks:
+            collection_name = chunk["collection"]
+            chunk_index = chunk["chunk_index"]
+            if chunk.get("point_id") != self.point_id(collection_name, chunk["document_id"], chunk_index):
+                legacy.append(chunk)
+                continue
+
+            for index in range(max(0, chunk_index - radius), chunk_index + radius + 1):
+                point_id = self.point_id(collection_name, chunk["document_id"], index)
+                ids_by_physical[self._physical(collection_name)][point_id] = collection_name
+
+        grouped = defaultdict(list)
+        for physical_name, ids in ids_by_physical.items():
+            try:
+                points = self._retry_missing(
+                    self.client.retrieve,
+                    collection_name=physical_name,
+                    ids=list(ids),
+                    with_payload=True,
+                    with_vectors=False
+                )
             except Exception as e:
-                print(f"[ERRO] Falha ao buscar em {collection_name}: {e}")
+                print(f"[ERRO] Falha ao buscar chunks vizinhos em {physical_name}: {e}")
+                continue
+
+            for point in points:
+                chunk = self._format_chunk(point.payload, 1.0, ids.get(str(point.id)), point.id)
+                grouped[chunk["document_id"]].append(chunk)
 
-        # Ordenar por score decrescente
         for doc_id in grouped:
-            grouped[doc_id] = sorted(grouped[doc_id], key=lambda x: x["score"], reverse=True)
+            grouped[doc_id].sort(key=lambda x: x["chunk_index"])
+
+        return dict(grouped), legacy
 
-        return dict(grouped)
-    
     def get_chunks_by_page_window(self, collection_name: str, doc_hash: str, min_page: int, max_page: int) -> list:
         """
         Busca todos os chunks de um documento que estão dentro de uma janela de páginas.
         """
         try:
-            retrieved_points, _ = self.client.scroll(
-                collection_name=collection_name,
-                scroll_filter=Filter(
-                    must=[
-                        FieldCondition(key="doc_id", match={"value": doc_hash}),
-                        FieldCondition(key="page", range=Range(gte=min_page, lte=max_page))
-                    ]
+            retrieved_points, _ = self._retry_missing(
+                self.client.scroll,
+                collection_name=self._physical(collection_name),
+                scroll_filter=self._filter(
+                    [collection_name],
+                    FieldCondition(key="doc_id", match=MatchValue(value=doc_hash)),
+                    FieldCondition(key="page", range=Range(gte=min_page, lte=max_page))
                 ),
                 limit=1000, # Limite alto para garantir que todos os chunks da janela sejam pegos
                 with_payload=True
             )
-            
+
             # Formata a saída para ser uma lista simples de chunks
-            chunks = []
-            for point in retrieved_points:
-                payload = point.payload
-                chunks.append({
-                    "text": payload["text"],
-                    "document_id": payload.get("doc_id"),
-                    "filename": payload.get("filename"),
-                    "chunk_index": payload.get("chunk_id"),
-                    "page": payload.get("page"),
-                    "score": 1.0 
-                })
-            return chunks
+            return [self._format_chunk(point.payload, 1.0, collection_name, point.id) for point in retrieved_points]
 
         except Exception as e:
             print(f"[ERRO] Falha ao buscar janela de páginas em {collection_name}: {e}")
             return []
-    
-    def get_all_chunks_by_doc_hashes(self, collection_name: str, doc_hashes: list[str]) -> dict:
+
+    def get_all_chunks_by_doc_hashes(self, collection_name: str, doc_hashes: list[str], physical_name: str | None = None) -> dict:
         """
         Busca todos os chunks de uma lista de hashes de documentos.
-        Retorna um dicionário agrupado pelo hash (doc_id).
+        Retorna um dicionário agrupado pelo hash (doc_id). `physical_name` lê de uma geração fora do alias.
+        Pela coleção lógica, os documentos em cache não vão ao Qdrant e os buscados entram no cache.
         """
         if not doc_hashes:
             return {}
 
-        retrieved_points, next_offset = self.client.scroll(
-            collection_name=collection_name,
-            scroll_filter=Filter(
-                must=[
-                    FieldCondition(key="doc_id", match={"any": doc_hashes})
-                ]
-            ),
-            limit=1000,
-            with_payload=True
-        )
-        
-        # Agrupa os resultados por doc_id (hash)
+        use_cache = self.chunk_cache is not None and not physical_name
+        cached = {}
+        if use_cache:
+            cached, doc_hashes = self.chunk_cache.get_many(collection_name, doc_hashes)
+            if not doc_hashes:
+                return cached
+
+        # Agrupa os resultados por doc_id (hash), percorrendo todas as páginas do scroll
         grouped_chunks = defaultdict(list)
-        for point in retrieved_points:
-            payload = point.payload
-            doc_id = payload.get("doc_id")
-            grouped_chunks[doc_id].append({
-                "text": payload["text"],
-                "document_id": doc_id,
-                "filename": payload.get("filename", "desconhecido"),
-                "chunk_index": payload.get("chunk_id", -1),
-                "page": payload.get("page", None),
-                "score": 1.0
-            })
-            
-        return dict(grouped_chunks)
-
-        
+        next_offset = None
+        while True:
+            retrieved_points, next_offset = self._retry_missing(
+                self.client.scroll,
+                collection_name=physical_name or self._physical(collection_name),
+                scroll_filter=self._filter([collection_name], FieldCondition(key="doc_id", match=MatchAny(any=doc_hashes)), chunks_only=True),
+                limit=1000,
+                offset=next_offset,
+                with_payload=True
+            )
+            for point in retrieved_points:
+                chunk = self._format_chunk(point.payload, 1.0, collection_name, point.id)
+                grouped_chunks[chunk["document_id"]].append(chunk)
+            if next_offset is None:
+                break
+
+        # A expansão por documento inteiro manda todos os chunks ao re-ranqueamento
+        self.load_texts([chunk for chunks in grouped_chunks.values() for chunk in chunks])
+        if use_cache:
+            for doc_hash, chunks in grouped_chunks.items():
+                self.chunk_cache.put(collection_name, doc_hash, chunks)
+        return {**cached, **grouped_chunks}
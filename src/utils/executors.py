@@ -0,0 +1,60 @@
+# src/utils/executors.py
+"""Executores dedicados para tirar trabalho bloqueante do event loop."""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Chamadas bloqueantes de rede (MongoDB/GridFS, Qdrant)
+IO_EXECUTOR_WORKERS = int(os.getenv("IO_EXECUTOR_WORKERS", 8))
+# Inferência de modelos (embedding, chunking); o torch libera o GIL durante o forward
+INFERENCE_EXECUTOR_WORKERS = int(os.getenv("INFERENCE_EXECUTOR_WORKERS", 2))
+# Extração de texto e OCR, em processos separados para não disputar o GIL
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+
+@lru_cache()
+def get_io_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=IO_EXECUTOR_WORKERS, thread_name_prefix="rag-io")
+
+
+@lru_cache()
+def get_inference_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=INFERENCE_EXECUTOR_WORKERS, thread_name_prefix="rag-inference")
+
+
+@lru_cache()
+def get_cpu_executor() -> ProcessPoolExecutor:
+    # "spawn" em vez do fork padrão do Linux: o processo da API tem threads em andamento (micro-batching,
+    # executores, warm-up) e o torch carregado, e um fork herdaria locks presos e esse estado
+    return ProcessPoolExecutor(max_workers=CPU_EXECUTOR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+async def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+async def run_io(func, *args, **kwargs):
+    return await _run(get_io_executor(), func, *args, **kwargs)
+
+
+async def run_inference(func, *args, **kwargs):
+    return await _run(get_inference_executor(), func, *args, **kwargs)
+
+
+async def run_cpu(func, *args, **kwargs):
+    """Executa em outro processo: `func` e seus argumentos precisam ser serializáveis (pickle)."""
+    return await _run(get_cpu_executor(), func, *args, **kwargs)
+
+
+def shutdown_executors():
+    for getter in (get_io_executor, get_inference_executor, get_cpu_executor):
+        if getter.cache_info().currsize:
+            getter().shutdown(wait=False, cancel_futures=True)
+            getter.cache_clear()
@@ -1,4 +1,5 @@
 # src/utils/extract_text.py
+import hashlib
 import os
 import fitz  # PyMuPDF
 import pytesseract
@@ -7,8 +8,58 @@ import chardet
 from PIL import Image
 from collections import Counter
 
+from utils.page_cache import PageCache, get_page_cache
+
 
 class ExtractTextService:
+    @staticmethod
+    def extract_pages(file_path: str, file_hash: str | None = None) -> list[tuple[int, str]]:
+        """
+        Extrai o texto do documento por página, escolhendo entre texto nativo e OCR para PDFs.
+        Não depende de estado do processo, então pode rodar em um executor de processos.
+        Com `file_hash`, PDFs já extraídos vêm do cache de páginas, sem abrir o arquivo.
+        """
+        if os.path.splitext(file_path)[1].lower() != ".pdf":
+            return [(1, ExtractTextService.extract_text(file_path))]
+
+        cache = get_page_cache()
+        if cache and file_hash:
+            cached = ExtractTextService._cached_pages(cache, file_hash)
+            if cached is not None:
+                print(f"INFO: Texto das {len(cached)} página(s) obtido do cache de extração.")
+                return cached
+
+        failed_pages = []
+        ocr = not ExtractTextService.is_pdf_searchable(file_path)
+        if ocr:
+            pages, failed_pages = ExtractTextService.extract_ocr_text_by_page(file_path, cache)
+        else:
+            pages = ExtractTextService.extract_native_text_by_page(file_path)
+
+        if cache and file_hash:
+            # Páginas com falha de OCR não entram no cache, nem a contagem de páginas: o arquivo fica
+            # incompleto no cache e a próxima extração tenta o OCR delas de novo
+            entries = [
+                (PageCache.file_key(file_hash, page_number), text, ocr)
+                for page_number, text in pages if page_number not in failed_pages
+            ]
+            if not failed_pages:
+                entries.append((PageCache.file_key(file_hash, "pages"), str(len(pages)), ocr))
+            cache.put_many(entries)
+        return pages
+
+    @staticmethod
+    def _cached_pages(cache: PageCache, file_hash: str) -> list[tuple[int, str]] | None:
+        """Todas as páginas do arquivo no cache, ou None se faltar alguma."""
+        count = cache.get(PageCache.file_key(file_hash, "pages"))
+        if count is None:
+            return None
+        keys = [PageCache.file_key(file_hash, page_number) for page_number in range(1, int(count[0]) + 1)]
+        found = cache.get_many(keys)
+        if len(found) != len(keys):
+            return None
+        return [(page_number, found[key][0]) for page_number, key in enumerate(keys, start=1)]
+
     @staticmethod
     def is_pdf_searchable(file_path: str, sample_pages: int = 5) -> bool:
         """
@@ -40,24 +91,45 @@ class ExtractTextService:
         return pages
 
     @staticmethod
-    def extract_ocr_text_by_page(file_path: str) -> list[tuple[int, str]]:
-            """Aplica OCR em um PDF, usando PyMuPDF para renderizar as páginas como imagens."""
+    def extract_ocr_text_by_page(file_path: str, cache: PageCache | None = None) -> tuple[list[tuple[int, str]], list[int]]:
+            """
+            Aplica OCR em um PDF, usando PyMuPDF para renderizar as páginas como imagens.
+            Com `cache`, o texto é guardado pelo hash da imagem renderizada: a mesma página em
+            outro arquivo (nova versão do documento) não passa de novo pelo Tesseract.
+            Retorna as páginas e os números das que falharam (texto vazio, fora do cache).
+            """
             print("INFO: Aplicando OCR no PDF...")
             doc = fitz.open(file_path)
             pages_text = []
+            failed_pages = []
+            cached_pages = 0
             for i, page in enumerate(doc):
-                print(f"  -> Processando OCR na página {i + 1} de {len(doc)}...")
                 try:
                     pix = page.get_pixmap(dpi=300)
+                    content_key = None
+                    if cache:
+                        content_key = PageCache.content_key(
+                            hashlib.sha256(f"{pix.width}x{pix.height}:".encode() + pix.samples).hexdigest()
+                        )
+                        cached = cache.get(content_key)
+                        if cached is not None:
+                            pages_text.append((i + 1, cached[0]))
+                            cached_pages += 1
+                            continue
+
+                    print(f"  -> Processando OCR na página {i + 1} de {len(doc)}...")
                     img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
                     ocr_text = pytesseract.image_to_string(img, lang='por')
                     pages_text.append((i + 1, ocr_text or ""))
+                    if content_key:
+                        cache.put_many([(content_key, ocr_text or "", True)])
                 except Exception as e:
                     print(f"ERRO: Falha no OCR da página {i+1}: {e}")
                     pages_text.append((i + 1, ""))
+                    failed_pages.append(i + 1)
             doc.close()
-            print("INFO: Processo de OCR concluído.")
-            return pages_text
+            print(f"INFO: Processo de OCR concluído ({cached_pages} página(s) reaproveitada(s) do cache).")
+            return pages_text, failed_pages
 
     @staticmethod
     def extract_text(file_path: str) -> str:
@@ -0,0 +1,111 @@
+# src/utils/lru_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+# Sentinela para diferenciar "não está no cache" de um valor None armazenado
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache LRU thread-safe, limitado por número de entradas e, opcionalmente, por peso
+    (ex.: bytes estimados de cada valor) e por tempo de vida (`ttl_seconds`, contado da gravação).
+    Mantém estatísticas de acertos e falhas.
+    """
+
+    def __init__(self, max_entries: int, max_weight: int | None = None, weigher=None, on_evict=None, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.on_evict = on_evict
+        self.ttl_seconds = ttl_seconds
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, weight, expira em)
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        expired = MISSING
+        with self.lock:
+            entry = self.entries.get(key, MISSING)
+            if entry is not MISSING and entry[2] is not None and entry[2] <= time.monotonic():
+                del self.entries[key]
+                self.weight -= entry[1]
+                self.expirations += 1
+                expired = entry[0]
+                entry = MISSING
+            if entry is MISSING:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+
+        if expired is not MISSING and self.on_evict:
+            self.on_evict(key, expired)
+        return default if entry is MISSING else entry[0]
+
+    def put(self, key, value):
+        weight = self.weigher(value) if self.weigher else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            return  # Valor maior que o cache inteiro: não armazena
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        evicted = []
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous:
+                self.weight -= previous[1]
+            self.entries[key] = (value, weight, expires_at)
+            self.weight += weight
+
+            while self.entries and (
+                len(self.entries) > self.max_entries
+                or (self.max_weight is not None and self.weight > self.max_weight)
+            ):
+                old_key, (old_value, old_weight, _) = self.entries.popitem(last=False)
+                self.weight -= old_weight
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+
+        if self.on_evict:
+            for old_key, old_value in evicted:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return MISSING
+            self.weight -= entry[1]
+            return entry[0]
+
+    def keys(self) -> list:
+        """Cópia das chaves atuais, da menos para a mais recentemente usada."""
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.weight = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "weight": self.weight,
+                "max_weight": self.max_weight,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "ttl_seconds": self.ttl_seconds,
+            }
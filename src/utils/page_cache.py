@@ -0,0 +1,162 @@
+# src/utils/page_cache.py
+"""
+Cache persistente, em disco, do texto extraído por página (nativo ou OCR).
+
+Guarda cada página sob duas chaves:
+    <hash do arquivo>:<página>   reenvio do mesmo arquivo e reindexações (nem abre o PDF)
+    content:<hash da página>     hash da imagem renderizada da página: páginas que não mudaram
+                                 em uma nova versão do documento não passam de novo pelo Tesseract
+
+O arquivo é um SQLite compartilhado pelos processos de extração (executor de processos), com
+o texto comprimido (zlib) e remoção das entradas menos usadas quando passa de PAGE_CACHE_MAX_MB.
+O tamanho total é mantido por triggers na tabela `totals`, então vale entre processos e a
+verificação do limite a cada gravação não soma a tabela inteira.
+"""
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "./cache/pages.sqlite3")
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", 512))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    text BLOB NOT NULL,
+    ocr INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+CREATE TABLE IF NOT EXISTS totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+BEGIN IMMEDIATE;
+CREATE TRIGGER IF NOT EXISTS pages_size_insert AFTER INSERT ON pages
+BEGIN UPDATE totals SET value = value + NEW.size WHERE name = 'size'; END;
+CREATE TRIGGER IF NOT EXISTS pages_size_update AFTER UPDATE OF size ON pages
+BEGIN UPDATE totals SET value = value - OLD.size + NEW.size WHERE name = 'size'; END;
+CREATE TRIGGER IF NOT EXISTS pages_size_delete AFTER DELETE ON pages
+BEGIN UPDATE totals SET value = value - OLD.size WHERE name = 'size'; END;
+INSERT OR IGNORE INTO totals (name, value) SELECT 'size', COALESCE(SUM(size), 0) FROM pages;
+COMMIT;
+"""
+
+
+class PageCache:
+    def __init__(self, path: str = PAGE_CACHE_PATH, max_bytes: int = int(PAGE_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Uma conexão por thread e por processo (o SQLite não deve atravessar fork)
+        connection = getattr(self.local, "connection", None)
+        if connection is None or self.local.pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def file_key(file_hash: str, page_number: int | str) -> str:
+        return f"{file_hash}:{page_number}"
+
+    @staticmethod
+    def content_key(content_hash: str) -> str:
+        return f"content:{content_hash}"
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[str, bool]]:
+        """Páginas em cache entre as chaves pedidas: chave -> (texto, se veio de OCR)."""
+        if not keys:
+            return {}
+        connection = self._connection()
+        found = {}
+        # Lotes abaixo do limite de parâmetros do SQLite
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(f"SELECT key, text, ocr FROM pages WHERE key IN ({placeholders})", batch).fetchall()
+            for key, text, ocr in rows:
+                found[key] = (zlib.decompress(text).decode("utf-8"), bool(ocr))
+            if rows:
+                connection.execute(
+                    f"UPDATE pages SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                    [time.time(), *(row[0] for row in rows)]
+                )
+        return found
+
+    def get(self, key: str) -> tuple[str, bool] | None:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: list[tuple[str, str, bool]]):
+        """Grava (chave, texto, se veio de OCR) e remove as entradas menos usadas se o cache passar do limite."""
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, text, ocr in entries:
+            compressed = zlib.compress(text.encode("utf-8"), 6)
+            rows.append((key, compressed, int(ocr), len(compressed), now))
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Upsert em vez de INSERT OR REPLACE: a troca de linha do REPLACE não dispara o trigger de remoção
+            connection.executemany(
+                "INSERT INTO pages (key, text, ocr, size, last_used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET text = excluded.text, ocr = excluded.ocr, "
+                "size = excluded.size, last_used = excluded.last_used", rows
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self._evict()
+
+    def _evict(self):
+        connection = self._connection()
+        total = connection.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Remove as menos usadas até ficar em 90% do limite, para não despejar a cada gravação
+        excess = total - int(self.max_bytes * 0.9)
+        removed = 0
+        keys = []
+        for key, size in connection.execute("SELECT key, size FROM pages ORDER BY last_used"):
+            keys.append(key)
+            removed += size
+            if removed >= excess:
+                break
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            connection.execute(f"DELETE FROM pages WHERE key IN ({','.join('?' * len(batch))})", batch)
+        print(f"INFO: Cache de páginas: {len(keys)} entrada(s) removida(s) ({removed / 1024 / 1024:.1f} MB).")
+
+    def stats(self) -> dict:
+        count, total, ocr = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(ocr), 0) FROM pages"
+        ).fetchone()
+        return {"entries": count, "ocr_entries": ocr, "size_mb": round(total / 1024 / 1024, 2), "max_mb": round(self.max_bytes / 1024 / 1024, 2)}
+
+
+_page_cache = PageCache() if PAGE_CACHE_ENABLED else None
+
+
+def get_page_cache() -> PageCache | None:
+    """Cache de páginas do processo, ou None se desativado."""
+    return _page_cache
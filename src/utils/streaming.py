@@ -0,0 +1,67 @@
+# src/utils/streaming.py
+import re
+
+_RANGE_PATTERN = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+class RangeNotSatisfiable(Exception):
+    """O intervalo pedido no cabeçalho Range está fora do tamanho do arquivo."""
+
+
+def parse_byte_range(range_header: str | None, total_length: int) -> tuple[int, int] | None:
+    """
+    Interpreta um cabeçalho `Range: bytes=...` com um único intervalo.
+    Retorna (início, fim) inclusivos, ou None quando o arquivo deve ser enviado inteiro
+    (cabeçalho ausente, malformado ou com múltiplos intervalos).
+    """
+    if not range_header:
+        return None
+
+    match = _RANGE_PATTERN.match(range_header)
+    if not match:
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+
+    if not start_text:
+        # Sufixo: "bytes=-500" são os últimos 500 bytes
+        suffix = int(end_text)
+        # Arquivo vazio não tem último byte para o sufixo (RFC 9110, 14.1.2)
+        if suffix == 0 or total_length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, total_length - suffix), total_length - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else total_length - 1
+    if start >= total_length or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, total_length - 1)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Compara o cabeçalho If-None-Match com a ETag (comparação fraca, como pede a RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def iter_gridfs_file(gridfs_file, start: int = 0, length: int | None = None, chunk_size: int | None = None):
+    """Lê um arquivo do GridFS em blocos, sem carregar o arquivo inteiro em memória."""
+    chunk_size = chunk_size or gridfs_file.chunk_size
+    remaining = gridfs_file.length - start if length is None else length
+    try:
+        if start:
+            gridfs_file.seek(start)
+        while remaining > 0:
+            data = gridfs_file.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        gridfs_file.close()
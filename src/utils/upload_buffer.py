@@ -0,0 +1,184 @@
+# src/utils/upload_buffer.py
+import hashlib
+import io
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from dotenv import load_dotenv
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+load_dotenv()
+
+# Acima deste tamanho o upload é despejado em disco em vez de ficar em memória
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", 8 * 1024 * 1024))
+# Tamanho máximo aceito para um upload
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 200 * 1024 * 1024))
+# Folga para delimitadores e cabeçalhos do corpo multipart além do arquivo
+UPLOAD_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, size: int):
+        super().__init__(f"Upload excede o tamanho máximo de {UPLOAD_MAX_SIZE} bytes")
+        self.size = size
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+class UploadBuffer:
+    """
+    Recebe o conteúdo de um upload em blocos, calculando o sha256 de forma incremental.
+    Fica em memória até `spool_threshold` bytes e, acima disso, é despejado em um arquivo
+    temporário. O mesmo buffer alimenta o extrator (via caminho em disco) e o GridFS (via stream).
+    É a única cópia do arquivo: o corpo da requisição é lido direto para ele (`from_request`).
+    """
+
+    def __init__(self, filename: str, spool_threshold: int = UPLOAD_SPOOL_THRESHOLD,
+                 max_size: int = UPLOAD_MAX_SIZE, temp_dir: str = "temp"):
+        self.filename = filename
+        self.spool_threshold = spool_threshold
+        self.max_size = max_size
+        self.temp_dir = Path(temp_dir)
+
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.buffer = io.BytesIO()
+        self.path = None
+
+    @classmethod
+    async def from_request(cls, request, field_name: str = "file", **kwargs) -> "UploadBuffer":
+        """
+        Lê o corpo multipart da requisição em stream, gravando só o campo de arquivo `field_name`.
+        Sem o spool do Starlette, o arquivo não é copiado duas vezes, e o limite de tamanho vale
+        enquanto o corpo chega: a leitura para no primeiro bloco acima dele (UploadTooLarge).
+        """
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise InvalidUpload("O upload deve ser enviado como multipart/form-data")
+
+        max_size = kwargs.get("max_size", UPLOAD_MAX_SIZE)
+        state = {"upload": None, "receiving": False, "field": b"", "value": b"", "headers": {}}
+
+        def on_part_begin():
+            state["headers"] = {}
+
+        def on_header_field(data: bytes, start: int, end: int):
+            state["field"] += data[start:end]
+
+        def on_header_value(data: bytes, start: int, end: int):
+            state["value"] += data[start:end]
+
+        def on_header_end():
+            state["headers"][state["field"].lower()] = state["value"]
+            state["field"], state["value"] = b"", b""
+
+        def on_headers_finished():
+            _, options = parse_options_header(state["headers"].get(b"content-disposition", b""))
+            # Só o primeiro campo de arquivo com o nome esperado é gravado; os demais campos são descartados
+            state["receiving"] = state["upload"] is None and options.get(b"name") == field_name.encode() and b"filename" in options
+            if state["receiving"]:
+                state["upload"] = cls(options[b"filename"].decode("utf-8", errors="replace"), **kwargs)
+
+        def on_part_data(data: bytes, start: int, end: int):
+            if state["receiving"]:
+                state["upload"].write(data[start:end])
+
+        def on_part_end():
+            state["receiving"] = False
+
+        parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+        received = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                # Também limita o corpo inteiro (campos extras não são gravados, mas seriam lidos)
+                if received > max_size + UPLOAD_MULTIPART_OVERHEAD:
+                    raise UploadTooLarge(received)
+                parser.write(chunk)
+            parser.finalize()
+        except Exception:
+            if state["upload"]:
+                state["upload"].close()
+            raise
+
+        upload = state["upload"]
+        if upload is None:
+            raise InvalidUpload(f"Campo de arquivo '{field_name}' ausente no upload")
+        upload.buffer.flush()
+        return upload
+
+    @property
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLarge(self.size)
+
+        self.sha256.update(data)
+        if self.in_memory and self.size > self.spool_threshold:
+            self._rollover()
+        self.buffer.write(data)
+
+    def _rollover(self):
+        """Move o conteúdo acumulado em memória para um arquivo temporário."""
+        self.temp_dir.mkdir(exist_ok=True)
+        self.path = self.temp_dir / f"{uuid.uuid4()}_{self.filename}"
+        disk_file = open(self.path, "wb")
+        disk_file.write(self.buffer.getbuffer())
+        self.buffer.close()
+        self.buffer = disk_file
+
+    @contextmanager
+    def reader(self):
+        """Disponibiliza um objeto de arquivo posicionado no início, para leitura em stream (ex.: GridFS)."""
+        if self.in_memory:
+            self.buffer.seek(0)
+            yield self.buffer
+            return
+        self.buffer.flush()
+        with open(self.path, "rb") as f:
+            yield f
+
+    @contextmanager
+    def as_path(self):
+        """
+        Disponibiliza o conteúdo como um caminho em disco para o extrator.
+        Uploads pequenos (em memória) são gravados temporariamente só durante o bloco.
+        """
+        if not self.in_memory:
+            self.buffer.flush()
+            yield self.path
+            return
+
+        self.temp_dir.mkdir(exist_ok=True)
+        temp_filepath = self.temp_dir / f"{uuid.uuid4()}_{self.filename}"
+        with open(temp_filepath, "wb") as f:
+            f.write(self.buffer.getbuffer())
+        try:
+            yield temp_filepath
+        finally:
+            os.remove(temp_filepath)
+
+    def close(self):
+        self.buffer.close()
+        if self.path and self.path.exists():
+            os.remove(self.path)